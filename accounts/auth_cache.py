@@ -0,0 +1,82 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth.models import User
+
+
+class AuthCache:
+    """
+    Per-process LRU of user id -> (user, role) for token authentication.
+
+    User/Profile signals invalidate entries in the process that made the
+    change; the TTL bounds how long other workers can serve an outdated
+    user (e.g. one just deactivated or given a new role). Cached users are
+    shared between requests and must be treated as read-only. Keys are
+    str(user id), since tokens carry the id claim as a string.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def get(self, user_id):
+        user_id = str(user_id)
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            user, role, expires = entry
+            if expires < time.monotonic():
+                del self._entries[user_id]
+                return None
+            self._entries.move_to_end(user_id)
+            return user, role
+
+    def set(self, user_id, user, role):
+        user_id = str(user_id)
+        with self._lock:
+            self._entries[user_id] = (user, role, time.monotonic() + settings.AUTH_CACHE_TTL)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > settings.AUTH_CACHE_SIZE:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(str(user_id), None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def load(self, user_id):
+        """
+        (user, role) for an active user, from the cache or with one query.
+        Returns None for unknown or inactive users.
+        """
+        cached = self.get(user_id)
+        if cached is not None:
+            return cached
+        return self._remember(user_id, self._query(user_id).first())
+
+    async def aload(self, user_id):
+        """Async load(); a cache hit does not leave the event loop."""
+        cached = self.get(user_id)
+        if cached is not None:
+            return cached
+        return self._remember(user_id, await self._query(user_id).afirst())
+
+    @staticmethod
+    def _query(user_id):
+        return User.objects.select_related('profile').filter(id=user_id, is_active=True)
+
+    def _remember(self, user_id, user):
+        if user is None:
+            return None
+        profile = getattr(user, 'profile', None)
+        role = profile.role if profile else None
+        self.set(user_id, user, role)
+        return user, role
+
+auth_cache = AuthCache()
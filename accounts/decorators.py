@@ -1,7 +1,13 @@
 from functools import wraps
+from asgiref.sync import iscoroutinefunction
 from django.http import JsonResponse, HttpResponse
 from rest_framework_simplejwt.authentication import JWTAuthentication
 from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.settings import api_settings
+
+from .auth_cache import auth_cache
+
+jwt_auth = JWTAuthentication()
 
 def recruiter_required(view_func):
     @wraps(view_func)
@@ -16,13 +22,19 @@ def recruiter_required(view_func):
                 status=403
             )
 
-        if not hasattr(user, 'profile'):
+        # Set by jwt_required from the auth cache; no profile query.
+        role = getattr(request, 'auth_role', None)
+        if role is None:
             return JsonResponse(
                 {'error': 'User profile not found'},
                 status=403
             )
 
-        if (user.profile.role != 'recruiter' and user.profile.role != 'Recruiter'):
+        # The token must have been issued to a recruiter (its role claim) and
+        # the user must still be one, so a demotion applies to older tokens.
+        # Tokens minted before the claim existed only have the latter.
+        claimed = request.auth.get('role', role) if getattr(request, 'auth', None) else role
+        if role.lower() != 'recruiter' or (claimed or '').lower() != 'recruiter':
             return JsonResponse(
                 {'error':'Recruiter access only'},
                 status=403
@@ -32,21 +44,49 @@ def recruiter_required(view_func):
 
     return _wrapped_view
 
+def _validated_token(request):
+    header = jwt_auth.get_header(request)
+    raw_token = jwt_auth.get_raw_token(header) if header else None
+    if raw_token is None:
+        raise AuthenticationFailed()
+    return jwt_auth.get_validated_token(raw_token)
+
+def _unauthorized():
+    return JsonResponse(
+        {'error' : 'Authentication credentials we not provided or invalid'},
+        status=401
+    )
+
 def jwt_required(view_func):
+    if iscoroutinefunction(view_func):
+        @wraps(view_func)
+        async def _async_wrapped_view(request, *args, **kwargs):
+            if request.method == "OPTIONS":
+                return HttpResponse(status=200)
+            try:
+                validated_token = _validated_token(request)
+                loaded = await auth_cache.aload(validated_token.get(api_settings.USER_ID_CLAIM))
+                if loaded is None:
+                    raise AuthenticationFailed()
+            except AuthenticationFailed:
+                return _unauthorized()
+            request.user, request.auth_role = loaded
+            request.auth = validated_token
+            return await view_func(request, *args, **kwargs)
+        return _async_wrapped_view
+
     @wraps(view_func)
     def _wrapped_view(request, *args, **kwargs):
-        auth = JWTAuthentication()
         if request.method == "OPTIONS":
             return HttpResponse(status=200)
         try:
-            validated_token= auth.get_validated_token(
-                auth.get_raw_token(auth.get_header(request))
-            )
-            request.user = auth.get_user(validated_token)
+            validated_token = _validated_token(request)
+            loaded = auth_cache.load(validated_token.get(api_settings.USER_ID_CLAIM))
+            if loaded is None:
+                raise AuthenticationFailed()
         except AuthenticationFailed:
-            return JsonResponse(
-                {'error' : 'Authentication credentials we not provided or invalid'},
-                status=401
-            )
+            return _unauthorized()
+        request.user, request.auth_role = loaded
+        request.auth = validated_token
         return view_func(request, *args, **kwargs)
     return _wrapped_view
@@ -1,10 +1,23 @@
 from django.contrib.auth.models import User
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
+from .auth_cache import auth_cache
 from .models import Profile
 
 @receiver(post_save, sender=User)
 def create_profile(sender, instance, created, **kwargs):
     
     if created:
-        Profile.objects.create(user=instance, role='jobseeker')
\ No newline at end of file
+        Profile.objects.create(user=instance, role='jobseeker')
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_cached_user(sender, instance, **kwargs):
+    auth_cache.invalidate(instance.id)
+
+
+@receiver(post_save, sender=Profile)
+@receiver(post_delete, sender=Profile)
+def invalidate_cached_role(sender, instance, **kwargs):
+    auth_cache.invalidate(instance.user_id)
@@ -1,3 +1,46 @@
+from django.contrib.auth.models import User
 from django.test import TestCase
+from rest_framework_simplejwt.tokens import RefreshToken
 
-# Create your tests here.
+from .tokens import tokens_for_user
+
+
+def bearer(token):
+    return {'HTTP_AUTHORIZATION': f'Bearer {token.access_token}'}
+
+
+class RecruiterRequiredTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('role-user', 'role@example.com', 'password')
+
+    def set_role(self, role):
+        self.user.profile.role = role
+        self.user.profile.save()
+
+    def my_jobs(self, token):
+        return self.client.get('/jobs/myJobs/', **bearer(token)).status_code
+
+    def test_recruiter_token(self):
+        self.set_role('recruiter')
+        self.assertEqual(self.my_jobs(tokens_for_user(self.user)), 200)
+
+    def test_jobseeker_token(self):
+        self.assertEqual(self.my_jobs(tokens_for_user(self.user)), 403)
+
+    def test_token_issued_before_promotion_is_refused(self):
+        token = tokens_for_user(self.user)
+        self.set_role('recruiter')
+        self.assertEqual(self.my_jobs(token), 403)
+        self.assertEqual(self.my_jobs(tokens_for_user(self.user)), 200)
+
+    def test_demotion_applies_to_issued_tokens(self):
+        self.set_role('recruiter')
+        token = tokens_for_user(self.user)
+        self.set_role('jobseeker')
+        self.assertEqual(self.my_jobs(token), 403)
+
+    def test_token_without_role_claim_uses_current_role(self):
+        self.set_role('recruiter')
+        self.assertEqual(self.my_jobs(RefreshToken.for_user(self.user)), 200)
@@ -0,0 +1,23 @@
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from rest_framework_simplejwt.tokens import RefreshToken
+
+
+def role_of(user):
+    profile = getattr(user, 'profile', None)
+    return profile.role if profile else None
+
+
+def tokens_for_user(user):
+    """Refresh/access pair carrying the user's role as a `role` claim (see recruiter_required)."""
+    refresh = RefreshToken.for_user(user)
+    refresh['role'] = role_of(user)
+    return refresh
+
+
+class RoleTokenObtainPairSerializer(TokenObtainPairSerializer):
+
+    @classmethod
+    def get_token(cls, user):
+        token = super().get_token(user)
+        token['role'] = role_of(user)
+        return token
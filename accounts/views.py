@@ -6,9 +6,10 @@ from django.db import transaction
 
 from django.views.decorators.csrf import csrf_exempt
 
-from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth import authenticate
 
+from .tokens import tokens_for_user
+
 
 # Create your views here.
 @require_POST
@@ -73,7 +74,7 @@ def login(request):
     if not user:
         return JsonResponse({'error': 'Invalid credentials'}, status=401)
 
-    refresh = RefreshToken.for_user(user)
+    refresh = tokens_for_user(user)
 
     return JsonResponse({
         'access': str(refresh.access_token),
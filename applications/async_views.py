@@ -0,0 +1,54 @@
+from django.http import JsonResponse
+from django.shortcuts import aget_object_or_404
+
+from accounts.decorators import jwt_required
+from jobs.object_cache import acached_job
+from jobs.pagination import InvalidPage, acursor_paginate, wants_cursor
+from jobs.serializers import InvalidFields
+from jobs.streaming import STREAM_CHUNK_SIZE, AsyncStreamingJsonResponse, StreamedArray
+from .models import Application
+from .serializers import APPLICATION_DETAIL, MY_APPLICATION, add_job_sections
+
+# Async versions of the applicant read views; see jobs/async_views.py.
+
+@jwt_required
+async def viewMyApplications(request):
+    try:
+        fields = MY_APPLICATION.parse_fields(request)
+    except InvalidFields as e:
+        return JsonResponse({'error' : f'Invalid fields: {e}'}, status=400)
+
+    application = Application.objects.filter(applicant=request.user).exclude(status='withdrawn')
+    application = MY_APPLICATION.project(application, fields, extra=['applied_on'])
+
+    if wants_cursor(request):
+        try:
+            applications, page_info = await acursor_paginate(request, application, 'applied_on')
+        except InvalidPage as e:
+            return JsonResponse({'error' : str(e)}, status=400)
+        app_list = [MY_APPLICATION.serialize(app, request, fields) for app in applications]
+        return JsonResponse({**page_info, "applications" : app_list})
+
+    app_list = StreamedArray(
+        MY_APPLICATION.serialize(app, request, fields)
+        async for app in application.order_by('-applied_on').aiterator(chunk_size=STREAM_CHUNK_SIZE)
+    )
+    return AsyncStreamingJsonResponse({"applications" : app_list})
+
+@jwt_required
+async def applicationDetail(request, application_id):
+    try:
+        fields = APPLICATION_DETAIL.parse_fields(request, extra=('job', 'company'))
+    except InvalidFields as e:
+        return JsonResponse({'error' : f'Invalid fields: {e}'}, status=400)
+
+    application = await aget_object_or_404(
+        APPLICATION_DETAIL.project(Application.objects, fields, extra=['job_id']),
+        id = application_id,
+        applicant=request.user
+    )
+    data = APPLICATION_DETAIL.serialize(application, request, fields)
+
+    if fields is None or {'job', 'company'} & fields:
+        add_job_sections(data, await acached_job(request, application['job_id']), request, fields)
+    return JsonResponse(data)
@@ -0,0 +1,127 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Max, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import ApplicationDailyStat, ApplicationEvent, RollupState
+
+
+ROLLUP_NAME = 'application_daily_stats'
+STAT_FIELDS = ('applied', 'shortlisted', 'rejected', 'withdrawn')
+MAX_RANGE_DAYS = 366
+
+
+def rollup_events(batch_size=10000):
+    """
+    Fold ApplicationEvents past the watermark into ApplicationDailyStat, one
+    transaction per batch. Events younger than APPLICATION_ROLLUP_LAG_SECONDS
+    are left for the next run: ids are handed out before commit, so a
+    recent gap may still be filled by a transaction in flight. Returns the
+    number of events folded.
+    """
+    lag = timedelta(seconds=getattr(settings, 'APPLICATION_ROLLUP_LAG_SECONDS', 60))
+    RollupState.objects.get_or_create(name=ROLLUP_NAME)
+    folded = 0
+    while True:
+        with transaction.atomic():
+            # Locking the state row keeps two rollup runs from double counting.
+            state = RollupState.objects.select_for_update().get(name=ROLLUP_NAME)
+            settled = ApplicationEvent.objects.filter(
+                id__gt=state.last_event_id,
+                created_at__lte=timezone.now() - lag
+            )
+            upto = settled.order_by('id').values_list('id', flat=True)[batch_size - 1:batch_size].first()
+            if upto is None:
+                upto = settled.aggregate(last=Max('id'))['last']
+            if upto is None:
+                return folded
+
+            batch = ApplicationEvent.objects.filter(id__gt=state.last_event_id, id__lte=upto)
+            rows = (
+                batch
+                .annotate(date=TruncDate('created_at'))
+                .values('job_id', 'job__company_id', 'date', 'to_status')
+                .annotate(n=Count('id'))
+                .order_by()
+            )
+            _add_to_stats(rows)
+
+            folded += batch.count()
+            state.last_event_id = upto
+            state.save(update_fields=['last_event_id', 'updated_at'])
+
+
+def _add_to_stats(rows):
+    totals = {}
+    for row in rows:
+        key = (row['job_id'], row['date'])
+        entry = totals.setdefault(key, {'company_id': row['job__company_id']})
+        entry[row['to_status']] = entry.get(row['to_status'], 0) + row['n']
+
+    existing = {
+        (stat.job_id, stat.date): stat
+        for stat in ApplicationDailyStat.objects.filter(
+            job_id__in={job_id for job_id, _ in totals},
+            date__in={date for _, date in totals}
+        )
+    }
+    created, updated = [], []
+    for (job_id, date), counts in totals.items():
+        stat = existing.get((job_id, date))
+        if stat is None:
+            stat = ApplicationDailyStat(job_id=job_id, company_id=counts['company_id'], date=date)
+            created.append(stat)
+        else:
+            updated.append(stat)
+        for field in STAT_FIELDS:
+            setattr(stat, field, getattr(stat, field) + counts.get(field, 0))
+    ApplicationDailyStat.objects.bulk_create(created, batch_size=500)
+    ApplicationDailyStat.objects.bulk_update(updated, STAT_FIELDS, batch_size=500)
+
+
+def _rate(part, whole):
+    return round(part / whole, 4) if whole else None
+
+
+def funnel(stats, start, end):
+    """
+    Daily series (every day in [start, end], zeros included) and totals
+    for a queryset of ApplicationDailyStat rows. Conversion is the number
+    of shortlisted / rejected decisions per application received.
+    """
+    per_day = {
+        row['date']: row
+        for row in stats.filter(date__gte=start, date__lte=end)
+        .values('date')
+        .annotate(**{field: Sum(field) for field in STAT_FIELDS})
+        .order_by()
+    }
+    days = []
+    totals = dict.fromkeys(STAT_FIELDS, 0)
+    date = start
+    while date <= end:
+        row = per_day.get(date, {})
+        counts = {field: row.get(field) or 0 for field in STAT_FIELDS}
+        for field in STAT_FIELDS:
+            totals[field] += counts[field]
+        days.append({
+            'date': date.isoformat(),
+            **counts,
+            'shortlist_rate': _rate(counts['shortlisted'], counts['applied']),
+            'reject_rate': _rate(counts['rejected'], counts['applied']),
+        })
+        date += timedelta(days=1)
+
+    return {
+        'from': start.isoformat(),
+        'to': end.isoformat(),
+        'totals': totals,
+        'conversion': {
+            'applied_to_shortlisted': _rate(totals['shortlisted'], totals['applied']),
+            'applied_to_rejected': _rate(totals['rejected'], totals['applied']),
+        },
+        'days': days,
+    }
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from applications.stats import COUNTER_FIELDS, actual_counts
+from jobs.models import Job
+
+
+class Command(BaseCommand):
+    help = "Recompute the per-job application counters and fix any that drifted"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help="Report drift without fixing it")
+
+    def handle(self, *args, **options):
+        fields = ['applications_total', *COUNTER_FIELDS.values()]
+        counts = actual_counts()
+        zero = dict.fromkeys(fields, 0)
+
+        drifted = []
+        checked = 0
+        for job in Job.objects.only('id', *fields).iterator(chunk_size=1000):
+            checked += 1
+            expected = counts.get(job.id, zero)
+            if any(getattr(job, field) != expected[field] for field in fields):
+                for field in fields:
+                    setattr(job, field, expected[field])
+                drifted.append(job)
+
+        if drifted and not options['dry_run']:
+            with transaction.atomic():
+                Job.objects.bulk_update(drifted, fields, batch_size=500)
+
+        action = "Found" if options['dry_run'] else "Fixed"
+        self.stdout.write(self.style.SUCCESS(f"Checked {checked} jobs. {action} {len(drifted)} with drifted counters"))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from applications.funnel import rollup_events
+
+
+class Command(BaseCommand):
+    help = "Fold new application status events into the daily funnel stats (run from cron every few minutes)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=10000)
+
+    def handle(self, *args, **options):
+        folded = rollup_events(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Folded {folded} events into daily stats"))
@@ -0,0 +1,52 @@
+# Generated by Django 6.0 on 2026-10-18 12:07
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def withdraw_duplicate_applications(apps, schema_editor):
+    # Double submits from before the constraint: keep the most advanced
+    # (shortlisted first), then the earliest, application per applicant and
+    # job and mark the rest withdrawn.
+    Application = apps.get_model('applications', 'Application')
+    active = (
+        Application.objects
+        .filter(status__in=['applied', 'shortlisted'])
+        .order_by('applicant_id', 'job_id', '-status', 'applied_on', 'id')
+        .values_list('id', 'applicant_id', 'job_id')
+    )
+    seen = set()
+    duplicates = []
+    for application_id, applicant_id, job_id in active.iterator():
+        if (applicant_id, job_id) in seen:
+            duplicates.append(application_id)
+        else:
+            seen.add((applicant_id, job_id))
+    for start in range(0, len(duplicates), 500):
+        Application.objects.filter(id__in=duplicates[start:start + 500]).update(status='withdrawn')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('applications', '0003_listing_indexes'),
+        ('jobs', '0007_coordinates'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(withdraw_duplicate_applications, migrations.RunPython.noop),
+        migrations.AddField(
+            model_name='application',
+            name='idempotency_key',
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+        migrations.AddConstraint(
+            model_name='application',
+            constraint=models.UniqueConstraint(condition=models.Q(('status__in', ['applied', 'shortlisted'])), fields=('applicant', 'job'), name='app_one_active_per_job'),
+        ),
+        migrations.AddConstraint(
+            model_name='application',
+            constraint=models.UniqueConstraint(fields=('applicant', 'idempotency_key'), name='app_idempotency_key_uniq'),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 6.0 on 2026-10-18 14:02
+
+from django.db import migrations
+from django.db.models import OuterRef, Subquery
+
+
+def backfill_applied_events(apps, schema_editor):
+    # Applications from before the event log get their 'applied' event, dated
+    # applied_on, so the funnel's history does not start at this deploy; the
+    # next rollup_application_events run folds them into the daily stats.
+    # Earlier shortlist/reject decisions were never timestamped and stay out.
+    Application = apps.get_model('applications', 'Application')
+    ApplicationEvent = apps.get_model('applications', 'ApplicationEvent')
+    logged = ApplicationEvent.objects.filter(from_status__isnull=True).values('application_id')
+    missing = list(
+        Application.objects.exclude(id__in=logged).order_by('id').values_list('id', 'job_id')
+    )
+    applied_on = Application.objects.filter(id=OuterRef('application_id')).values('applied_on')[:1]
+    for start in range(0, len(missing), 500):
+        chunk = missing[start:start + 500]
+        ApplicationEvent.objects.bulk_create([
+            ApplicationEvent(application_id=application_id, job_id=job_id, from_status=None, to_status='applied')
+            for application_id, job_id in chunk
+        ])
+        # created_at is auto_now_add; move it back in a second step.
+        ApplicationEvent.objects.filter(
+            application_id__in=[application_id for application_id, _ in chunk],
+            from_status__isnull=True,
+        ).update(created_at=Subquery(applied_on))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('applications', '0005_funnel_rollups'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_applied_events, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,10 @@
 from django.db import models
+from django.db.models import Q
 from django.contrib.auth.models import User
-from jobs.models import Job
+from jobs.models import Company, Job
+
+ACTIVE_STATUSES = ['applied', 'shortlisted']
+
 
 # Create your models here.
 class Application(models.Model):
@@ -16,6 +20,64 @@ class Application(models.Model):
     cover_letter = models.TextField(blank=True, null=True)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='applied')
     applied_on = models.DateTimeField(auto_now_add=True)
+    # Client-supplied Idempotency-Key of the apply request that created this row.
+    idempotency_key = models.CharField(max_length=64, blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            # viewMyApplications
+            models.Index(fields=['applicant', 'status', '-applied_on'], name='app_applicant_status_idx'),
+            # viewApplicationsForJob
+            models.Index(fields=['job', '-applied_on'], name='app_job_applied_idx'),
+            # applyToJob duplicate check
+            models.Index(fields=['applicant', 'job', 'status'], name='app_applicant_job_status_idx'),
+        ]
+        constraints = [
+            # At most one live application per applicant and job. Not
+            # enforced on databases without partial indexes (MySQL), where
+            # applyToJob serializes on the job row instead.
+            models.UniqueConstraint(
+                fields=['applicant', 'job'],
+                condition=Q(status__in=ACTIVE_STATUSES),
+                name='app_one_active_per_job'
+            ),
+            models.UniqueConstraint(fields=['applicant', 'idempotency_key'], name='app_idempotency_key_uniq'),
+        ]
 
     def __str__(self):
-        return f"{self.applicant.username} -> {self.job.title}"
\ No newline at end of file
+        return f"{self.applicant.username} -> {self.job.title}"
+
+
+class ApplicationEvent(models.Model):
+    """Append-only log of status changes; from_status is empty for a new application."""
+    application = models.ForeignKey(Application, on_delete=models.CASCADE, related_name='events')
+    job = models.ForeignKey(Job, on_delete=models.CASCADE)
+    from_status = models.CharField(max_length=20, blank=True, null=True)
+    to_status = models.CharField(max_length=20)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+
+class ApplicationDailyStat(models.Model):
+    """Per job and day: applications received and status changes made that day."""
+    job = models.ForeignKey(Job, on_delete=models.CASCADE)
+    company = models.ForeignKey(Company, on_delete=models.CASCADE)
+    date = models.DateField()
+    applied = models.PositiveIntegerField(default=0)
+    shortlisted = models.PositiveIntegerField(default=0)
+    rejected = models.PositiveIntegerField(default=0)
+    withdrawn = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['job', 'date'], name='app_daily_stat_job_date_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['company', 'date'], name='app_daily_stat_company_idx'),
+        ]
+
+
+class RollupState(models.Model):
+    """Id of the last ApplicationEvent folded into the daily stats."""
+    name = models.CharField(max_length=50, unique=True)
+    last_event_id = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
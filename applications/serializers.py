@@ -0,0 +1,44 @@
+from jobs.serializers import JOB_DETAIL, Field, Shape, as_absolute_url, as_date, as_datetime, as_file_url
+
+
+MY_APPLICATION = Shape({
+    'id' : 'id',
+    'job_id' : 'job_id',
+    'job_title' : 'job__title',
+    'company' : 'job__company__name',
+    'company_logo' : Field('job__company__logo', as_absolute_url),
+    'applied_on' : Field('applied_on', as_date),
+    'status': 'status',
+})
+
+APPLICATION_DETAIL = Shape({
+    'application_id' : 'id',
+    'status' : 'status',
+    'applied_on': Field('applied_on', as_datetime),
+    'cover_letter' : 'cover_letter',
+    'resume' : Field('resume', as_file_url),
+})
+
+# applicationDetail's `job` and `company` come from the cached JOB_DETAIL
+# payload (jobs.object_cache); these are the keys taken from it.
+APPLICATION_DETAIL_JOB = ('id', 'title', 'location', 'job_type', 'min_salary', 'max_salary', 'deadline')
+APPLICATION_DETAIL_COMPANY = ('name', 'logo', 'website')
+
+JOB_APPLICATION = Shape({
+    'application_id': 'id',
+    'applicant': 'applicant__username',
+    'status': 'status',
+    'applied_on': Field('applied_on', as_date),
+    'resume': Field('resume', as_file_url),
+    'cover_letter': 'cover_letter',
+})
+
+
+def add_job_sections(data, job_entry, request, fields=None):
+    """Fill applicationDetail's `job` and `company` from a cached job entry (None if gone)."""
+    job = JOB_DETAIL.absolutize(job_entry['data'], request) if job_entry else {}
+    if fields is None or 'job' in fields:
+        data['job'] = {key: job.get(key) for key in APPLICATION_DETAIL_JOB}
+    if fields is None or 'company' in fields:
+        company = job.get('company') or {}
+        data['company'] = {key: company.get(key) for key in APPLICATION_DETAIL_COMPANY}
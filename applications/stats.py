@@ -0,0 +1,77 @@
+from collections import Counter, defaultdict
+from functools import partial
+
+from django.db import transaction
+from django.db.models import Count, F
+from django.db.models.functions import Greatest
+
+from jobs.models import Job
+from .models import Application, ApplicationEvent
+
+
+COUNTER_FIELDS = {status: f'applications_{status}' for status, _ in Application.STATUS_CHOICES}
+
+
+def apply_transitions(transitions):
+    """
+    Record status changes, given as (application_id, job_id, old status,
+    new status) with old status None for a new application: one UPDATE
+    with F() expressions per affected job for the counters, and one bulk
+    INSERT into the event log. Call it in the same transaction as the
+    status write.
+    """
+    deltas = defaultdict(Counter)
+    events = []
+    for application_id, job_id, old_status, new_status in transitions:
+        if old_status == new_status:
+            continue
+        events.append(ApplicationEvent(
+            application_id=application_id,
+            job_id=job_id,
+            from_status=old_status,
+            to_status=new_status
+        ))
+        if old_status is None:
+            deltas[job_id]['applications_total'] += 1
+        else:
+            deltas[job_id][COUNTER_FIELDS[old_status]] -= 1
+        deltas[job_id][COUNTER_FIELDS[new_status]] += 1
+
+    for job_id, delta in deltas.items():
+        # Decrements stop at zero: a drifted counter is left for
+        # reconcile_application_counts instead of failing the write. updated_at
+        # stays put; companyDetails versions the counts on their own.
+        changes = {
+            field: F(field) + change if change > 0 else Greatest(F(field) + change, 0)
+            for field, change in delta.items() if change
+        }
+        if changes:
+            Job.objects.filter(id=job_id).update(**changes)
+    ApplicationEvent.objects.bulk_create(events)
+
+
+def apply_transitions_on_commit(transitions, using=None):
+    """
+    apply_transitions() in a transaction of its own once the current one on
+    `using` commits (right away outside one), for writes that should stay a
+    single statement. A crash in between loses the counter changes and
+    events; reconcile_counts repairs the counters.
+    """
+    transaction.on_commit(partial(_apply_transitions_atomically, transitions), using=using)
+
+
+def _apply_transitions_atomically(transitions):
+    with transaction.atomic():
+        apply_transitions(transitions)
+
+
+def actual_counts(job_ids=None):
+    """{job_id: {counter field: value}} recomputed from the applications table."""
+    rows = Application.objects.values('job_id', 'status').annotate(n=Count('id')).order_by()
+    if job_ids is not None:
+        rows = rows.filter(job_id__in=job_ids)
+    counts = defaultdict(lambda: dict.fromkeys(['applications_total', *COUNTER_FIELDS.values()], 0))
+    for row in rows:
+        counts[row['job_id']][COUNTER_FIELDS[row['status']]] = row['n']
+        counts[row['job_id']]['applications_total'] += row['n']
+    return counts
@@ -1,3 +1,441 @@
-from django.test import TestCase
+import json
+from datetime import timedelta
+from unittest import skipUnless
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.db import IntegrityError, connection, transaction
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from jobs.models import Job, Company
+from jobs.object_cache import object_cache
+from jobs.tests import QueryPlanAssertions, bearer
+from .funnel import rollup_events
+from .models import Application, ApplicationEvent
+from .stats import apply_transitions
+
+
+class ApplicationQueryPlanTests(QueryPlanAssertions, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        recruiter = User.objects.create_user('plan-recruiter', 'plan@example.com', 'password')
+        cls.applicants = [
+            User.objects.create_user(f'plan-applicant-{i}', f'applicant{i}@example.com', 'password')
+            for i in range(20)
+        ]
+        company = Company.objects.create(name='Plan Co', description='Seeded company', owner=recruiter)
+        deadline = timezone.now().date() + timedelta(days=30)
+        cls.jobs = [
+            Job.objects.create(
+                title=f'Engineer {i}',
+                company=company,
+                description='Seeded job description',
+                skills_required='python',
+                min_salary=1000,
+                max_salary=2000,
+                location='Pune',
+                job_type='full-time',
+                application_deadline=deadline,
+            )
+            for i in range(15)
+        ]
+        statuses = [choice for choice, _ in Application.STATUS_CHOICES]
+        Application.objects.bulk_create([
+            Application(applicant=applicant, job=job, status=statuses[(i + j) % len(statuses)])
+            for i, applicant in enumerate(cls.applicants)
+            for j, job in enumerate(cls.jobs)
+        ])
+        cls.prepare_planner()
+
+    def test_view_my_applications(self):
+        applications = (
+            Application.objects.filter(applicant=self.applicants[0])
+            .exclude(status='withdrawn')
+            .select_related('job', 'job__company')
+            .order_by('-applied_on')
+        )
+        self.assertNoSequentialScan(applications)
+
+    def test_application_detail(self):
+        application = Application.objects.filter(applicant=self.applicants[0]).first()
+        applications = Application.objects.select_related('job', 'job__company').filter(
+            id=application.id, applicant=self.applicants[0]
+        )
+        self.assertNoSequentialScan(applications)
+
+    def test_view_applications_for_job(self):
+        applications = (
+            Application.objects.filter(job=self.jobs[0])
+            .select_related('applicant')
+            .order_by('-applied_on')
+        )
+        self.assertNoSequentialScan(applications)
+
+    def test_apply_duplicate_check(self):
+        applications = Application.objects.filter(
+            applicant=self.applicants[0], job=self.jobs[0], status__in=['applied', 'shortlisted']
+        )
+        self.assertNoSequentialScan(applications)
+
+
+class ApplicationStatusTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.recruiter = User.objects.create_user('status-recruiter', 'recruiter@example.com', 'password')
+        cls.recruiter.profile.role = 'recruiter'
+        cls.recruiter.profile.save()
+        cls.applicant = User.objects.create_user('status-applicant', 'applicant@example.com', 'password')
+        company = Company.objects.create(name='Status Co', description='Seeded company', owner=cls.recruiter)
+        deadline = timezone.now().date() + timedelta(days=30)
+        cls.jobs = [
+            Job.objects.create(
+                title=f'Engineer {i}',
+                company=company,
+                description='Seeded job description',
+                skills_required='python',
+                min_salary=1000,
+                max_salary=2000,
+                location='Pune',
+                job_type='full-time',
+                application_deadline=deadline,
+            )
+            for i in range(2)
+        ]
+
+    def setUp(self):
+        # Rolled-back edits of earlier tests may still be cached.
+        object_cache.invalidate('job', *(job.id for job in self.jobs))
+
+    def post_apply(self, job, **headers):
+        return self.client.post(
+            f'/applications/apply/{job.id}', {'cover_letter': 'Hello'}, **bearer(self.applicant), **headers
+        )
+
+    def apply(self, job, **headers):
+        # Counters and the event log are written once the application commits.
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.post_apply(job, **headers)
+
+    def change_status(self, application_id, new_status):
+        return self.client.post(
+            f'/applications/changeStatus/{application_id}/',
+            json.dumps({'new_status': new_status}),
+            content_type='application/json',
+            **bearer(self.recruiter)
+        )
+
+    def change_status_bulk(self, application_ids, new_status):
+        return self.client.post(
+            '/applications/changeStatus/bulk/',
+            json.dumps({'new_status': new_status, 'application_ids': application_ids}),
+            content_type='application/json',
+            **bearer(self.recruiter)
+        )
+
+    def rejected_then_reapplied(self):
+        first = self.apply(self.jobs[0]).json()['application_id']
+        self.assertEqual(self.change_status(first, 'rejected').status_code, 200)
+        second = self.apply(self.jobs[0]).json()['application_id']
+        return first, second
+
+    @skipUnless(connection.features.supports_partial_indexes, "needs partial indexes")
+    def test_one_active_application_per_job(self):
+        Application.objects.create(applicant=self.applicant, job=self.jobs[0])
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Application.objects.create(applicant=self.applicant, job=self.jobs[0], status='shortlisted')
+        # Inactive ones may pile up.
+        Application.objects.create(applicant=self.applicant, job=self.jobs[0], status='rejected')
+
+    def test_duplicate_apply(self):
+        self.assertEqual(self.apply(self.jobs[0]).status_code, 200)
+        self.assertEqual(self.apply(self.jobs[0]).status_code, 400)
+        self.assertEqual(Application.objects.filter(applicant=self.applicant).count(), 1)
+
+    @skipUnless(connection.features.supports_partial_indexes, "needs partial indexes")
+    def test_apply_is_one_write(self):
+        with CaptureQueriesContext(connection) as queries, self.captureOnCommitCallbacks() as callbacks:
+            self.assertEqual(self.post_apply(self.jobs[0]).status_code, 200)
+        writes = [
+            q['sql'] for q in queries
+            if not q['sql'].startswith(('SELECT', 'SAVEPOINT', 'RELEASE')) and 'django_cache' not in q['sql']
+        ]
+        self.assertEqual(len(writes), 1)
+        self.assertIn('INSERT INTO "applications_application"', writes[0])
+
+        # Counters and the event log follow once it commits.
+        for callback in callbacks:
+            callback()
+        self.jobs[0].refresh_from_db()
+        self.assertEqual(self.jobs[0].applications_total, 1)
+        self.assertEqual(ApplicationEvent.objects.filter(job=self.jobs[0]).count(), 1)
+
+    def test_apply_to_closed_job(self):
+        self.jobs[1].application_deadline = timezone.now().date() - timedelta(days=1)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.jobs[1].save()
+        self.assertEqual(self.apply(self.jobs[1]).status_code, 400)
+        self.assertEqual(self.client.post('/applications/apply/0', **bearer(self.applicant)).status_code, 404)
+
+    def test_counter_drift_does_not_fail_the_write(self):
+        application = Application.objects.create(applicant=self.applicant, job=self.jobs[0])
+        # The counters never saw this application.
+        apply_transitions([(application.id, self.jobs[0].id, 'applied', 'withdrawn')])
+        self.jobs[0].refresh_from_db()
+        self.assertEqual(self.jobs[0].applications_applied, 0)
+        self.assertEqual(self.jobs[0].applications_withdrawn, 1)
+
+    def test_company_etag_follows_counters(self):
+        url = f'/jobs/company/{self.jobs[0].company_id}/'
+        etag = self.client.get(url, **bearer(self.recruiter))['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag, **bearer(self.recruiter)).status_code, 304)
+
+        updated_at = Job.objects.get(id=self.jobs[0].id).updated_at
+        self.apply(self.jobs[0])
+        self.assertEqual(Job.objects.get(id=self.jobs[0].id).updated_at, updated_at)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag, **bearer(self.recruiter))
+        self.assertEqual(response.status_code, 200)
+        totals = {job['id']: job['applications']['total'] for job in response.json()['company']['jobs']}
+        self.assertEqual(totals, {self.jobs[0].id: 1, self.jobs[1].id: 0})
+
+    def test_idempotency_key_replay(self):
+        first = self.apply(self.jobs[0], HTTP_IDEMPOTENCY_KEY='key-1')
+        replay = self.apply(self.jobs[0], HTTP_IDEMPOTENCY_KEY='key-1')
+        self.assertEqual(replay.status_code, 200)
+        self.assertEqual(replay.json()['application_id'], first.json()['application_id'])
+        self.assertEqual(Application.objects.filter(applicant=self.applicant).count(), 1)
+        self.jobs[0].refresh_from_db()
+        self.assertEqual(self.jobs[0].applications_total, 1)
+
+    def test_idempotency_key_reused_for_another_job(self):
+        self.apply(self.jobs[0], HTTP_IDEMPOTENCY_KEY='key-1')
+        response = self.apply(self.jobs[1], HTTP_IDEMPOTENCY_KEY='key-1')
+        self.assertEqual(response.status_code, 422)
+        self.assertFalse(Application.objects.filter(job=self.jobs[1]).exists())
+
+    def test_change_status_conflict(self):
+        first, second = self.rejected_then_reapplied()
+        response = self.change_status(first, 'shortlisted')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(Application.objects.get(id=first).status, 'rejected')
+        # Moving it to another inactive status is fine.
+        self.assertEqual(self.change_status(first, 'rejected').status_code, 200)
+
+    def test_change_status_bulk_conflict(self):
+        first, second = self.rejected_then_reapplied()
+        other = self.apply(self.jobs[1]).json()['application_id']
+        response = self.change_status_bulk([first, second, other], 'shortlisted')
+        self.assertEqual(response.status_code, 200)
+        results = {row['application_id']: row['result'] for row in response.json()['results']}
+        self.assertEqual(results, {first: 'conflict', second: 'updated', other: 'updated'})
+        self.assertEqual(Application.objects.get(id=first).status, 'rejected')
+        self.assertEqual(Application.objects.get(id=second).status, 'shortlisted')
+
+
+    def test_change_status_bulk_outcomes(self):
+        other_recruiter = User.objects.create_user('other-recruiter', 'other@example.com', 'password')
+        other_company = Company.objects.create(name='Other Co', description='d', owner=other_recruiter)
+        other_job = Job.objects.create(
+            title='Elsewhere', company=other_company, description='d', skills_required='python',
+            min_salary=1, max_salary=2, location='Pune', job_type='full-time',
+            application_deadline=timezone.now().date() + timedelta(days=30),
+        )
+        updated = self.apply(self.jobs[0]).json()['application_id']
+        withdrawn = self.apply(self.jobs[1]).json()['application_id']
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(f'/applications/withdrawApplication/{withdrawn}/', **bearer(self.applicant))
+        self.assertEqual(response.status_code, 200)
+        not_owned = Application.objects.create(applicant=self.applicant, job=other_job).id
+
+        response = self.change_status_bulk([updated, withdrawn, not_owned, 999999, updated], 'shortlisted')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {
+            'new_status': 'shortlisted',
+            'updated': 1,
+            'results': [
+                {'application_id': updated, 'result': 'updated'},
+                {'application_id': withdrawn, 'result': 'withdrawn'},
+                {'application_id': not_owned, 'result': 'not_found'},
+                {'application_id': 999999, 'result': 'not_found'},
+            ],
+        })
+        self.assertEqual(Application.objects.get(id=not_owned).status, 'applied')
+        self.jobs[0].refresh_from_db()
+        self.assertEqual((self.jobs[0].applications_applied, self.jobs[0].applications_shortlisted), (0, 1))
+
+    def test_change_status_bulk_rejects_bad_input(self):
+        for body in ({'new_status': 'applied', 'application_ids': [1]},
+                     {'new_status': 'rejected', 'application_ids': []},
+                     {'new_status': 'rejected', 'application_ids': ['x']},
+                     {'new_status': 'rejected', 'application_ids': list(range(501))}):
+            with self.subTest(body=body):
+                response = self.change_status_bulk(body['application_ids'], body['new_status'])
+                self.assertEqual(response.status_code, 400)
+
+
+@override_settings(APPLICATION_ROLLUP_LAG_SECONDS=0)
+class FunnelTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.recruiter = User.objects.create_user('funnel-recruiter', 'recruiter@example.com', 'password')
+        cls.recruiter.profile.role = 'recruiter'
+        cls.recruiter.profile.save()
+        company = Company.objects.create(name='Funnel Co', description='Seeded company', owner=cls.recruiter)
+        cls.job = Job.objects.create(
+            title='Engineer', company=company, description='d', skills_required='python',
+            min_salary=1, max_salary=2, location='Pune', job_type='full-time',
+            application_deadline=timezone.now().date() + timedelta(days=30),
+        )
+        applications = [
+            Application.objects.create(
+                applicant=User.objects.create_user(f'funnel-applicant-{i}', f'applicant{i}@example.com', 'password'),
+                job=cls.job,
+            )
+            for i in range(3)
+        ]
+        apply_transitions([(application.id, cls.job.id, None, 'applied') for application in applications])
+        cls.today = timezone.now().date()
+        # Two of them arrived yesterday.
+        ApplicationEvent.objects.filter(application__in=applications[:2]).update(
+            created_at=timezone.now() - timedelta(days=1)
+        )
+        apply_transitions([
+            (applications[0].id, cls.job.id, 'applied', 'shortlisted'),
+            (applications[1].id, cls.job.id, 'applied', 'rejected'),
+        ])
+
+    def get_funnel(self, **params):
+        params = {'from': (self.today - timedelta(days=1)).isoformat(), 'to': self.today.isoformat(), **params}
+        return self.client.get('/applications/analytics/funnel/', params, **bearer(self.recruiter))
+
+    def test_rollup_feeds_the_funnel(self):
+        self.assertEqual(rollup_events(batch_size=2), 5)
+        # Nothing is counted twice.
+        self.assertEqual(rollup_events(), 0)
+
+        data = self.get_funnel(job_id=self.job.id).json()
+        self.assertEqual(data['job_id'], self.job.id)
+        self.assertIsNotNone(data['as_of'])
+        self.assertEqual(data['totals'], {'applied': 3, 'shortlisted': 1, 'rejected': 1, 'withdrawn': 0})
+        self.assertEqual(data['conversion'], {'applied_to_shortlisted': 0.3333, 'applied_to_rejected': 0.3333})
+        self.assertEqual(
+            [(day['date'], day['applied'], day['shortlisted'], day['shortlist_rate']) for day in data['days']],
+            [
+                ((self.today - timedelta(days=1)).isoformat(), 2, 0, 0.0),
+                (self.today.isoformat(), 1, 1, 1.0),
+            ]
+        )
+
+    def test_recent_events_wait_for_the_next_run(self):
+        with override_settings(APPLICATION_ROLLUP_LAG_SECONDS=3600):
+            self.assertEqual(rollup_events(), 2)
+        self.assertEqual(self.get_funnel().json()['totals']['applied'], 2)
+        self.assertEqual(rollup_events(), 3)
+        self.assertEqual(self.get_funnel().json()['totals']['applied'], 3)
+
+    def test_only_own_companies(self):
+        rollup_events()
+        other = User.objects.create_user('funnel-other', 'other@example.com', 'password')
+        other.profile.role = 'recruiter'
+        other.profile.save()
+        response = self.client.get('/applications/analytics/funnel/', **bearer(other))
+        self.assertEqual(response.json()['totals'], {'applied': 0, 'shortlisted': 0, 'rejected': 0, 'withdrawn': 0})
+
+    def test_bad_range(self):
+        self.assertEqual(self.get_funnel(to='yesterday').status_code, 400)
+        self.assertEqual(self.get_funnel(**{'from': '2020-01-01'}).status_code, 400)
+
+
+class WithdrawDuplicatesMigrationTests(TransactionTestCase):
+    migrate_from = [('applications', '0003_listing_indexes')]
+    migrate_to = [('applications', '0004_active_application_constraint')]
+
+    def setUp(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(self.migrate_from)
+        self.addCleanup(self.migrate_latest)
+        # Migrations of other apps that depend on later ones were rolled back too.
+        applied = MigrationExecutor(connection).loader.applied_migrations
+        apps = executor.loader.project_state(list(applied)).apps
+        User = apps.get_model('auth', 'User')
+        Company = apps.get_model('jobs', 'Company')
+        Job = apps.get_model('jobs', 'Job')
+        Application = apps.get_model('applications', 'Application')
+
+        recruiter = User.objects.create(username='migration-recruiter')
+        applicant = User.objects.create(username='migration-applicant')
+        company = Company.objects.create(name='Migration Co', description='d', owner=recruiter)
+        job = Job.objects.create(
+            title='Engineer', company=company, description='d', skills_required='python',
+            min_salary=1, max_salary=2, location='Pune', job_type='full-time',
+            application_deadline=timezone.now().date(),
+        )
+        create = lambda status: Application.objects.create(applicant_id=applicant.id, job_id=job.id, status=status).id
+        self.applied = [create('applied'), create('applied')]
+        self.shortlisted = create('shortlisted')
+        self.rejected = create('rejected')
+
+    def migrate_latest(self):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(executor.loader.graph.leaf_nodes())
+
+    def test_keeps_most_advanced_application(self):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(self.migrate_to)
+        Application = executor.loader.project_state(self.migrate_to).apps.get_model('applications', 'Application')
+        statuses = dict(Application.objects.values_list('id', 'status'))
+        self.assertEqual(statuses[self.shortlisted], 'shortlisted')
+        self.assertEqual([statuses[i] for i in self.applied], ['withdrawn', 'withdrawn'])
+        self.assertEqual(statuses[self.rejected], 'rejected')
+
+
+class BackfillAppliedEventsMigrationTests(TransactionTestCase):
+    migrate_from = [('applications', '0005_funnel_rollups')]
+    migrate_to = [('applications', '0006_backfill_applied_events')]
+
+    def setUp(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(self.migrate_from)
+        self.addCleanup(self.migrate_latest)
+        applied = MigrationExecutor(connection).loader.applied_migrations
+        apps = executor.loader.project_state(list(applied)).apps
+        User = apps.get_model('auth', 'User')
+        Company = apps.get_model('jobs', 'Company')
+        Job = apps.get_model('jobs', 'Job')
+        Application = apps.get_model('applications', 'Application')
+        ApplicationEvent = apps.get_model('applications', 'ApplicationEvent')
+
+        recruiter = User.objects.create(username='backfill-recruiter')
+        applicant = User.objects.create(username='backfill-applicant')
+        company = Company.objects.create(name='Backfill Co', description='d', owner=recruiter)
+        job = Job.objects.create(
+            title='Engineer', company=company, description='d', skills_required='python',
+            min_salary=1, max_salary=2, location='Pune', job_type='full-time',
+            application_deadline=timezone.now().date(),
+        )
+        self.applied_on = timezone.now() - timedelta(days=40)
+        self.old = Application.objects.create(applicant_id=applicant.id, job_id=job.id, status='rejected').id
+        Application.objects.filter(id=self.old).update(applied_on=self.applied_on)
+        # Applied after the event log existed: already has its event.
+        self.logged = Application.objects.create(applicant_id=applicant.id, job_id=job.id).id
+        ApplicationEvent.objects.create(application_id=self.logged, job_id=job.id, to_status='applied')
+
+    def migrate_latest(self):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(executor.loader.graph.leaf_nodes())
+
+    def test_backfills_missing_applied_events(self):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(self.migrate_to)
+        ApplicationEvent = executor.loader.project_state(self.migrate_to).apps.get_model('applications', 'ApplicationEvent')
+        events = ApplicationEvent.objects.values_list('from_status', 'to_status', 'created_at')
+        self.assertEqual(list(events.filter(application_id=self.old)), [(None, 'applied', self.applied_on)])
+        self.assertEqual(events.filter(application_id=self.logged).count(), 1)
@@ -1,12 +1,15 @@
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import async_views, views
+
+read_views = async_views if settings.ASYNC_READ_VIEWS else views
 
 urlpatterns = [
    path('apply/<int:job_id>', views.applyToJob, name='apply_to_job'),
 
-   path('viewMyApplication/', views.viewMyApplications, name='view_my_applications'),
+   path('viewMyApplication/', read_views.viewMyApplications, name='view_my_applications'),
    
-   path('viewMyApplication/<int:application_id>/', views.applicationDetail, name='application_details'),
+   path('viewMyApplication/<int:application_id>/', read_views.applicationDetail, name='application_details'),
 
    path('withdrawApplication/<int:application_id>/', views.withdrawApplication, name='withdraw_application'),
 
@@ -14,5 +17,9 @@ urlpatterns = [
 
    path('changeStatus/<int:application_id>/', views.changeStatus, name='change_status'),
 
+   path('changeStatus/bulk/', views.changeStatusBulk, name='change_status_bulk'),
+
+   path('analytics/funnel/', views.funnelAnalytics, name='funnel_analytics'),
+
     
 ] 
@@ -1,87 +1,123 @@
 from django.http import JsonResponse
-from django.views.decorators.http import require_POST
+from django.views.decorators.http import require_GET, require_POST
+from django.utils.dateparse import parse_date
+from datetime import timedelta
 from django.shortcuts import get_object_or_404
+from django.db import IntegrityError, connection, transaction
 from jobs.models import Job
 from django.utils import timezone
-from .models import Application
+from .models import ACTIVE_STATUSES, Application, ApplicationDailyStat, RollupState
+from .funnel import MAX_RANGE_DAYS, ROLLUP_NAME, funnel
+from .stats import apply_transitions, apply_transitions_on_commit
 from accounts.decorators import recruiter_required, jwt_required
+from jobs.pagination import InvalidPage, cursor_paginate, wants_cursor
+from jobs.object_cache import cached_job
+from jobs.serializers import APPLICATION_COUNTS, InvalidFields
+from jobs.streaming import STREAM_CHUNK_SIZE, StreamedArray, StreamingJsonResponse
+from .serializers import APPLICATION_DETAIL, JOB_APPLICATION, MY_APPLICATION, add_job_sections
 from django.views.decorators.csrf import csrf_exempt
 import json
 # Create your views here.
+MAX_IDEMPOTENCY_KEY_LENGTH = 64
+
+def _applied(application_id):
+    return JsonResponse({"message" : "Application submitted successfully.", "application_id" : application_id})
+
 @jwt_required
+@require_POST
 @csrf_exempt
 def applyToJob(request, job_id):
+    user = request.user
+    idempotency_key = request.headers.get('Idempotency-Key') or None
+    if idempotency_key and len(idempotency_key) > MAX_IDEMPOTENCY_KEY_LENGTH:
+        return JsonResponse({"error" : "Idempotency-Key is too long"}, status=400)
 
-    if request.method == 'POST':
-
-        job = get_object_or_404(Job, id=job_id)
-        user = request.user
-
-        if job.application_deadline < timezone.now().date():
-            return JsonResponse({"error" : "This job application is closed."}, status=400)
-        
-        if Application.objects.filter(applicant=user, job=job, status__in =['applied', 'shortlisted']).exists():
-            return JsonResponse({"error" : "You have already applied to this job"}, status=400)
-        
-        application = Application.objects.create(
-            applicant=user,
-            job = job,
-            cover_letter = request.POST.get('cover_letter'),
-            resume = request.FILES.get('resume')
-        )
+    # Checked against the cached job, outside the write.
+    job = cached_job(request, job_id)
+    if job is None:
+        return JsonResponse({"error" : "Job not found"}, status=404)
+
+    if parse_date(job['data']['deadline']) < timezone.now().date():
+        return JsonResponse({"error" : "This job application is closed."}, status=400)
 
-        return JsonResponse({"message" : "Application submitted successfully."})
+    # The active-application constraint needs partial indexes; without them
+    # (MySQL) lock the job row so concurrent applies run one at a time.
+    # Otherwise this is a single INSERT: counters and the event log are
+    # updated after it commits.
+    enforced = connection.features.supports_partial_indexes
+    try:
+        with transaction.atomic():
+            if not enforced:
+                Job.objects.select_for_update().filter(id=job_id).values_list('id').first()
+                if Application.objects.filter(applicant=user, job_id=job_id, status__in=ACTIVE_STATUSES).exists():
+                    raise IntegrityError
+
+            application = Application.objects.create(
+                applicant=user,
+                job_id = job_id,
+                cover_letter = request.POST.get('cover_letter'),
+                resume = request.FILES.get('resume'),
+                idempotency_key = idempotency_key
+            )
+    except IntegrityError:
+        if idempotency_key:
+            # A retry of a request that already went through.
+            previous = Application.objects.filter(applicant=user, idempotency_key=idempotency_key).values_list('id', 'job_id').first()
+            if previous is not None:
+                if previous[1] != job_id:
+                    return JsonResponse({"error" : "Idempotency-Key was already used for another job"}, status=422)
+                return _applied(previous[0])
+        if not Job.objects.filter(id=job_id).exists():
+            # Deleted since it was cached.
+            return JsonResponse({"error" : "Job not found"}, status=404)
+        return JsonResponse({"error" : "You have already applied to this job"}, status=400)
+
+    apply_transitions_on_commit([(application.id, job_id, None, application.status)])
+    return _applied(application.id)
 
 @jwt_required
 def viewMyApplications(request):
     user = request.user
+    try:
+        fields = MY_APPLICATION.parse_fields(request)
+    except InvalidFields as e:
+        return JsonResponse({'error' : f'Invalid fields: {e}'}, status=400)
 
-    application = Application.objects.filter(applicant=user).exclude(status='withdrawn').select_related('job', 'job__company')
-
-    app_list = []
-    for app in application.order_by('-applied_on'):
-        app_list.append({
-            'id' : app.id,
-            'job_id' : app.job.id,
-            'job_title' : app.job.title,
-            'company' : app.job.company.name,
-            'company_logo' : request.build_absolute_uri(app.job.company.logo.url) if app.job.company.logo else None,
-            'applied_on' : app.applied_on.strftime("%Y-%m-%d"),
-            'status': app.status,
-        })
-    return JsonResponse({"applications" : app_list})
+    application = Application.objects.filter(applicant=user).exclude(status='withdrawn')
+    application = MY_APPLICATION.project(application, fields, extra=['applied_on'])
+
+    if wants_cursor(request):
+        try:
+            applications, page_info = cursor_paginate(request, application, 'applied_on')
+        except InvalidPage as e:
+            return JsonResponse({'error' : str(e)}, status=400)
+        app_list = [MY_APPLICATION.serialize(app, request, fields) for app in applications]
+        return JsonResponse({**page_info, "applications" : app_list})
+
+    app_list = StreamedArray(
+        MY_APPLICATION.serialize(app, request, fields)
+        for app in application.order_by('-applied_on').iterator(chunk_size=STREAM_CHUNK_SIZE)
+    )
+    return StreamingJsonResponse({"applications" : app_list})
 
 
 @jwt_required
 def applicationDetail(request, application_id):
+    try:
+        fields = APPLICATION_DETAIL.parse_fields(request, extra=('job', 'company'))
+    except InvalidFields as e:
+        return JsonResponse({'error' : f'Invalid fields: {e}'}, status=400)
+
     application = get_object_or_404(
-        Application.objects.select_related('job', 'job__company'),
+        APPLICATION_DETAIL.project(Application.objects, fields, extra=['job_id']),
         id = application_id,
         applicant=request.user
     )
+    data = APPLICATION_DETAIL.serialize(application, request, fields)
 
-    data = {
-        'application_id' : application_id,
-        'status' : application.status,
-        'applied_on': application.applied_on.strftime("%Y-%m-%d %H:%M"),
-        'cover_letter' : application.cover_letter,
-        'resume' : application.resume.url if application.resume else None,
-
-        'job' : {
-            'id' : application.job.id,
-            'title' : application.job.title,
-            'location' : application.job.location,
-            'job_type' : application.job.job_type,
-            'min_salary' : application.job.min_salary,
-            'max_salary' : application.job.max_salary,
-            'deadline' : application.job.application_deadline.strftime("%Y-%m-%d")
-        },
-        'company' : {
-            'name' : application.job.company.name,
-            'logo' : request.build_absolute_uri(application.job.company.logo.url) if application.job.company.logo else None,
-            'website' : application.job.company.website,
-        }
-    }
+    # Job and company come from the object cache instead of a join.
+    if fields is None or {'job', 'company'} & fields:
+        add_job_sections(data, cached_job(request, application['job_id']), request, fields)
     return JsonResponse(data)
 
 @jwt_required
@@ -94,20 +130,22 @@ def withdrawApplication(request, application_id):
             status=405
         )
     
-    application = get_object_or_404(
-        Application,
-        id=application_id,
-        applicant=request.user
-    )
-
-    if application.status != 'applied':
-        return JsonResponse(
-            {'error' : f'Applications cannot be withdrawn in {application.status}'},
-            status = 400
+    with transaction.atomic():
+        application = get_object_or_404(
+            Application.objects.select_for_update().only('id', 'job_id', 'status'),
+            id=application_id,
+            applicant=request.user
         )
-    
-    application.status = 'withdrawn'
-    application.save(update_fields=['status'])
+
+        if application.status != 'applied':
+            return JsonResponse(
+                {'error' : f'Applications cannot be withdrawn in {application.status}'},
+                status = 400
+            )
+
+        application.status = 'withdrawn'
+        application.save(update_fields=['status'])
+        apply_transitions([(application.id, application.job_id, 'applied', 'withdrawn')])
 
     return JsonResponse(
         {'message' : 'Application withdrawn successfully'}
@@ -117,39 +155,86 @@ def withdrawApplication(request, application_id):
 @jwt_required
 @recruiter_required
 def viewApplicationsForJob(request, job_id):
-    job = get_object_or_404(Job, id = job_id, company__owner = request.user)
+    job = get_object_or_404(
+        Job.objects.values('title', 'company__name', *APPLICATION_COUNTS.columns()),
+        id = job_id,
+        company__owner = request.user
+    )
+    try:
+        fields = JOB_APPLICATION.parse_fields(request)
+    except InvalidFields as e:
+        return JsonResponse({'error' : f'Invalid fields: {e}'}, status=400)
 
-    applications = Application.objects.filter(job=job).select_related('applicant').order_by('-applied_on')
+    applications = Application.objects.filter(job_id=job_id).order_by('-applied_on')
+    applications = JOB_APPLICATION.project(applications, fields, extra=['applied_on'])
 
-    app_list = []
+    job_data = {
+        'id': job_id,
+        'title': job['title'],
+        'company': job['company__name'],
+        'applications': APPLICATION_COUNTS.serialize(job, request),
+    }
 
-    for app in applications:
-        app_list.append({
-            'application_id': app.id,
-            'applicant': app.applicant.username,
-            'status': app.status,
-            'applied_on': app.applied_on.strftime("%Y-%m-%d"),
-            'resume': app.resume.url if app.resume else None,
-            'cover_letter': app.cover_letter,
+    if wants_cursor(request):
+        try:
+            applications, page_info = cursor_paginate(request, applications, 'applied_on')
+        except InvalidPage as e:
+            return JsonResponse({'error' : str(e)}, status=400)
+        return JsonResponse({
+            'job': job_data,
+            **page_info,
+            'applications': [JOB_APPLICATION.serialize(app, request, fields) for app in applications]
         })
 
-    return JsonResponse({
-        'job': {
-            'id': job_id,
-            'title': job.title,
-            'company': job.company.name,
-        },
-        'applications_count': applications.count(),
-        'applications': app_list
+    app_list = StreamedArray(
+        JOB_APPLICATION.serialize(app, request, fields)
+        for app in applications.iterator(chunk_size=STREAM_CHUNK_SIZE)
+    )
+    return StreamingJsonResponse({
+        'job': job_data,
+        'applications': app_list,
+        'applications_count': lambda: app_list.count,
     })
 
 
+def _reactivations_blocked(applications, new_status):
+    """
+    Ids among (id, applicant_id, job_id, status) rows that cannot move to
+    `new_status`: making an inactive application active again would give
+    the applicant two live applications for the job (app_one_active_per_job).
+    """
+    if new_status not in ACTIVE_STATUSES:
+        return set()
+    reviving = [row for row in applications if row[3] not in ACTIVE_STATUSES]
+    if not reviving:
+        return set()
+    taken = set(
+        Application.objects
+        .filter(
+            status__in=ACTIVE_STATUSES,
+            applicant_id__in={row[1] for row in reviving},
+            job_id__in={row[2] for row in reviving}
+        )
+        .exclude(id__in=[row[0] for row in applications])
+        .values_list('applicant_id', 'job_id')
+    )
+    # Rows already active in this set stay active and hold their pair.
+    taken.update((row[1], row[2]) for row in applications if row[3] in ACTIVE_STATUSES)
+    blocked = set()
+    for application_id, applicant_id, job_id, _ in reviving:
+        if (applicant_id, job_id) in taken:
+            blocked.add(application_id)
+        else:
+            taken.add((applicant_id, job_id))
+    return blocked
+
+def _conflict():
+    return JsonResponse({'error' : 'The applicant has another active application for this job'}, status=409)
+
 @jwt_required
 @recruiter_required
 @csrf_exempt
 def changeStatus(request, application_id):
-    application = get_object_or_404(Application, id=application_id, job__company__owner = request.user)
-
     try:
         data = json.loads(request.body)
     except json.JSONDecodeError:
@@ -160,15 +245,140 @@ def changeStatus(request, application_id):
 
     if new_status not in allowed_status:
         return JsonResponse({'error' : "Invalid status value"}, status=400)
-    
-    if application.status == 'withdrawn':
-        return JsonResponse({'error' : 'withdrawn application cannot be updated'}, status=400)
-    
-    application.status=new_status
-    application.save()
+
+    try:
+        with transaction.atomic():
+            application = get_object_or_404(
+                Application.objects.select_for_update(of=('self',)).only('id', 'applicant_id', 'job_id', 'status'),
+                id=application_id,
+                job__company__owner = request.user
+            )
+
+            if application.status == 'withdrawn':
+                return JsonResponse({'error' : 'withdrawn application cannot be updated'}, status=400)
+
+            if _reactivations_blocked([(application.id, application.applicant_id, application.job_id, application.status)], new_status):
+                return _conflict()
+
+            old_status = application.status
+            application.status=new_status
+            application.save(update_fields=['status'])
+            apply_transitions([(application.id, application.job_id, old_status, new_status)])
+    except IntegrityError:
+        # The applicant re-applied between the check and the update.
+        return _conflict()
 
     return JsonResponse({
         'message': 'Application status updated successfully',
         'application_id': application.id,
         'new_status': new_status
-    })
\ No newline at end of file
+    })
+
+
+MAX_BULK_STATUS_IDS = 500
+
+@jwt_required
+@recruiter_required
+@require_POST
+@csrf_exempt
+def changeStatusBulk(request):
+    try:
+        data = json.loads(request.body)
+    except json.JSONDecodeError:
+        return JsonResponse({'error' : "Invalid JSON"}, status=400)
+    new_status = data.get('new_status')
+    application_ids = data.get('application_ids')
+
+    if new_status not in ['shortlisted', 'rejected']:
+        return JsonResponse({'error' : "Invalid status value"}, status=400)
+
+    if not isinstance(application_ids, list) or not application_ids:
+        return JsonResponse({'error' : "application_ids must be a non-empty list"}, status=400)
+    if len(application_ids) > MAX_BULK_STATUS_IDS:
+        return JsonResponse({'error' : f"At most {MAX_BULK_STATUS_IDS} applications per request"}, status=400)
+    try:
+        application_ids = list(dict.fromkeys(int(application_id) for application_id in application_ids))
+    except (TypeError, ValueError):
+        return JsonResponse({'error' : "application_ids must be integers"}, status=400)
+
+    outcomes = {}
+    try:
+        with transaction.atomic():
+            # One query checks ownership of the whole set and locks the rows
+            # so an applicant cannot withdraw between the check and the update.
+            rows = list(
+                Application.objects
+                .select_for_update(of=('self',))
+                .filter(id__in=application_ids, job__company__owner=request.user)
+                .values_list('id', 'applicant_id', 'job_id', 'status')
+            )
+            current = {application_id: (job_id, status) for application_id, _, job_id, status in rows}
+            blocked = _reactivations_blocked(
+                [row for row in rows if row[3] != 'withdrawn'], new_status
+            )
+
+            to_update = []
+            for application_id in application_ids:
+                job_id, status = current.get(application_id, (None, None))
+                if status is None:
+                    outcomes[application_id] = 'not_found'
+                elif status == 'withdrawn':
+                    outcomes[application_id] = 'withdrawn'
+                elif application_id in blocked:
+                    outcomes[application_id] = 'conflict'
+                else:
+                    outcomes[application_id] = 'updated'
+                    to_update.append(application_id)
+
+            if to_update:
+                Application.objects.filter(id__in=to_update).update(status=new_status)
+                apply_transitions(
+                    (application_id, *current[application_id], new_status)
+                    for application_id in to_update
+                )
+    except IntegrityError:
+        # An applicant re-applied between the check and the update.
+        return _conflict()
+
+    return JsonResponse({
+        'new_status': new_status,
+        'updated': len(to_update),
+        'results': [
+            {'application_id': application_id, 'result': outcomes[application_id]}
+            for application_id in application_ids
+        ]
+    })
+
+
+@jwt_required
+@recruiter_required
+@require_GET
+def funnelAnalytics(request):
+    today = timezone.now().date()
+    try:
+        end = parse_date(request.GET['to']) if request.GET.get('to') else today
+        start = parse_date(request.GET['from']) if request.GET.get('from') else end - timedelta(days=29)
+    except ValueError:
+        start = end = None
+    if start is None or end is None:
+        return JsonResponse({'error' : 'Invalid date format. Use YYYY-MM-DD'}, status=400)
+    if start > end or (end - start).days >= MAX_RANGE_DAYS:
+        return JsonResponse({'error' : f'Date range must be 1 to {MAX_RANGE_DAYS} days'}, status=400)
+
+    # Only the rollup table is read, so the cost follows the date range.
+    stats = ApplicationDailyStat.objects.filter(company__owner=request.user)
+    scope = {}
+    for param in ('job_id', 'company_id'):
+        value = request.GET.get(param)
+        if value:
+            if not value.isdigit():
+                return JsonResponse({'error' : f'Invalid {param}'}, status=400)
+            stats = stats.filter(**{param: int(value)})
+            scope[param] = int(value)
+
+    state = RollupState.objects.filter(name=ROLLUP_NAME).values_list('updated_at', flat=True).first()
+    return JsonResponse({
+        **scope,
+        'as_of': state.isoformat() if state else None,
+        **funnel(stats, start, end),
+    })
@@ -13,5 +13,14 @@ from django.core.asgi import get_asgi_application
 
 settings_module = 'backend.deployment_settings' if 'RENDER_EXTERNAL_HOSTNAME' in os.environ else 'backend.settings'
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', settings_module)
+# Serve the public read endpoints with their async views (see ASYNC_READ_VIEWS).
+os.environ.setdefault('ASYNC_READ_VIEWS', '1')
 
 application = get_asgi_application()
+
+# Build per-worker in-memory indexes before the first request arrives. ASGI
+# servers import this module inside their event loop, where the ORM refuses
+# to run, so the build happens on a thread.
+import threading  # noqa: E402
+from jobs.autocomplete import autocomplete_index  # noqa: E402
+threading.Thread(target=autocomplete_index.warm, name='autocomplete-warm', daemon=True).start()
@@ -1,3 +1,4 @@
+import json
 import os
 import dj_database_url
 from .settings import *
@@ -10,6 +11,10 @@ DEBUG = False
 SECRET_KEY = os.environ.get('SECRET_KEY')
 
 MIDDLEWARE = [
+    'monitoring.metrics.MetricsMiddleware',
+    'monitoring.middleware.RequestTimingMiddleware',
+    'monitoring.profiling.ProfilerMiddleware',
+    'backend.replicas.ReplicaMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
@@ -44,4 +49,49 @@ DATABASES = {
     )
 }
 
+# Comma-separated replica URLs, routed to as replica1, replica2, ...
+for index, url in enumerate(filter(None, os.environ.get('DATABASE_REPLICA_URLS', '').split(',')), 1):
+    DATABASES[f'replica{index}'] = {
+        **dj_database_url.parse(url.strip(), conn_max_age=600),
+        'TEST': {'MIRROR': 'default'},
+    }
+DATABASE_REPLICAS = [] if TESTING else [alias for alias in DATABASES if alias != 'default']
 
+# Connection pooling with psycopg's pool (PostgreSQL, psycopg 3) in place of
+# persistent connections, which keep one connection per thread (every
+# request thread under ASGI) and reconnect in bursts. Sizes are per worker
+# process: keep workers * max_size below the server's max_connections.
+# DATABASE_POOLS overrides them per alias, e.g. '{"replica1": {"max_size": 20}}';
+# DATABASE_POOL=0 goes back to persistent connections.
+DATABASE_POOL = os.environ.get('DATABASE_POOL', '1') == '1'
+DATABASE_POOL_DEFAULTS = {
+    'min_size': int(os.environ.get('DATABASE_POOL_MIN_SIZE', '2')),
+    'max_size': int(os.environ.get('DATABASE_POOL_MAX_SIZE', '10')),
+    'timeout': float(os.environ.get('DATABASE_POOL_TIMEOUT', '10')),
+}
+DATABASE_POOLS = json.loads(os.environ.get('DATABASE_POOLS', '{}'))
+for alias, database in DATABASES.items():
+    if DATABASE_POOL and database['ENGINE'] == 'django.db.backends.postgresql':
+        # Pooled connections go back to the pool at the end of each request.
+        database['CONN_MAX_AGE'] = 0
+        database['OPTIONS'] = {
+            **database.get('OPTIONS', {}),
+            'pool': {**DATABASE_POOL_DEFAULTS, **DATABASE_POOLS.get(alias, {})},
+        }
+
+# Shared across gunicorn workers so listing cache invalidation is seen by all of them.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'django_cache',
+    }
+}
+
+MONITORING_SAMPLE_RATE = float(os.environ.get('MONITORING_SAMPLE_RATE', '0.05'))
+PROFILER_DIR = os.environ.get('PROFILER_DIR', BASE_DIR / 'profiles')
+PROFILER_SAMPLE_RATE = float(os.environ.get('PROFILER_SAMPLE_RATE', '0'))
+PROFILER_MAX_FILES = int(os.environ.get('PROFILER_MAX_FILES', '1000'))
+METRICS_DIR = os.environ.get('METRICS_DIR', '/tmp/jobsup-metrics')
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+REPLICA_STICKY_SECONDS = int(os.environ.get('REPLICA_STICKY_SECONDS', '10'))
+REPLICA_MAX_LAG_SECONDS = int(os.environ.get('REPLICA_MAX_LAG_SECONDS', '5'))
@@ -0,0 +1,239 @@
+import hashlib
+import random
+import time
+from contextlib import contextmanager, suppress
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+from monitoring.timing import wrap_stream
+
+
+_read_alias = ContextVar('replica_read_alias', default=None)
+
+SAFE_METHODS = frozenset(('GET', 'HEAD', 'OPTIONS'))
+PIN_KEY_PREFIX = 'replicas:pin:'
+# Set by bulk maintenance of public job data, for every client (see pin_primary).
+GLOBAL_PIN_KEY = PIN_KEY_PREFIX + '*'
+
+# Always read from the primary: users and roles must be visible to the next
+# request right after registration (they are cached per process by
+# accounts.auth_cache anyway), and DatabaseCache entries, cache invalidation
+# generations included, must be read where they were written.
+PRIMARY_APPS = frozenset(('auth', 'accounts', 'sessions', 'django_cache'))
+
+# Seconds behind the primary, or 0 when the server is not a standby. Equal
+# WAL positions mean fully caught up even if the primary has been idle.
+POSTGRES_LAG_SQL = """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+    END
+"""
+
+
+def _pin_cache():
+    return caches[getattr(settings, 'REPLICA_PIN_CACHE_ALIAS', 'default')]
+
+
+def _client_pin_key(request):
+    credential = request.META.get('HTTP_AUTHORIZATION') or request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+    if not credential:
+        return None
+    return PIN_KEY_PREFIX + hashlib.sha256(credential.encode()).hexdigest()
+
+
+def pin_primary():
+    """
+    Send every client's reads to the primary for REPLICA_STICKY_SECONDS,
+    after bulk changes (imports, backfills) that every client should see
+    at once. Ordinary writes only pin the client that made them.
+    """
+    if settings.DATABASE_REPLICAS:
+        _pin_cache().set(GLOBAL_PIN_KEY, 1, settings.REPLICA_STICKY_SECONDS)
+
+
+def reading_replica():
+    """Whether the current request's reads go to a replica."""
+    return _read_alias.get() in settings.DATABASE_REPLICAS
+
+
+@contextmanager
+def reading_from(alias):
+    token = _read_alias.set(alias)
+    try:
+        yield
+    finally:
+        _read_alias.reset(token)
+
+
+def replica_lag(cursor, vendor):
+    """Seconds the replica behind `cursor` lags its primary; None where the backend can't tell."""
+    if vendor == 'postgresql':
+        cursor.execute(POSTGRES_LAG_SQL)
+        return cursor.fetchone()[0]
+    if vendor == 'mysql':
+        cursor.execute('SHOW REPLICA STATUS')
+        row = cursor.fetchone()
+        if row is None:
+            return 0
+        columns = [column[0] for column in cursor.description]
+        lag = row[columns.index('Seconds_Behind_Source')]
+        # NULL while replication is stopped.
+        return float('inf') if lag is None else lag
+    cursor.execute('SELECT 1')
+    return None
+
+
+class ReplicaHealth:
+    """
+    Which replicas this process may read from. A replica is probed at most
+    once per REPLICA_HEALTH_INTERVAL, on the request that finds its last
+    result expired, and is healthy when it answers and lags the primary by
+    no more than REPLICA_MAX_LAG_SECONDS. A query error on a replica marks
+    it down until the next probe.
+    """
+
+    def __init__(self):
+        self._states = {}
+
+    def healthy(self):
+        now = time.monotonic()
+        return [alias for alias in settings.DATABASE_REPLICAS if self.is_healthy(alias, now)]
+
+    def is_healthy(self, alias, now=None):
+        now = time.monotonic() if now is None else now
+        state = self._states.get(alias)
+        if state is None or now - state[1] >= settings.REPLICA_HEALTH_INTERVAL:
+            state = self._states[alias] = (self.probe(alias), now)
+        return state[0]
+
+    def mark_down(self, alias):
+        self._states[alias] = (False, time.monotonic())
+
+    def reset(self):
+        self._states.clear()
+
+    @staticmethod
+    def probe(alias):
+        connection = connections[alias]
+        try:
+            with connection.cursor() as cursor:
+                lag = replica_lag(cursor, connection.vendor)
+        except DatabaseError:
+            with suppress(DatabaseError):
+                connection.close()
+            return False
+        return lag is None or lag <= settings.REPLICA_MAX_LAG_SECONDS
+
+
+replica_health = ReplicaHealth()
+
+
+class ReplicaRouter:
+    """
+    Reads go to the alias ReplicaMiddleware picked for the current request;
+    everything else (writes, migrations, reads outside a request) goes to
+    the primary. After a request writes, its remaining reads go to the
+    primary too.
+    """
+
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label in PRIMARY_APPS:
+            return DEFAULT_DB_ALIAS
+        return _read_alias.get()
+
+    def db_for_write(self, model, **hints):
+        # Cache and session writes are never read back from a replica.
+        if model._meta.app_label not in PRIMARY_APPS and _read_alias.get() not in (None, DEFAULT_DB_ALIAS):
+            _read_alias.set(DEFAULT_DB_ALIAS)
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get their schema from the primary.
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
+
+
+class ReplicaMiddleware:
+    """
+    Route GET/HEAD/OPTIONS requests to a healthy replica (chosen at random)
+    and everything else to the primary.
+
+    Read-your-writes: after a client sends a write, its reads stay on the
+    primary for REPLICA_STICKY_SECONDS. Clients are told apart by a hash of
+    their Authorization header or session cookie; the pin is kept in the
+    REPLICA_PIN_CACHE_ALIAS cache so every worker sees it. Keep the window
+    above the replication lag tolerated by REPLICA_MAX_LAG_SECONDS.
+
+    Does nothing when DATABASE_REPLICAS is empty.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if not settings.DATABASE_REPLICAS:
+            return self.get_response(request)
+        with reading_from(self.read_alias(request)):
+            response = self.get_response(request)
+            self.finish(request, response)
+        return response
+
+    async def __acall__(self, request):
+        if not settings.DATABASE_REPLICAS:
+            return await self.get_response(request)
+        with reading_from(await sync_to_async(self.read_alias)(request)):
+            response = await self.get_response(request)
+            if request.method in SAFE_METHODS:
+                self.finish(request, response)
+            else:
+                await sync_to_async(self.finish)(request, response)
+        return response
+
+    def process_exception(self, request, exception):
+        alias = _read_alias.get()
+        if isinstance(exception, DatabaseError) and alias in settings.DATABASE_REPLICAS:
+            replica_health.mark_down(alias)
+
+    @staticmethod
+    def read_alias(request):
+        if request.method not in SAFE_METHODS:
+            return DEFAULT_DB_ALIAS
+        keys = [GLOBAL_PIN_KEY]
+        client_key = _client_pin_key(request)
+        if client_key:
+            keys.append(client_key)
+        if _pin_cache().get_many(keys):
+            return DEFAULT_DB_ALIAS
+        healthy = replica_health.healthy()
+        return random.choice(healthy) if healthy else DEFAULT_DB_ALIAS
+
+    @staticmethod
+    def finish(request, response):
+        alias = _read_alias.get()
+        if request.method not in SAFE_METHODS:
+            client_key = _client_pin_key(request)
+            if client_key:
+                _pin_cache().set(client_key, 1, settings.REPLICA_STICKY_SECONDS)
+        elif response.streaming:
+            # The body is read after this middleware returns.
+            wrap_stream(response, lambda: reading_from(alias), lambda: None)
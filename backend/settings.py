@@ -12,12 +12,15 @@ https://docs.djangoproject.com/en/6.0/ref/settings/
 
 from pathlib import Path
 import os
+import sys
 from datetime import timedelta
 from corsheaders.defaults import default_headers
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
+TESTING = sys.argv[1:2] == ['test']
+
 
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/6.0/howto/deployment/checklist/
@@ -43,11 +46,16 @@ INSTALLED_APPS = [
     'jobs',
     'applications',
     'accounts',
+    'monitoring',
     'rest_framework',
     'corsheaders'
 ]
 
 MIDDLEWARE = [
+    'monitoring.metrics.MetricsMiddleware',
+    'monitoring.middleware.RequestTimingMiddleware',
+    'monitoring.profiling.ProfilerMiddleware',
+    'backend.replicas.ReplicaMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -93,6 +101,48 @@ DATABASES = {
     }
 }
 
+# Local read-replica setup: two SQLite files, the second standing in for a
+# replica. Migrate the primary, then refresh the "replica" by copying the
+# file (cp db.sqlite3 db-replica.sqlite3); writes made after the copy show
+# what replication lag looks like.
+if os.environ.get('SQLITE_REPLICA') == '1':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': BASE_DIR / 'db.sqlite3',
+        },
+        'replica': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': BASE_DIR / 'db-replica.sqlite3',
+            'TEST': {'MIRROR': 'default'},
+        },
+    }
+
+# Read replicas (backend.replicas): safe-method requests read from a healthy
+# replica, writes and everything else use 'default'. After a write a client
+# reads from the primary for REPLICA_STICKY_SECONDS (every client does after
+# a bulk import); keep it above REPLICA_MAX_LAG_SECONDS.
+# Test runs read from the primary: there a replica is a mirror of the test
+# database that cannot see the test's transaction. backend/tests.py turns
+# routing on where it is under test.
+DATABASE_REPLICAS = [] if TESTING else [alias for alias in DATABASES if alias != 'default']
+DATABASE_ROUTERS = ['backend.replicas.ReplicaRouter']
+REPLICA_STICKY_SECONDS = 10
+REPLICA_MAX_LAG_SECONDS = 5
+REPLICA_HEALTH_INTERVAL = 10
+REPLICA_PIN_CACHE_ALIAS = 'default'
+
+
+# Cache
+# https://docs.djangoproject.com/en/6.0/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'jobsup',
+    }
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
@@ -149,8 +199,13 @@ SIMPLE_JWT = {
     'REFRESH_TOKEN_LIFETIME': timedelta(days=1),
 
     'AUTH_HEADER_TYPES': ('Bearer',),
+    'TOKEN_OBTAIN_SERIALIZER': 'accounts.tokens.RoleTokenObtainPairSerializer',
 }
 
+# Per-process cache of authenticated users (accounts.auth_cache).
+AUTH_CACHE_SIZE = 1024
+AUTH_CACHE_TTL = 60
+
 # CORS_ALLOW_ALL_ORIGINS = True
 
 CORS_ALLOWED_ORIGINS = [
@@ -178,3 +233,83 @@ CSRF_TRUSTED_ORIGINS = [
     "http://localhost:5173",
     "http://127.0.0.1:5173",
 ]
+
+# Job search: 'postgres' (tsvector + GIN), 'terms' (inverted index table, any engine)
+# or 'auto' to pick postgres when the default database is PostgreSQL.
+JOBS_SEARCH_BACKEND = 'auto'
+
+# Public job listing / detail response cache (seconds). Entries are invalidated
+# by Job/Company writes; the stale window only covers an in-flight rebuild.
+JOBS_RESPONSE_CACHE_ALIAS = 'default'
+JOBS_RESPONSE_CACHE_TIMEOUT = 300
+JOBS_RESPONSE_CACHE_STALE_TIMEOUT = 60
+
+# Serialized Job/Company detail payloads (jobs.object_cache): shared tier in the
+# cache below, plus a short-lived per-process LRU in front of it.
+OBJECT_CACHE_ALIAS = 'default'
+OBJECT_CACHE_TIMEOUT = 3600
+OBJECT_CACHE_LOCAL_SIZE = 1024
+OBJECT_CACHE_LOCAL_TTL = 5
+# companyDetails payloads with more jobs than this are streamed, not cached.
+OBJECT_CACHE_MAX_LIST = 1000
+
+# Rebuild the in-memory job recommendation index at least this often (seconds).
+RECOMMENDER_REBUILD_SECONDS = 300
+
+# Events newer than this are left for the next rollup_application_events run.
+APPLICATION_ROLLUP_LAG_SECONDS = 60
+
+# Rebuild the in-memory autocomplete index at least this often (seconds).
+AUTOCOMPLETE_REBUILD_SECONDS = 600
+
+# Request instrumentation (monitoring.middleware.RequestTimingMiddleware).
+# Sampled requests get a Server-Timing header and SQL in the slow log.
+MONITORING_SAMPLE_RATE = 1.0
+MONITORING_SLOW_REQUEST_MS = 500
+MONITORING_SLOW_LOG_QUERIES = 10
+
+# cProfile dumps (monitoring.profiling.ProfilerMiddleware). A request is
+# profiled when it sends a signed X-Profile header (manage.py profile_token)
+# or falls in PROFILER_SAMPLE_RATE; summarize with aggregate_profiles. Only
+# the newest PROFILER_MAX_FILES dumps are kept. WSGI workers only: under
+# ASGI a profiling request is refused with a 501.
+PROFILER_DIR = BASE_DIR / 'profiles'
+PROFILER_SAMPLE_RATE = 0.0
+PROFILER_MAX_FILES = 1000
+PROFILER_TOKEN_MAX_AGE = 3600
+
+# Prometheus metrics (monitoring.metrics), served at /metrics. With several
+# worker processes set METRICS_DIR: each worker writes its own mmap file
+# there and /metrics sums them. An exited worker's file is folded into
+# metrics-archive.db (by gunicorn.conf.py's child_exit hook, or the next
+# scrape) so counters stay monotonic; gauges, e.g. connection pool sizes,
+# count live workers only and are refreshed by the scrapes each one serves.
+# METRICS_TOKEN is required as a Bearer token; without it /metrics is only
+# served with DEBUG on.
+METRICS_DIR = None
+METRICS_TOKEN = None
+
+# Route the public read endpoints (job listing/detail, my applications) to
+# their async views. backend/asgi.py turns this on; WSGI keeps the sync ones.
+ASYNC_READ_VIEWS = os.environ.get('ASYNC_READ_VIEWS') == '1'
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'message': {'format': '%(message)s'},
+    },
+    'handlers': {
+        'slow_requests': {
+            'class': 'logging.StreamHandler',
+            'formatter': 'message',
+        },
+    },
+    'loggers': {
+        'monitoring.slow_requests': {
+            'handlers': ['slow_requests'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
+    },
+}
@@ -0,0 +1,156 @@
+from unittest import mock, skipUnless
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import DatabaseError, connections
+from django.http import JsonResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import path
+from django.views.decorators.csrf import csrf_exempt
+
+from jobs.models import Company, Job
+from jobs.response_cache import bump_generation, cache_public_response, get_cache, response_cache_key
+from .replicas import ReplicaHealth, _read_alias, pin_primary, reading_from, replica_health
+
+# SQLITE_REPLICA=1 adds the 'replica' database these tests need.
+HAS_REPLICA = 'replica' in settings.DATABASES
+REPLICA_DATABASES = {'default', 'replica'} if HAS_REPLICA else {'default'}
+
+
+@csrf_exempt
+def read_alias(request):
+    # Where this request's job reads go, and what a write does to that.
+    before = Job.objects.all().db
+    if request.method == 'POST':
+        Company.objects.create(name='Written Co', description='d')
+    return JsonResponse({'read': before, 'after': Job.objects.all().db})
+
+
+def failing_read(request):
+    raise DatabaseError('replica went away')
+
+
+urlpatterns = [
+    path('read/', read_alias),
+    path('fail/', failing_read),
+]
+
+
+class SharedReplicaConnection:
+    """
+    The test replica mirrors the primary through its own connection, which
+    neither sees the test transaction's rows nor gets past its locks; read
+    through the primary's connection instead, as a caught-up replica would.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        replica = connections['replica']
+        connections['replica'] = connections['default']
+        cls.addClassCleanup(connections.__setitem__, 'replica', replica)
+        super().setUpClass()
+
+
+@skipUnless(HAS_REPLICA, "needs a 'replica' database (SQLITE_REPLICA=1)")
+@override_settings(ROOT_URLCONF='backend.tests', DATABASE_REPLICAS=['replica'])
+class ReplicaRoutingTests(SharedReplicaConnection, TestCase):
+    databases = REPLICA_DATABASES
+
+    def setUp(self):
+        cache.clear()
+        replica_health.reset()
+        self.addCleanup(replica_health.reset)
+
+    def read(self, method='get', **headers):
+        return getattr(self.client, method)('/read/', headers=headers).json()
+
+    def test_reads_outside_a_request_go_to_the_primary(self):
+        self.assertEqual(Job.objects.all().db, 'default')
+
+    def test_router(self):
+        with reading_from('replica'):
+            self.assertEqual(Job.objects.all().db, 'replica')
+            # Users and cache entries are always read where they are written.
+            self.assertEqual(User.objects.all().db, 'default')
+            Company.objects.create(name='Router Co', description='d')
+            self.assertEqual(Job.objects.all().db, 'default')
+        self.assertIsNone(_read_alias.get())
+
+    def test_safe_requests_read_from_a_healthy_replica(self):
+        self.assertEqual(self.read(), {'read': 'replica', 'after': 'replica'})
+
+    def test_writes_go_to_the_primary(self):
+        self.assertEqual(self.read('post'), {'read': 'default', 'after': 'default'})
+
+    def test_client_reads_its_writes(self):
+        self.read('post', Authorization='Bearer writer')
+        self.assertEqual(self.read(Authorization='Bearer writer')['read'], 'default')
+        self.assertEqual(self.read(Authorization='Bearer someone-else')['read'], 'replica')
+
+    def test_job_change_does_not_pin_other_clients(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.read('post', Authorization='Bearer writer')
+        self.assertEqual(self.read(Authorization='Bearer someone-else')['read'], 'replica')
+
+    def test_bulk_change_pins_every_client(self):
+        pin_primary()
+        self.assertEqual(self.read(Authorization='Bearer someone-else')['read'], 'default')
+        self.assertEqual(self.read()['read'], 'default')
+
+    def test_replica_response_is_not_cached_right_after_a_change(self):
+        @cache_public_response('replica_test')
+        def view(request):
+            return JsonResponse({'jobs': Job.objects.count()})
+
+        request = RequestFactory().get('/jobs/')
+        with self.captureOnCommitCallbacks(execute=True):
+            bump_generation()
+        key = response_cache_key('replica_test', request)
+        with reading_from('replica'):
+            view(request)
+        self.assertIsNone(get_cache().get(key))
+        view(request)
+        self.assertIsNotNone(get_cache().get(key))
+
+    def test_unhealthy_replica_is_skipped(self):
+        replica_health.mark_down('replica')
+        self.assertEqual(self.read()['read'], 'default')
+
+    def test_query_error_marks_the_replica_down(self):
+        with self.assertRaises(DatabaseError):
+            self.client.get('/fail/')
+        self.assertFalse(replica_health.is_healthy('replica'))
+        self.assertEqual(self.read()['read'], 'default')
+
+
+@skipUnless(HAS_REPLICA, "needs a 'replica' database (SQLITE_REPLICA=1)")
+@override_settings(DATABASE_REPLICAS=['replica'], REPLICA_HEALTH_INTERVAL=10, REPLICA_MAX_LAG_SECONDS=5)
+class ReplicaHealthTests(SharedReplicaConnection, TestCase):
+    databases = REPLICA_DATABASES
+
+    def test_probe(self):
+        self.assertTrue(ReplicaHealth.probe('replica'))
+
+    def test_lagging_or_failing_replica_is_unhealthy(self):
+        with mock.patch('backend.replicas.replica_lag', return_value=6):
+            self.assertFalse(ReplicaHealth.probe('replica'))
+        with mock.patch('backend.replicas.replica_lag', side_effect=DatabaseError), \
+                mock.patch.object(connections['replica'], 'close') as close:
+            self.assertFalse(ReplicaHealth.probe('replica'))
+        close.assert_called_once_with()
+
+    def test_probed_once_per_interval(self):
+        health = ReplicaHealth()
+        with mock.patch.object(ReplicaHealth, 'probe', return_value=True) as probe:
+            self.assertEqual(health.healthy(), ['replica'])
+            self.assertEqual(health.healthy(), ['replica'])
+            self.assertEqual(probe.call_count, 1)
+
+            health.mark_down('replica')
+            self.assertEqual(health.healthy(), [])
+            self.assertEqual(probe.call_count, 1)
+
+            with override_settings(REPLICA_HEALTH_INTERVAL=0):
+                self.assertEqual(health.healthy(), ['replica'])
+            self.assertEqual(probe.call_count, 2)
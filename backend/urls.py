@@ -28,5 +28,6 @@ urlpatterns = [
     path('auth/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
     path('applications/', include('applications.urls')),
     path('accounts/', include('accounts.urls')),
+    path('', include('monitoring.urls')),
     
 ] + static(settings.MEDIA_URL, document_root = settings.MEDIA_ROOT)
@@ -16,3 +16,7 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE', settings_module)
 
 
 application = get_wsgi_application()
+
+# Build per-worker in-memory indexes before the first request arrives.
+from jobs.autocomplete import autocomplete_index  # noqa: E402
+autocomplete_index.warm()
@@ -6,3 +6,9 @@ python manage.py collectstatic --no-input
 
 python manage.py migrate
 
+python manage.py createcachetable
+
+python manage.py rebuild_search_index
+
+python manage.py backfill_skills
+
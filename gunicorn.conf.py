@@ -0,0 +1,13 @@
+import os
+
+# gunicorn loads this file from the working directory.
+
+
+def child_exit(server, worker):
+    # Fold the exited worker's Prometheus metrics into the archive now
+    # rather than at the next /metrics scrape. Runs in the master, which
+    # has not loaded the application.
+    settings_module = 'backend.deployment_settings' if 'RENDER_EXTERNAL_HOSTNAME' in os.environ else 'backend.settings'
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', settings_module)
+    from monitoring.metrics import mark_process_dead
+    mark_process_dead(worker.pid)
@@ -1,8 +1,9 @@
 from django.contrib import admin
-from .models import Job, Company
+from .models import Job, Company, Skill
 
 
 # Register your models here.
 admin.site.register(Company)
 admin.site.register(Job)
+admin.site.register(Skill)
 
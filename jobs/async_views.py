@@ -0,0 +1,54 @@
+from django.http import Http404, JsonResponse
+from django.views.decorators.http import require_GET
+
+from .conditional import acondition, ajob_etag, ajob_last_modified, alisting_etag
+from .facets import afacet_counts
+from .listing import InvalidListing, Listing
+from .object_cache import acached_job
+from .pagination import InvalidPage, acursor_paginate
+from .response_cache import cache_public_response
+from .serializers import JOB_DETAIL, InvalidFields
+
+# Async versions of the public read views, routed instead of the ones in
+# views.py when ASYNC_READ_VIEWS is on (backend/asgi.py turns it on). They
+# answer the same requests with the same payloads.
+
+@require_GET
+@acondition(etag_func=alisting_etag)
+@cache_public_response('view_all_jobs')
+async def viewAllJobs(request):
+    try:
+        listing = Listing(request)
+    except InvalidListing as e:
+        return JsonResponse({'error' : str(e)}, status=400)
+
+    facets = await afacet_counts(listing.filtered, listing.facets) if listing.facets else None
+    page_info = None
+    if listing.cursor:
+        try:
+            page_jobs, page_info = await acursor_paginate(request, listing.jobs, 'posted_on')
+        except InvalidPage as e:
+            return JsonResponse({'error' : str(e)}, status=400)
+    else:
+        paginator = listing.paginator
+        # Counted here so get_page() only slices the queryset, which is then read asynchronously.
+        paginator.count = await paginator.object_list.acount()
+        page_jobs = [job async for job in paginator.get_page(listing.page).object_list]
+
+    return JsonResponse(listing.payload(request, page_jobs, page_info, facets), safe=False)
+
+@require_GET
+@acondition(etag_func=ajob_etag, last_modified_func=ajob_last_modified)
+@cache_public_response('job_detail')
+async def jobDetail(request, job_id):
+    try:
+        fields = JOB_DETAIL.parse_fields(request)
+    except InvalidFields as e:
+        return JsonResponse({'error' : f'Invalid fields: {e}'}, status=400)
+
+    entry = await acached_job(request, job_id)
+    if entry is None:
+        raise Http404
+    job_data = JOB_DETAIL.pick(JOB_DETAIL.absolutize(entry['data'], request), fields)
+
+    return JsonResponse(job_data)
@@ -0,0 +1,264 @@
+import heapq
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import DatabaseError, connections
+from django.utils import timezone
+
+from .models import Job
+from .skills import parse_skills
+
+
+logger = logging.getLogger(__name__)
+
+CATEGORIES = ('title', 'skill', 'location')
+TOP_K = 10
+
+
+def normalize(text):
+    return ' '.join((text or '').lower().split())
+
+
+def job_terms(title, skills_required, location):
+    """The (category, normalized term, display text) entries one job contributes."""
+    terms = set()
+    if normalize(title):
+        terms.add(('title', normalize(title), ' '.join(title.split())))
+    for slug, name in parse_skills(skills_required).items():
+        terms.add(('skill', slug, name))
+    if normalize(location):
+        terms.add(('location', normalize(location), ' '.join(location.split())))
+    return terms
+
+
+class _Node:
+    __slots__ = ('children', 'entries', 'top')
+
+    def __init__(self):
+        self.children = {}
+        self.entries = set()
+        # Best TOP_K (weight, term) pairs in this subtree, kept up to date
+        # on every change so a lookup never has to walk the subtree.
+        self.top = []
+
+
+class PrefixTrie:
+
+    def __init__(self):
+        self.root = _Node()
+        # term -> [display text, weight]
+        self.terms = {}
+
+    @staticmethod
+    def keys_for(term):
+        # Every word start is a key, so "dev" finds "senior developer".
+        words = term.split(' ')
+        return [' '.join(words[i:]) for i in range(len(words))]
+
+    def _path(self, key, create=False):
+        node = self.root
+        path = [node]
+        for char in key:
+            child = node.children.get(char)
+            if child is None:
+                if not create:
+                    return None
+                child = node.children[char] = _Node()
+            node = child
+            path.append(node)
+        return path
+
+    def _recompute(self, node):
+        best = {}
+        for term in node.entries:
+            best[term] = self.terms[term][1]
+        for child in node.children.values():
+            for weight, term in child.top:
+                best[term] = weight
+        node.top = heapq.nlargest(TOP_K, ((weight, term) for term, weight in best.items()))
+
+    def add(self, term, display, delta, defer=False):
+        entry = self.terms.get(term)
+        if entry is None:
+            entry = self.terms[term] = [display, 0]
+        entry[1] += delta
+        removed = entry[1] <= 0
+
+        for key in self.keys_for(term):
+            path = self._path(key, create=not removed)
+            if path is None:
+                continue
+            if removed:
+                path[-1].entries.discard(term)
+            else:
+                path[-1].entries.add(term)
+            if not defer:
+                for node in reversed(path):
+                    self._recompute(node)
+
+        if removed:
+            del self.terms[term]
+
+    def finalize(self, node=None):
+        """Compute every node's top list bottom-up after a deferred bulk load."""
+        node = node or self.root
+        for child in node.children.values():
+            self.finalize(child)
+        self._recompute(node)
+
+    def lookup(self, prefix):
+        path = self._path(prefix)
+        if path is None:
+            return []
+        return [(weight, term, self.terms[term][0]) for weight, term in path[-1].top]
+
+
+class AutocompleteIndex:
+    """
+    In-memory prefix index over distinct titles, skills and locations of
+    open jobs, weighted by how many open jobs use each one. Built once per
+    worker and kept current by Job save/delete signals; rebuilt when the
+    date changes (so expired jobs drop out) and every
+    AUTOCOMPLETE_REBUILD_SECONDS to pick up writes from other workers.
+    Lookups never hit the database.
+
+    Rebuilds run on a background thread into new tries that are swapped in
+    when done; lookups keep using the old ones meanwhile, and job changes
+    made during the build are replayed onto the new ones.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._built_on = None
+        self._built_at = None
+        self._tries = {category: PrefixTrie() for category in CATEGORIES}
+        self._job_terms = {}
+        self._rebuilding = False
+        # (job id, job or None) changes seen while a rebuild runs.
+        self._changes = None
+
+    def _apply(self, terms, delta, defer=False):
+        for category, term, display in terms:
+            self._tries[category].add(term, display, delta, defer=defer)
+
+    def _replace(self, job_id, job):
+        self._apply(self._job_terms.pop(job_id, ()), -1)
+        if job is not None and job.application_deadline >= self._built_on:
+            terms = job_terms(job.title, job.skills_required, job.location)
+            self._job_terms[job_id] = terms
+            self._apply(terms, 1)
+
+    @staticmethod
+    def _build(today):
+        tries = {category: PrefixTrie() for category in CATEGORIES}
+        terms_of = {}
+        rows = Job.objects.filter(application_deadline__gte=today).values_list(
+            'id', 'title', 'skills_required', 'location'
+        )
+        for job_id, title, skills_required, location in rows.iterator(chunk_size=2000):
+            terms = job_terms(title, skills_required, location)
+            terms_of[job_id] = terms
+            for category, term, display in terms:
+                tries[category].add(term, display, 1, defer=True)
+        for trie in tries.values():
+            trie.finalize()
+        return tries, terms_of
+
+    def _claim_rebuild(self, force=False):
+        """With the lock held: True if the caller should rebuild now."""
+        if self._rebuilding:
+            return False
+        if not force:
+            max_age = getattr(settings, 'AUTOCOMPLETE_REBUILD_SECONDS', 600)
+            if (
+                self._built_at is not None
+                and self._built_on == timezone.now().date()
+                and time.monotonic() - self._built_at <= max_age
+            ):
+                return False
+        self._rebuilding = True
+        self._changes = []
+        return True
+
+    def _rebuild(self):
+        today = timezone.now().date()
+        try:
+            tries, terms_of = self._build(today)
+        except BaseException:
+            with self._lock:
+                self._rebuilding = False
+                self._changes = None
+            raise
+        with self._lock:
+            self._tries, self._job_terms = tries, terms_of
+            self._built_on, self._built_at = today, time.monotonic()
+            # The build may have read these jobs before they changed.
+            for job_id, job in self._changes:
+                self._replace(job_id, job)
+            self._rebuilding = False
+            self._changes = None
+
+    def _rebuild_in_background(self):
+        try:
+            self._rebuild()
+        except Exception:
+            logger.exception("Autocomplete rebuild failed; serving the previous index")
+        finally:
+            connections.close_all()
+
+    def warm(self):
+        with self._lock:
+            claimed = self._claim_rebuild(force=True)
+        if not claimed:
+            return
+        try:
+            self._rebuild()
+        except DatabaseError:
+            logger.warning("Autocomplete index not built at startup; building on first use", exc_info=True)
+
+    def invalidate(self):
+        """Rebuild on next use; cheaper than update_job for a large batch."""
+        with self._lock:
+            self._built_at = None
+
+    def update_job(self, job):
+        with self._lock:
+            if self._changes is not None:
+                self._changes.append((job.id, job))
+            if self._built_on is not None:
+                self._replace(job.id, job)
+
+    def remove_job(self, job_id):
+        with self._lock:
+            if self._changes is not None:
+                self._changes.append((job_id, None))
+            if self._built_on is not None:
+                self._replace(job_id, None)
+
+    def suggest(self, query, categories=CATEGORIES, limit=TOP_K):
+        prefix = normalize(query)
+        if not prefix:
+            return []
+        with self._lock:
+            claimed = self._claim_rebuild()
+            built = self._built_on is not None
+        if claimed and built:
+            threading.Thread(target=self._rebuild_in_background, name='autocomplete-rebuild', daemon=True).start()
+        elif claimed:
+            # Nothing to serve yet.
+            self._rebuild()
+        with self._lock:
+            candidates = []
+            for category in categories:
+                for weight, term, display in self._tries[category].lookup(prefix):
+                    candidates.append((weight, category, display))
+        best = heapq.nlargest(limit, candidates, key=lambda item: item[0])
+        return [
+            {'text' : display, 'type' : category, 'count' : weight}
+            for weight, category, display in best
+        ]
+
+
+autocomplete_index = AutocompleteIndex()
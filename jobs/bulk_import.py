@@ -0,0 +1,154 @@
+import codecs
+import csv
+import json
+
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from .autocomplete import autocomplete_index
+from .geo import resolve_location
+from .models import Company, Job
+from .recommend import job_skill_index
+from .response_cache import bump_generation
+from .search import index_new_jobs
+from .skills import add_new_job_skills
+from .validation import InvalidJob, clean_job
+
+
+FORMATS = ('csv', 'jsonl')
+IMPORT_CHUNK_SIZE = 1000
+MAX_REPORTED_ERRORS = 1000
+
+
+class InvalidImport(ValueError):
+    pass
+
+
+def guess_format(name, content_type=''):
+    if (name or '').lower().endswith(('.jsonl', '.ndjson')) or 'ndjson' in content_type or 'jsonl' in content_type:
+        return 'jsonl'
+    return 'csv'
+
+
+def read_rows(stream, format):
+    """
+    Yield (row number, dict) from a binary stream of CSV (with a header
+    line) or JSON Lines, decoding it incrementally. A line that cannot be
+    parsed yields an InvalidJob instead of a dict.
+    """
+    lines = codecs.iterdecode(stream, 'utf-8-sig')
+    if format == 'csv':
+        for number, row in enumerate(csv.DictReader(lines), start=1):
+            yield number, row
+    elif format == 'jsonl':
+        number = 0
+        for line in lines:
+            if not line.strip():
+                continue
+            number += 1
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError:
+                yield number, InvalidJob('Invalid JSON')
+                continue
+            yield number, row if isinstance(row, dict) else InvalidJob('Expected a JSON object')
+    else:
+        raise InvalidImport(f"Unknown format {format!r}; use one of {', '.join(FORMATS)}")
+
+
+def _companies(rows, owner):
+    ids = set()
+    for _, data in rows:
+        if isinstance(data, dict):
+            try:
+                ids.add(int(data.get('company_id')))
+            except (TypeError, ValueError):
+                pass
+    companies = Company.objects.filter(id__in=ids).only('id', 'name', 'latitude', 'longitude')
+    if owner is not None:
+        companies = companies.filter(owner=owner)
+    return {company.id: company for company in companies}
+
+
+def _assign_pks(jobs, last_id):
+    """
+    Backends that cannot return ids from a bulk INSERT (MySQL) leave pk
+    unset; read the new rows back and match them to the objects in
+    insertion order.
+    """
+    inserted = Job.objects.filter(
+        id__gt=last_id,
+        company_id__in={job.company_id for job in jobs}
+    ).order_by('id').values_list('id', 'company_id', 'title', 'application_deadline')
+    pending = {}
+    for job in jobs:
+        pending.setdefault((job.company_id, job.title, job.application_deadline), []).append(job)
+    for job_id, *key in inserted:
+        queue = pending.get(tuple(key))
+        if queue:
+            queue.pop(0).id = job_id
+
+
+def _write_chunk(rows, owner, today, report):
+    companies = _companies(rows, owner)
+    jobs = []
+    for number, data in rows:
+        try:
+            if isinstance(data, InvalidJob):
+                raise data
+            values = clean_job(data, today)
+            company = companies.get(int(values.pop('company_id')))
+            if company is None:
+                raise InvalidJob('Company not found')
+        except (InvalidJob, ValueError) as e:
+            report['failed'] += 1
+            if len(report['errors']) < MAX_REPORTED_ERRORS:
+                report['errors'].append({'row': number, 'error': str(e)})
+            continue
+        # bulk_create skips pre_save signals, so geocode here.
+        point = resolve_location(values['location'])
+        if point is None and company.latitude is not None:
+            point = (company.latitude, company.longitude)
+        latitude, longitude = point or (None, None)
+        jobs.append(Job(company=company, latitude=latitude, longitude=longitude, **values))
+
+    if not jobs:
+        return []
+    with transaction.atomic():
+        last_id = None
+        if not connection.features.can_return_rows_from_bulk_insert:
+            last_id = Job.objects.aggregate(last=Max('id'))['last'] or 0
+        Job.objects.bulk_create(jobs)
+        if last_id is not None:
+            _assign_pks(jobs, last_id)
+        index_new_jobs(jobs)
+        add_new_job_skills(jobs)
+    report['created'] += len(jobs)
+    return jobs
+
+
+def import_jobs(rows, owner=None, chunk_size=IMPORT_CHUNK_SIZE):
+    """
+    Create jobs from (row number, dict) pairs with the createJob rules,
+    `chunk_size` rows per transaction. Rows must reference companies owned
+    by `owner` (any company when owner is None). Returns a report with the
+    created/failed counts and the first MAX_REPORTED_ERRORS row errors.
+    """
+    today = timezone.now().date()
+    report = {'created': 0, 'failed': 0, 'errors': []}
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            _write_chunk(chunk, owner, today, report)
+            chunk = []
+    if chunk:
+        _write_chunk(chunk, owner, today, report)
+
+    # Job signals do not fire for bulk_create; refresh what they maintain.
+    if report['created']:
+        bump_generation(pin=True)
+        job_skill_index.invalidate()
+        autocomplete_index.invalidate()
+    return report
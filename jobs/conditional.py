@@ -0,0 +1,125 @@
+import datetime
+import hashlib
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.db.models import Max, Sum
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+from .models import Job, Company
+from .object_cache import acached_job, cached_job
+from .response_cache import current_generation, response_cache_key
+from .serializers import APPLICATION_COUNTS
+
+
+def _variant(request):
+    # Representations differ by host (absolute logo URLs) and query string.
+    params = sorted((key, sorted(values)) for key, values in request.GET.lists())
+    return repr((request.get_host(), params))
+
+
+def _etag(version, request):
+    if version is None:
+        return None
+    raw = f"{version}|{_variant(request)}"
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+
+def _isoformat(last_modified):
+    return last_modified.isoformat() if last_modified else None
+
+
+def job_last_modified(request, job_id):
+    # Read from the object cache entry the view serves, so a hit costs no query.
+    entry = cached_job(request, job_id)
+    return entry['last_modified'] if entry else None
+
+
+def job_etag(request, job_id):
+    return _etag(_isoformat(job_last_modified(request, job_id)), request)
+
+
+async def ajob_last_modified(request, job_id):
+    entry = await acached_job(request, job_id)
+    return entry['last_modified'] if entry else None
+
+
+async def ajob_etag(request, job_id):
+    return _etag(_isoformat(await ajob_last_modified(request, job_id)), request)
+
+
+def company_version(request, company_id):
+    """
+    Version of a company's companyDetails payload, None unless the user owns
+    the company: when it or one of its jobs last changed, plus the jobs'
+    application counters, which change without touching updated_at. There
+    is no Last-Modified for the same reason.
+    """
+    if not hasattr(request, '_company_version'):
+        company = Company.objects.filter(id=company_id, owner=request.user).values_list('updated_at', flat=True).first()
+        if company is None:
+            request._company_version = None
+        else:
+            counters = APPLICATION_COUNTS.columns()
+            jobs = Job.objects.filter(company_id=company_id).aggregate(
+                last=Max('updated_at'), **{f'{column}_sum': Sum(column) for column in counters}
+            )
+            last_modified = max(company, jobs['last']) if jobs['last'] else company
+            counts = ','.join(str(jobs[f'{column}_sum'] or 0) for column in counters)
+            request._company_version = f"{last_modified.isoformat()}|{counts}"
+    return request._company_version
+
+
+def company_etag(request, company_id):
+    return _etag(company_version(request, company_id), request)
+
+
+def listing_etag(request):
+    """
+    Listings change on any Job/Company write, which bumps the response cache
+    generation, so the ETag needs no database access at all.
+    """
+    if request.method != 'GET':
+        return None
+    key = response_cache_key('view_all_jobs', request)
+    return hashlib.sha1(f"{current_generation()}|{key}".encode()).hexdigest()
+
+
+async def alisting_etag(request):
+    if request.method != 'GET':
+        return None
+    return await sync_to_async(listing_etag)(request)
+
+
+def acondition(etag_func=None, last_modified_func=None):
+    """
+    django.views.decorators.http.condition for async views whose ETag and
+    Last-Modified functions are coroutines (Django calls them synchronously,
+    which rules out the ORM and the async cache API).
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        async def _wrapped_view(request, *args, **kwargs):
+            last_modified = None
+            if last_modified_func:
+                if dt := await last_modified_func(request, *args, **kwargs):
+                    if not timezone.is_aware(dt):
+                        dt = timezone.make_aware(dt, datetime.timezone.utc)
+                    last_modified = int(dt.timestamp())
+            etag = await etag_func(request, *args, **kwargs) if etag_func else None
+            etag = quote_etag(etag) if etag is not None else None
+
+            response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+            if response is None:
+                response = await view_func(request, *args, **kwargs)
+
+            if request.method in ('GET', 'HEAD'):
+                if last_modified and not response.has_header('Last-Modified'):
+                    response.headers['Last-Modified'] = http_date(last_modified)
+                if etag:
+                    response.headers.setdefault('ETag', etag)
+            return response
+        return _wrapped_view
+    return decorator
@@ -0,0 +1,72 @@
+from django.db.models import Case, CharField, Count, F, Value, When
+from django.db.models.functions import Lower, Trim
+
+
+# (label, lower bound inclusive, upper bound exclusive) on min_salary.
+SALARY_BUCKETS = (
+    ('0-300000', None, 300000),
+    ('300000-600000', 300000, 600000),
+    ('600000-1200000', 600000, 1200000),
+    ('1200000+', 1200000, None),
+)
+
+
+def _salary_bucket():
+    whens = []
+    for label, low, high in SALARY_BUCKETS:
+        bounds = {}
+        if low is not None:
+            bounds['min_salary__gte'] = low
+        if high is not None:
+            bounds['min_salary__lt'] = high
+        whens.append(When(then=Value(label), **bounds))
+    return Case(*whens, output_field=CharField())
+
+
+FACETS = {
+    'job_type': lambda: F('job_type'),
+    'location': lambda: Lower(Trim('location')),
+    'salary': _salary_bucket,
+}
+
+
+class InvalidFacet(ValueError):
+    pass
+
+
+def parse_facets(value):
+    names = [name.strip() for name in value.split(',') if name.strip()]
+    for name in names:
+        if name not in FACETS:
+            raise InvalidFacet(name)
+    return list(dict.fromkeys(names))
+
+
+def _facet_rows(jobs, names):
+    columns = {f'facet_{name}': FACETS[name]() for name in names}
+    return jobs.order_by().values(**columns).annotate(count=Count('id'))
+
+
+def _fold(rows, names):
+    counts = {name: {} for name in names}
+    for row in rows:
+        for name in names:
+            value = row[f'facet_{name}']
+            counts[name][value] = counts[name].get(value, 0) + row['count']
+
+    return {
+        name: dict(sorted(values.items(), key=lambda item: -item[1]))
+        for name, values in counts.items()
+    }
+
+
+def facet_counts(jobs, names):
+    """
+    Counts per value of each requested facet over `jobs`, computed with one
+    GROUP BY over the combination of facet columns and folded in Python.
+    """
+    return _fold(_facet_rows(jobs, names), names)
+
+
+async def afacet_counts(jobs, names):
+    return _fold([row async for row in _facet_rows(jobs, names)], names)
@@ -0,0 +1,123 @@
+import csv
+import math
+from functools import lru_cache
+from pathlib import Path
+
+from django.db.models import ExpressionWrapper, F, FloatField, Q, Value
+from django.db.models.functions import ASin, Cos, Least, Power, Radians, Sin, Sqrt
+
+
+GAZETTEER_PATH = Path(__file__).resolve().parent / 'data' / 'gazetteer.csv'
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = 111.045
+MAX_RADIUS_KM = 2000
+
+
+class InvalidLocation(ValueError):
+    pass
+
+
+def _key(text):
+    return ' '.join((text or '').lower().replace('.', ' ').split())
+
+
+@lru_cache(maxsize=1)
+def gazetteer():
+    """{normalized place name: (latitude, longitude)} from the bundled CSV."""
+    places = {}
+    with open(GAZETTEER_PATH, newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            point = (float(row['latitude']), float(row['longitude']))
+            places[_key(row['name'])] = point
+            for alias in filter(None, row['aliases'].split('|')):
+                places[_key(alias)] = point
+    return places
+
+
+def resolve_location(text):
+    """
+    Coordinates for a free-text location such as "Koramangala, Bangalore,
+    India", or None. The whole string is tried first, then each
+    comma-separated part from most to least specific.
+    """
+    places = gazetteer()
+    key = _key(text)
+    if not key:
+        return None
+    if key in places:
+        return places[key]
+    for part in text.split(','):
+        point = places.get(_key(part))
+        if point:
+            return point
+    return None
+
+
+def parse_radius(params):
+    """
+    (lat, lng, radius_km) from `lat`, `lng` and `radius_km` in `params`, or
+    None when no radius search was asked for.
+    """
+    lat, lng, radius = params.get('lat'), params.get('lng'), params.get('radius_km')
+    if not (lat or lng or radius):
+        return None
+    if not (lat and lng and radius):
+        raise InvalidLocation('lat, lng and radius_km are required together')
+    try:
+        lat, lng, radius = float(lat), float(lng), float(radius)
+    except ValueError:
+        raise InvalidLocation('lat, lng and radius_km must be numbers')
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+        raise InvalidLocation('lat/lng out of range')
+    if not (0 < radius <= MAX_RADIUS_KM):
+        raise InvalidLocation(f'radius_km must be between 0 and {MAX_RADIUS_KM}')
+    return lat, lng, radius
+
+
+def bounding_box(lat, lng, radius_km):
+    """Q over the indexed latitude/longitude columns covering the circle."""
+    dlat = radius_km / KM_PER_DEGREE
+    box = Q(latitude__gte=max(lat - dlat, -90), latitude__lte=min(lat + dlat, 90))
+
+    cos_lat = math.cos(math.radians(lat))
+    if lat + dlat >= 90 or lat - dlat <= -90 or cos_lat < 1e-6:
+        # The circle covers a pole: every longitude is in range.
+        return box
+    dlng = radius_km / (KM_PER_DEGREE * cos_lat)
+    if dlng >= 180:
+        return box
+
+    west, east = lng - dlng, lng + dlng
+    if west < -180:
+        return box & (Q(longitude__gte=west + 360) | Q(longitude__lte=east))
+    if east > 180:
+        return box & (Q(longitude__gte=west) | Q(longitude__lte=east - 360))
+    return box & Q(longitude__gte=west, longitude__lte=east)
+
+
+def haversine_km(lat, lng):
+    """Great-circle distance in km from (lat, lng) to each row, computed by the database."""
+    half_dlat = Radians(F('latitude') - Value(lat)) / 2
+    half_dlng = Radians(F('longitude') - Value(lng)) / 2
+    a = (
+        Power(Sin(half_dlat), 2)
+        + Value(math.cos(math.radians(lat))) * Cos(Radians(F('latitude'))) * Power(Sin(half_dlng), 2)
+    )
+    return ExpressionWrapper(
+        2 * EARTH_RADIUS_KM * ASin(Least(Sqrt(a), Value(1.0))),
+        output_field=FloatField()
+    )
+
+
+def within_radius(queryset, lat, lng, radius_km):
+    """
+    Rows of `queryset` within `radius_km` of (lat, lng), annotated with
+    `distance_km`. The bounding box narrows the rows through the coordinate
+    index; the exact haversine distance is only computed for those.
+    """
+    return (
+        queryset
+        .filter(bounding_box(lat, lng, radius_km))
+        .annotate(distance_km=haversine_km(lat, lng))
+        .filter(distance_km__lte=radius_km)
+    )
@@ -0,0 +1,68 @@
+from django.core.paginator import Paginator
+
+from .facets import InvalidFacet, parse_facets
+from .geo import InvalidLocation
+from .pagination import InvalidPage, get_page_size, wants_cursor
+from .queries import is_nearby, open_jobs, order_listing
+from .serializers import JOB_LIST, InvalidFields
+from .skills import InvalidSkillMatch
+
+
+class InvalidListing(ValueError):
+    """A viewAllJobs request answered with 400; the message is the error."""
+
+
+class Listing:
+    """
+    A parsed viewAllJobs request: the filtered and projected querysets and
+    how to page them. The sync and async views share it and only differ in
+    how they run the queries (facets, page, count).
+    """
+
+    def __init__(self, request):
+        params = request.GET
+        try:
+            jobs = open_jobs(params)
+        except (InvalidLocation, InvalidSkillMatch) as e:
+            raise InvalidListing(str(e))
+        self.nearby = is_nearby(jobs)
+        try:
+            self.fields = JOB_LIST.parse_fields(request)
+        except InvalidFields as e:
+            raise InvalidListing(f'Invalid fields: {e}')
+        try:
+            self.facets = parse_facets(params['facets']) if params.get('facets') else None
+        except InvalidFacet as e:
+            raise InvalidListing(f'Invalid facet: {e}')
+
+        # Facets count the filtered jobs; the page reads the projected ones.
+        self.filtered = jobs
+        self.jobs = JOB_LIST.project(jobs, self.fields, extra=['posted_on', 'distance_km'] if self.nearby else ['posted_on'])
+        try:
+            page_size = get_page_size(request)
+        except InvalidPage as e:
+            raise InvalidListing(str(e))
+        # Keyset mode pages by (posted_on, id), so search results come newest first.
+        self.cursor = wants_cursor(request)
+        self.page = params.get('page')
+        self.paginator = None if self.cursor else Paginator(order_listing(self.jobs, params), page_size)
+
+    def payload(self, request, page_jobs, page_info=None, facets=None):
+        """Response body for the rows of one page (and the cursor page_info in keyset mode)."""
+        job_list = [JOB_LIST.serialize(job, request, self.fields) for job in page_jobs]
+        if self.nearby:
+            for job, row in zip(job_list, page_jobs):
+                job['distance_km'] = round(row['distance_km'], 2)
+
+        if page_info is not None:
+            data = {**page_info, 'jobs' : job_list}
+        else:
+            data = {
+                "count" : self.paginator.count,
+                "total_pages": self.paginator.num_pages,
+                'current': self.page,
+                'jobs' : job_list
+            }
+        if facets is not None:
+            data['facets'] = facets
+        return data
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from jobs.models import Job
+from jobs.skills import sync_job_skills
+
+
+class Command(BaseCommand):
+    help = "Populate Job.skills from skills_required for jobs that have no skills yet (or all jobs with --all)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help="Re-sync every job")
+
+    def handle(self, *args, **options):
+        jobs = Job.objects.only('id', 'skills_required')
+        if not options['all']:
+            jobs = jobs.filter(skills__isnull=True)
+
+        count = 0
+        for job in jobs.iterator(chunk_size=500):
+            sync_job_skills(job)
+            count += 1
+
+        self.stdout.write(self.style.SUCCESS(f"Synced skills for {count} jobs"))
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from jobs.geo import resolve_location
+from jobs.models import Company, Job
+from jobs.response_cache import bump_generation
+
+
+class Command(BaseCommand):
+    help = "Fill latitude/longitude of companies and jobs from their location using the bundled gazetteer"
+
+    def handle(self, *args, **options):
+        companies = {}
+        for company in Company.objects.only('id', 'location').iterator(chunk_size=500):
+            company.latitude, company.longitude = resolve_location(company.location) or (None, None)
+            companies[company.id] = company
+        Company.objects.bulk_update(companies.values(), ['latitude', 'longitude'], batch_size=500)
+
+        jobs = []
+        for job in Job.objects.only('id', 'company_id', 'location').iterator(chunk_size=500):
+            company = companies.get(job.company_id)
+            fallback = (company.latitude, company.longitude) if company else (None, None)
+            job.latitude, job.longitude = resolve_location(job.location) or fallback
+            jobs.append(job)
+        Job.objects.bulk_update(jobs, ['latitude', 'longitude'], batch_size=500)
+        # bulk_update sends no signals; drop cached listings ourselves.
+        bump_generation(pin=True)
+
+        located = sum(job.latitude is not None for job in jobs)
+        self.stdout.write(self.style.SUCCESS(
+            f"Geocoded {len(companies)} companies and {len(jobs)} jobs ({len(jobs) - located} without a location)"
+        ))
@@ -0,0 +1,36 @@
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from jobs.bulk_import import FORMATS, IMPORT_CHUNK_SIZE, guess_format, import_jobs, read_rows
+
+
+class Command(BaseCommand):
+    help = "Create jobs from a CSV or JSON Lines file using the createJob validation rules"
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="File to import")
+        parser.add_argument('--format', choices=FORMATS, help="Defaults to the file extension")
+        parser.add_argument('--owner', help="Only accept companies owned by this username")
+        parser.add_argument('--chunk-size', type=int, default=IMPORT_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        owner = None
+        if options['owner']:
+            try:
+                owner = User.objects.get(username=options['owner'])
+            except User.DoesNotExist:
+                raise CommandError(f"User {options['owner']!r} not found")
+
+        format = options['format'] or guess_format(options['path'])
+        started = time.monotonic()
+        with open(options['path'], 'rb') as f:
+            report = import_jobs(read_rows(f, format), owner=owner, chunk_size=options['chunk_size'])
+        elapsed = time.monotonic() - started
+
+        for error in report['errors']:
+            self.stderr.write(f"row {error['row']}: {error['error']}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {report['created']} jobs, {report['failed']} rows failed ({elapsed:.1f}s)"
+        ))
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from jobs.models import Job
+from jobs.search import index_job
+
+
+class Command(BaseCommand):
+    help = "Build search documents for jobs that do not have one yet (or all jobs with --all)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help="Re-index every job")
+
+    def handle(self, *args, **options):
+        jobs = Job.objects.select_related('company')
+        if not options['all']:
+            jobs = jobs.filter(search_document__isnull=True)
+
+        count = 0
+        for job in jobs.iterator(chunk_size=500):
+            index_job(job)
+            count += 1
+
+        self.stdout.write(self.style.SUCCESS(f"Indexed {count} jobs"))
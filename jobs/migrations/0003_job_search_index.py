@@ -0,0 +1,60 @@
+# Generated by Django 6.0 on 2026-10-18 11:49
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+SEARCH_VECTOR = (
+    "(setweight(to_tsvector('english', title), 'A') || "
+    "setweight(to_tsvector('english', skills), 'B') || "
+    "setweight(to_tsvector('english', company), 'C') || "
+    "setweight(to_tsvector('english', body), 'D'))"
+)
+
+
+def create_gin_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        "CREATE INDEX jobs_search_document_gin_idx ON jobs_jobsearchdocument "
+        f"USING gin ({SEARCH_VECTOR})"
+    )
+
+
+def drop_gin_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute("DROP INDEX IF EXISTS jobs_search_document_gin_idx")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0002_company_owner'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='JobSearchDocument',
+            fields=[
+                ('job', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='search_document', serialize=False, to='jobs.job')),
+                ('title', models.TextField(blank=True)),
+                ('skills', models.TextField(blank=True)),
+                ('company', models.TextField(blank=True)),
+                ('body', models.TextField(blank=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='JobSearchTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64)),
+                ('weight', models.PositiveSmallIntegerField(default=1)),
+                ('job', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_terms', to='jobs.job')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['term', 'job'], name='jobs_search_term_job_idx')],
+            },
+        ),
+        migrations.RunPython(create_gin_index, drop_gin_index),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 6.0 on 2026-10-18 11:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0003_job_search_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='job',
+            index=models.Index(fields=['application_deadline', '-posted_on'], name='job_deadline_posted_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='job',
+            index=models.Index(fields=['-posted_on', '-id'], name='job_posted_keyset_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='job',
+            index=models.Index(fields=['job_type', 'application_deadline', '-posted_on'], name='job_type_deadline_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='job',
+            index=models.Index(fields=['application_deadline', 'min_salary', 'max_salary'], name='job_deadline_salary_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='job',
+            index=models.Index(fields=['company', '-posted_on'], name='job_company_posted_idx'),
+        ),
+    ]
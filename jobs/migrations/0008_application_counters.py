@@ -0,0 +1,54 @@
+# Generated by Django 6.0 on 2026-10-18 12:08
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def count_applications(apps, schema_editor):
+    Application = apps.get_model('applications', 'Application')
+    Job = apps.get_model('jobs', 'Job')
+    counts = {}
+    rows = Application.objects.values_list('job_id', 'status').annotate(n=Count('id')).order_by()
+    for job_id, status, n in rows:
+        job_counts = counts.setdefault(job_id, {'applications_total': 0})
+        job_counts[f'applications_{status}'] = n
+        job_counts['applications_total'] += n
+    for job_id, job_counts in counts.items():
+        Job.objects.filter(id=job_id).update(**job_counts)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0007_coordinates'),
+        ('applications', '0004_active_application_constraint'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='job',
+            name='applications_applied',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='job',
+            name='applications_rejected',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='job',
+            name='applications_shortlisted',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='job',
+            name='applications_total',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='job',
+            name='applications_withdrawn',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(count_applications, migrations.RunPython.noop),
+    ]
@@ -8,6 +8,8 @@ class Company(models.Model):
     description = models.TextField()
     location = models.CharField(max_length=200, blank=True)
     website = models.URLField(blank=True)
+    latitude = models.FloatField(null=True, blank=True)
+    longitude = models.FloatField(null=True, blank=True)
     owner = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -15,6 +17,15 @@ class Company(models.Model):
         blank=True,
         null=True
     )
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    def __str__(self):
+        return self.name
+
+
+class Skill(models.Model):
+    name = models.CharField(max_length=100)
+    slug = models.CharField(max_length=100, unique=True)
 
     def __str__(self):
         return self.name
@@ -32,13 +43,65 @@ class Job(models.Model):
     company = models.ForeignKey(Company, on_delete=models.CASCADE)
     description = models.TextField()
     skills_required = models.CharField(max_length=300)
+    skills = models.ManyToManyField(Skill, related_name='jobs', blank=True)
     min_salary = models.IntegerField()
     max_salary = models.IntegerField()
     location = models.CharField(max_length=100)
+    latitude = models.FloatField(null=True, blank=True)
+    longitude = models.FloatField(null=True, blank=True)
     job_type = models.CharField(max_length=20, choices=JOB_TYPES)
     posted_on = models.DateTimeField(auto_now_add=True)
     application_deadline = models.DateField()
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+    # Application counters, maintained by applications.stats.
+    applications_total = models.PositiveIntegerField(default=0)
+    applications_applied = models.PositiveIntegerField(default=0)
+    applications_shortlisted = models.PositiveIntegerField(default=0)
+    applications_rejected = models.PositiveIntegerField(default=0)
+    applications_withdrawn = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            # Public listing: open jobs, newest first (also the keyset order).
+            models.Index(fields=['application_deadline', '-posted_on'], name='job_deadline_posted_idx'),
+            models.Index(fields=['-posted_on', '-id'], name='job_posted_keyset_idx'),
+            models.Index(fields=['job_type', 'application_deadline', '-posted_on'], name='job_type_deadline_idx'),
+            models.Index(fields=['application_deadline', 'min_salary', 'max_salary'], name='job_deadline_salary_idx'),
+            # Recruiter listings: myJobs / myCompanyJobs.
+            models.Index(fields=['company', '-posted_on'], name='job_company_posted_idx'),
+            # Radius search bounding box.
+            models.Index(fields=['latitude', 'longitude'], name='job_lat_lng_idx'),
+        ]
 
     def __str__(self):
         return self.title
 
+
+class JobSearchDocument(models.Model):
+    job = models.OneToOneField(
+        Job,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='search_document'
+    )
+    title = models.TextField(blank=True)
+    skills = models.TextField(blank=True)
+    company = models.TextField(blank=True)
+    body = models.TextField(blank=True)
+
+    def __str__(self):
+        return f"Search document for job {self.job_id}"
+
+
+class JobSearchTerm(models.Model):
+    job = models.ForeignKey(Job, on_delete=models.CASCADE, related_name='search_terms')
+    term = models.CharField(max_length=64)
+    weight = models.PositiveSmallIntegerField(default=1)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['term', 'job'], name='jobs_search_term_job_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.term} -> {self.job_id}"
@@ -0,0 +1,174 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+
+from .models import Company, Job
+from .serializers import COMPANY_DETAIL, COMPANY_JOB, JOB_DETAIL
+
+
+class _LocalTier:
+    """Small thread-safe LRU with a TTL, private to this process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def get(self, key):
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return None
+            entry, expires = item
+            if expires < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key, entry):
+        with self._lock:
+            self._entries[key] = (entry, time.monotonic() + settings.OBJECT_CACHE_LOCAL_TTL)
+            self._entries.move_to_end(key)
+            while len(self._entries) > settings.OBJECT_CACHE_LOCAL_SIZE:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+
+class ObjectCache:
+    """
+    Read-through cache of serialized objects keyed by kind and primary key:
+    an in-process LRU in front of the shared Django cache. Entries hold the
+    payload already serialized (file URLs kept relative, see
+    Shape.absolutize) so a hit costs neither a query nor a rebuild.
+
+    Job/Company signals delete entries from the shared tier and from this
+    process; other processes may serve their local copy for up to
+    OBJECT_CACHE_LOCAL_TTL seconds. An entry can also carry a version that
+    the caller checks, for payloads whose freshness is known up front.
+    """
+
+    def __init__(self):
+        self.local = _LocalTier()
+
+    @property
+    def shared(self):
+        return caches[getattr(settings, 'OBJECT_CACHE_ALIAS', 'default')]
+
+    @staticmethod
+    def key(kind, pk):
+        return f"objects:{kind}:{pk}"
+
+    def get(self, kind, pk, build, version=None):
+        """
+        The entry for (kind, pk), calling `build()` on a miss. `build` returns
+        a dict (cached) or None (not found, not cached).
+        """
+        key = self.key(kind, pk)
+        entry = self.local.get(key)
+        if entry is not None and entry.get('version') == version:
+            return entry
+
+        entry = self.shared.get(key)
+        if entry is None or entry.get('version') != version:
+            entry = build()
+            if entry is None:
+                return None
+            entry['version'] = version
+            self.shared.set(key, entry, settings.OBJECT_CACHE_TIMEOUT)
+        self.local.set(key, entry)
+        return entry
+
+    async def aget(self, kind, pk, abuild, version=None):
+        """Async get(); `abuild` is a coroutine function."""
+        key = self.key(kind, pk)
+        entry = self.local.get(key)
+        if entry is not None and entry.get('version') == version:
+            return entry
+
+        entry = await self.shared.aget(key)
+        if entry is None or entry.get('version') != version:
+            entry = await abuild()
+            if entry is None:
+                return None
+            entry['version'] = version
+            await self.shared.aset(key, entry, settings.OBJECT_CACHE_TIMEOUT)
+        self.local.set(key, entry)
+        return entry
+
+    def invalidate(self, kind, *pks):
+        keys = [self.key(kind, pk) for pk in pks]
+        for key in keys:
+            self.local.delete(key)
+        self.shared.delete_many(keys)
+
+
+object_cache = ObjectCache()
+
+
+def _job_query(job_id):
+    return JOB_DETAIL.project(Job.objects, extra=['updated_at', 'company__updated_at']).filter(id=job_id)
+
+
+def _job_entry(row):
+    if row is None:
+        return None
+    return {
+        'data': JOB_DETAIL.serialize(row, None),
+        'last_modified': max(row['updated_at'], row['company__updated_at']),
+    }
+
+
+def _build_job(job_id):
+    return _job_entry(_job_query(job_id).first())
+
+
+async def _abuild_job(job_id):
+    return _job_entry(await _job_query(job_id).afirst())
+
+
+def cached_job(request, job_id):
+    """Cached JOB_DETAIL entry for a job (None if it does not exist), memoized on the request."""
+    if not hasattr(request, '_cached_jobs'):
+        request._cached_jobs = {}
+    if job_id not in request._cached_jobs:
+        request._cached_jobs[job_id] = object_cache.get('job', job_id, lambda: _build_job(job_id))
+    return request._cached_jobs[job_id]
+
+
+async def acached_job(request, job_id):
+    """Async cached_job(), sharing its memo so later sync lookups are free."""
+    if not hasattr(request, '_cached_jobs'):
+        request._cached_jobs = {}
+    if job_id not in request._cached_jobs:
+        request._cached_jobs[job_id] = await object_cache.aget('job', job_id, lambda: _abuild_job(job_id))
+    return request._cached_jobs[job_id]
+
+
+def _build_company(company_id):
+    company = COMPANY_DETAIL.project(Company.objects).filter(id=company_id).first()
+    if company is None:
+        return None
+    limit = settings.OBJECT_CACHE_MAX_LIST
+    jobs = list(COMPANY_JOB.project(Job.objects.filter(company_id=company_id))[:limit + 1])
+    if len(jobs) > limit:
+        # Too big to hold in memory; the view streams it instead.
+        return {'data': None}
+    data = COMPANY_DETAIL.serialize(company, None)
+    data['jobs'] = [COMPANY_JOB.serialize(job, None) for job in jobs]
+    return {'data': data}
+
+
+def cached_company(company_id, version):
+    """
+    Cached companyDetails payload, valid for `version` (see
+    conditional.company_version; it covers counter updates, which send no
+    signals). Its data is None for companies with more than
+    OBJECT_CACHE_MAX_LIST jobs.
+    """
+    return object_cache.get('company', company_id, lambda: _build_company(company_id), version=version)
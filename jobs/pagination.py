@@ -0,0 +1,141 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+
+from django.db.models import Q
+
+
+DEFAULT_PAGE_SIZE = 10
+MAX_PAGE_SIZE = 100
+
+
+class InvalidPage(ValueError):
+    """A paging parameter answered with 400; the message is the error."""
+
+
+class InvalidCursor(InvalidPage):
+    def __init__(self):
+        super().__init__('Invalid cursor')
+
+
+class InvalidPageSize(InvalidPage):
+    def __init__(self):
+        super().__init__(f'page_size must be a whole number from 1 to {MAX_PAGE_SIZE}')
+
+
+def wants_cursor(request):
+    return 'cursor' in request.GET or request.GET.get('pagination') == 'cursor'
+
+
+def get_page_size(request):
+    """`page_size` from the query string; raises InvalidPageSize when out of range."""
+    try:
+        page_size = int(request.GET.get('page_size') or DEFAULT_PAGE_SIZE)
+    except ValueError:
+        raise InvalidPageSize
+    if not 1 <= page_size <= MAX_PAGE_SIZE:
+        raise InvalidPageSize
+    return page_size
+
+
+def encode_cursor(value, pk, direction):
+    payload = json.dumps([value.isoformat(), pk, direction], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        value, pk, direction = json.loads(base64.urlsafe_b64decode(padded))
+        value = datetime.fromisoformat(value)
+        pk = int(pk)
+    except (binascii.Error, UnicodeDecodeError, TypeError, ValueError):
+        raise InvalidCursor
+    if direction not in ('next', 'prev'):
+        raise InvalidCursor
+    return value, pk, direction
+
+
+def _key(row, field):
+    if isinstance(row, dict):
+        return row[field], row['id']
+    return getattr(row, field), row.pk
+
+
+def _keyset_page(request, queryset, field):
+    """The ordered, cursor-filtered queryset for a page plus its direction."""
+    token = request.GET.get('cursor')
+    direction = 'next'
+    page = queryset
+
+    if token:
+        value, pk, direction = decode_cursor(token)
+        if direction == 'prev':
+            page = page.filter(
+                Q(**{f'{field}__gt': value}) | Q(**{field: value, 'id__gt': pk})
+            )
+        else:
+            page = page.filter(
+                Q(**{f'{field}__lt': value}) | Q(**{field: value, 'id__lt': pk})
+            )
+
+    if direction == 'prev':
+        page = page.order_by(field, 'id')
+    else:
+        page = page.order_by(f'-{field}', '-id')
+    return page, direction, token
+
+
+def _page_info(rows, page_size, direction, token, field):
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+    if direction == 'prev':
+        rows.reverse()
+
+    next_cursor = prev_cursor = None
+    if rows:
+        first, last = _key(rows[0], field), _key(rows[-1], field)
+        if direction == 'prev':
+            prev_cursor = encode_cursor(*first, 'prev') if has_more else None
+            next_cursor = encode_cursor(*last, 'next')
+        else:
+            next_cursor = encode_cursor(*last, 'next') if has_more else None
+            prev_cursor = encode_cursor(*first, 'prev') if token else None
+
+    return rows, {
+        'next': next_cursor,
+        'prev': prev_cursor,
+        'page_size': page_size,
+    }
+
+
+def _wants_count(request):
+    return request.GET.get('with_count') in ('1', 'true')
+
+
+def cursor_paginate(request, queryset, field):
+    """
+    Keyset pagination over (field, id), newest first. Never issues OFFSET and
+    only counts the queryset when the caller passes `with_count=true`.
+
+    Returns (rows, page_info) where page_info holds the opaque `next`/`prev`
+    cursors. Raises InvalidCursor for a tampered or malformed cursor and
+    InvalidPageSize for a bad `page_size`.
+    """
+    page_size = get_page_size(request)
+    page, direction, token = _keyset_page(request, queryset, field)
+    rows, page_info = _page_info(list(page[:page_size + 1]), page_size, direction, token, field)
+    if _wants_count(request):
+        page_info['count'] = queryset.count()
+    return rows, page_info
+
+
+async def acursor_paginate(request, queryset, field):
+    """Async cursor_paginate()."""
+    page_size = get_page_size(request)
+    page, direction, token = _keyset_page(request, queryset, field)
+    rows, page_info = _page_info([row async for row in page[:page_size + 1]], page_size, direction, token, field)
+    if _wants_count(request):
+        page_info['count'] = await queryset.acount()
+    return rows, page_info
@@ -0,0 +1,67 @@
+from django.utils import timezone
+
+from .geo import parse_radius, within_radius
+from .models import Job
+from .search import search_jobs
+from .skills import filter_by_skills, parse_skill_match
+
+
+def open_jobs(params):
+    """
+    Open jobs matching the public listing filters in `params` (a QueryDict
+    or plain dict). Unordered; `search` adds a `search_rank` annotation and
+    a radius search (`lat`, `lng`, `radius_km`) adds `distance_km`. Raises
+    InvalidLocation for a malformed radius search and InvalidSkillMatch for
+    a `skills_match` other than 'any' or 'all'.
+    """
+    today = timezone.now().date()
+    jobs = Job.objects.filter(application_deadline__gte = today).select_related('company')
+
+    job_type = params.get("job_type")
+    location = params.get("location")
+    min_salary = params.get('min_salary')
+    max_salary = params.get('max_salary')
+    search = params.get('search')
+    skills = params.get('skills')
+    skills_match = parse_skill_match(params)
+    radius = parse_radius(params)
+
+    if job_type:
+        jobs = jobs.filter(job_type = job_type)
+
+    if location:
+        jobs = jobs.filter(location__icontains = location)
+
+    if min_salary:
+        jobs = jobs.filter(min_salary__gte = min_salary)
+
+    if max_salary:
+        jobs = jobs.filter(max_salary__lte = max_salary)
+
+    if skills:
+        jobs = filter_by_skills(jobs, skills, skills_match)
+
+    if radius:
+        jobs = within_radius(jobs, *radius)
+
+    if search:
+        jobs = search_jobs(jobs, search)
+
+    return jobs
+
+
+def is_nearby(jobs):
+    """Whether open_jobs ran a radius search, i.e. `jobs` has `distance_km`."""
+    return 'distance_km' in jobs.query.annotations
+
+
+def order_listing(jobs, params):
+    """
+    Order for the page-numbered listing: nearest first for a radius search
+    with `sort=distance`, most relevant first for `search`, else newest.
+    """
+    if is_nearby(jobs) and params.get('sort') == 'distance':
+        return jobs.order_by('distance_km', '-posted_on')
+    if params.get('search'):
+        return jobs.order_by('-search_rank', '-posted_on')
+    return jobs.order_by('-posted_on')
@@ -0,0 +1,235 @@
+import logging
+import threading
+import time
+
+import numpy as np
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
+
+from applications.models import Application
+from .models import Job, Skill
+from .skills import parse_skills
+
+
+logger = logging.getLogger(__name__)
+
+EXPLICIT_SKILL_WEIGHT = 2.0
+HISTORY_SKILL_WEIGHT = 1.0
+
+
+class JobSkillIndex:
+    """
+    Sparse open-job x skill matrix held in NumPy arrays (COO form: one entry
+    per job/skill pair). Scoring an applicant is a single weighted bincount
+    over the entries, so it costs O(postings) in vectorized code instead of
+    a Python loop over jobs.
+
+    Jobs changed through save/delete signals are only marked dirty; they are
+    re-read in one batch on the next query. The index is rebuilt from
+    scratch every RECOMMENDER_REBUILD_SECONDS to drop expired jobs and pick
+    up writes made by other worker processes. Rebuilds run on a background
+    thread into a new index that is swapped in when done; queries keep
+    scoring against the old one meanwhile.
+    """
+
+    # Everything a rebuild replaces.
+    STATE = ('job_ids', 'deadlines', 'live', 'norms', 'entry_rows', 'entry_skills', 'row_of')
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._dirty = set()
+        self._built_at = None
+        self._stale = False
+        self._rebuilding = False
+        # Dirty jobs applied to the old index while a rebuild runs.
+        self._changes = None
+        self._clear()
+
+    def _clear(self):
+        self.job_ids = np.empty(0, dtype=np.int64)
+        self.deadlines = np.empty(0, dtype=np.int32)
+        self.live = np.empty(0, dtype=bool)
+        self.norms = np.empty(0, dtype=np.float32)
+        self.entry_rows = np.empty(0, dtype=np.int32)
+        self.entry_skills = np.empty(0, dtype=np.int32)
+        self.row_of = {}
+
+    def mark_dirty(self, job_id):
+        with self._lock:
+            self._dirty.add(job_id)
+
+    def invalidate(self):
+        """Rebuild on next query; cheaper than marking a large batch dirty."""
+        with self._lock:
+            self._stale = True
+
+    def _load(self, jobs):
+        """Fetch (job id, deadline ordinal) and job/skill postings for `jobs`."""
+        rows = list(jobs.values_list('id', 'application_deadline'))
+        postings = list(
+            Job.skills.through.objects
+            .filter(job_id__in=jobs.values('id'))
+            .values_list('job_id', 'skill_id')
+        )
+        return rows, postings
+
+    def _append(self, rows, postings):
+        if not rows:
+            return
+        start = len(self.job_ids)
+        ids = np.fromiter((job_id for job_id, _ in rows), dtype=np.int64, count=len(rows))
+        deadlines = np.fromiter((deadline.toordinal() for _, deadline in rows), dtype=np.int32, count=len(rows))
+        for offset, job_id in enumerate(ids.tolist()):
+            self.row_of[job_id] = start + offset
+
+        entry_rows = np.fromiter((self.row_of[job_id] for job_id, _ in postings), dtype=np.int32, count=len(postings))
+        entry_skills = np.fromiter((skill_id for _, skill_id in postings), dtype=np.int32, count=len(postings))
+        counts = np.bincount(entry_rows - start, minlength=len(rows)).astype(np.float32)
+
+        self.job_ids = np.concatenate([self.job_ids, ids])
+        self.deadlines = np.concatenate([self.deadlines, deadlines])
+        self.live = np.concatenate([self.live, np.ones(len(rows), dtype=bool)])
+        # Dampen jobs that list many skills so they don't match everyone.
+        self.norms = np.concatenate([self.norms, 1.0 / np.sqrt(np.maximum(counts, 1.0))])
+        self.entry_rows = np.concatenate([self.entry_rows, entry_rows])
+        self.entry_skills = np.concatenate([self.entry_skills, entry_skills])
+
+    def _compact(self):
+        keep = self.live
+        remap = np.full(len(keep), -1, dtype=np.int32)
+        remap[keep] = np.arange(int(keep.sum()), dtype=np.int32)
+        entries = keep[self.entry_rows]
+
+        self.job_ids = self.job_ids[keep]
+        self.deadlines = self.deadlines[keep]
+        self.norms = self.norms[keep]
+        self.live = np.ones(len(self.job_ids), dtype=bool)
+        self.entry_rows = remap[self.entry_rows[entries]]
+        self.entry_skills = self.entry_skills[entries]
+        self.row_of = {job_id: row for row, job_id in enumerate(self.job_ids.tolist())}
+
+    def _claim_rebuild(self):
+        """With the lock held: True if the caller should rebuild now."""
+        if self._rebuilding:
+            return False
+        max_age = getattr(settings, 'RECOMMENDER_REBUILD_SECONDS', 300)
+        if self._built_at is not None and not self._stale and time.monotonic() - self._built_at <= max_age:
+            return False
+        self._rebuilding = True
+        self._stale = False
+        self._changes = set()
+        return True
+
+    def _rebuild(self):
+        fresh = JobSkillIndex()
+        try:
+            fresh._append(*fresh._load(Job.objects.filter(application_deadline__gte=timezone.now().date())))
+        except BaseException:
+            with self._lock:
+                self._rebuilding = False
+                self._changes = None
+            raise
+        with self._lock:
+            for name in self.STATE:
+                setattr(self, name, getattr(fresh, name))
+            # The build may have read these jobs before they changed.
+            self._dirty |= self._changes
+            self._built_at = time.monotonic()
+            self._rebuilding = False
+            self._changes = None
+
+    def _rebuild_in_background(self):
+        try:
+            self._rebuild()
+        except Exception:
+            logger.exception("Recommendation index rebuild failed; serving the previous index")
+        finally:
+            connections.close_all()
+
+    def _refresh(self, today):
+        if not self._dirty:
+            return
+
+        dirty, self._dirty = self._dirty, set()
+        if self._changes is not None:
+            self._changes |= dirty
+        for job_id in dirty:
+            row = self.row_of.pop(job_id, None)
+            if row is not None:
+                self.live[row] = False
+        self._append(*self._load(Job.objects.filter(id__in=dirty, application_deadline__gte=today)))
+
+        if (~self.live).sum() > self.live.sum():
+            self._compact()
+
+    def top_jobs(self, skill_weights, exclude_job_ids=(), limit=10):
+        """
+        Best `limit` open jobs for a {skill_id: weight} profile, as a list
+        of (job_id, score) with the highest score first.
+        """
+        today = timezone.now().date()
+        with self._lock:
+            claimed = self._claim_rebuild()
+            built = self._built_at is not None
+        if claimed and built:
+            threading.Thread(target=self._rebuild_in_background, name='recommend-rebuild', daemon=True).start()
+        elif claimed:
+            # Nothing to score against yet.
+            self._rebuild()
+        with self._lock:
+            self._refresh(today)
+            if not len(self.job_ids) or not skill_weights:
+                return []
+
+            width = int(max(self.entry_skills.max(initial=0), max(skill_weights))) + 1
+            weights = np.zeros(width, dtype=np.float32)
+            weights[np.fromiter(skill_weights.keys(), dtype=np.int64)] = np.fromiter(
+                skill_weights.values(), dtype=np.float32
+            )
+
+            scores = np.bincount(
+                self.entry_rows,
+                weights=weights[self.entry_skills],
+                minlength=len(self.job_ids)
+            ).astype(np.float32) * self.norms
+
+            eligible = self.live & (self.deadlines >= today.toordinal()) & (scores > 0)
+            excluded = [self.row_of[job_id] for job_id in exclude_job_ids if job_id in self.row_of]
+            eligible[excluded] = False
+
+            candidates = np.flatnonzero(eligible)
+            if len(candidates) > limit:
+                best = np.argpartition(-scores[candidates], limit - 1)[:limit]
+                candidates = candidates[best]
+            order = candidates[np.argsort(-scores[candidates], kind='stable')]
+            return list(zip(self.job_ids[order].tolist(), scores[order].tolist()))
+
+
+job_skill_index = JobSkillIndex()
+
+
+def applicant_skill_weights(user, skills_param=None):
+    """
+    Skill profile of an applicant: skills passed explicitly plus the skills
+    of jobs they applied to, weighted by how often they recur.
+    """
+    applied_job_ids = set(Application.objects.filter(applicant=user).values_list('job_id', flat=True))
+
+    weights = {}
+    if applied_job_ids:
+        history = Job.skills.through.objects.filter(job_id__in=applied_job_ids).values_list('skill_id', flat=True)
+        counts = {}
+        for skill_id in history:
+            counts[skill_id] = counts.get(skill_id, 0) + 1
+        if counts:
+            most = max(counts.values())
+            for skill_id, count in counts.items():
+                weights[skill_id] = HISTORY_SKILL_WEIGHT * count / most
+
+    slugs = list(parse_skills(skills_param))
+    if slugs:
+        for skill_id in Skill.objects.filter(slug__in=slugs).values_list('id', flat=True):
+            weights[skill_id] = weights.get(skill_id, 0) + EXPLICIT_SKILL_WEIGHT
+
+    return weights, applied_job_ids
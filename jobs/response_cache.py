@@ -0,0 +1,166 @@
+import hashlib
+import time
+from functools import partial, wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.http import HttpResponse
+from django.utils import timezone
+
+from backend.replicas import pin_primary, reading_replica
+
+
+GENERATION_KEY = 'jobs:listing:generation'
+# Present for REPLICA_STICKY_SECONDS after a bump (see _save).
+RECENT_WRITE_KEY = 'jobs:listing:recent_write'
+LOCK_TIMEOUT = 10
+
+
+def get_cache():
+    return caches[getattr(settings, 'JOBS_RESPONSE_CACHE_ALIAS', 'default')]
+
+
+def current_generation(cache=None):
+    cache = cache or get_cache()
+    generation = cache.get(GENERATION_KEY)
+    if generation is None:
+        # Seed from the clock so an evicted counter never restarts at a
+        # value that old entries were stored under.
+        cache.add(GENERATION_KEY, time.time_ns() // 1000, None)
+        generation = cache.get(GENERATION_KEY)
+    return generation
+
+
+def bump_generation(using=None, pin=False):
+    """
+    Drop every cached response once the current transaction on `using`
+    commits (right away outside one). Bumping earlier would let a request
+    that still reads the old rows cache them under the new generation.
+
+    `pin` also sends every client's reads to the primary for a while; keep
+    it for bulk maintenance. After an ordinary write only the writing client
+    is pinned (by ReplicaMiddleware).
+    """
+    transaction.on_commit(partial(_bump_generation, pin), using=using)
+
+
+def _bump_generation(pin):
+    cache = get_cache()
+    try:
+        cache.incr(GENERATION_KEY)
+    except ValueError:
+        current_generation(cache)
+    if pin:
+        pin_primary()
+    elif settings.DATABASE_REPLICAS:
+        cache.set(RECENT_WRITE_KEY, 1, settings.REPLICA_STICKY_SECONDS)
+
+
+def response_cache_key(view_name, request):
+    params = sorted((key, sorted(values)) for key, values in request.GET.lists())
+    raw = repr((request.get_host(), request.path, params))
+    digest = hashlib.sha1(raw.encode()).hexdigest()
+    # Open listings change at midnight without any write, so the day is part of the key.
+    return f"jobs:response:{view_name}:{timezone.now().date().isoformat()}:{digest}"
+
+
+def _from_entry(entry, state):
+    response = HttpResponse(
+        entry['content'],
+        status=entry['status'],
+        content_type=entry['content_type']
+    )
+    response['X-Cache'] = state
+    return response
+
+
+def _lookup(view_name, request):
+    """
+    (key, generation, cached response or None, whether we took the rebuild
+    lock). With no cached response the caller runs the view.
+    """
+    cache = get_cache()
+    key = response_cache_key(view_name, request)
+    generation = current_generation(cache)
+    entry = cache.get(key)
+
+    if entry is None:
+        return key, generation, None, False
+    if entry['generation'] == generation and entry['fresh_until'] > time.time():
+        return key, generation, _from_entry(entry, 'HIT'), False
+    if not cache.add(f"{key}:lock", 1, LOCK_TIMEOUT):
+        return key, generation, _from_entry(entry, 'STALE'), False
+    return key, generation, None, True
+
+
+def _cacheable(response):
+    return response.status_code == 200 and not response.streaming
+
+
+def _save(key, generation, response):
+    cache = get_cache()
+    # A replica may not have the latest write yet; serve what it returned
+    # but do not cache it under the new generation.
+    if reading_replica() and cache.get(RECENT_WRITE_KEY):
+        return
+    timeout = settings.JOBS_RESPONSE_CACHE_TIMEOUT
+    cache.set(key, {
+        'generation': generation,
+        'fresh_until': time.time() + timeout,
+        'status': response.status_code,
+        'content': response.content,
+        'content_type': response['Content-Type'],
+    }, timeout + settings.JOBS_RESPONSE_CACHE_STALE_TIMEOUT)
+    response['X-Cache'] = 'MISS'
+
+
+def cache_public_response(view_name):
+    """
+    Cache GET responses of an anonymous view per normalized query string.
+
+    Entries are tagged with the listing generation, which Job/Company signals
+    bump on every write, so edits show up on the next request. When an entry
+    is out of date one worker rebuilds it while the others keep serving the
+    previous copy. On async views the cache is read in one sync_to_async
+    call: Django's async cache methods each hop to a thread anyway.
+    """
+    def decorator(view_func):
+        if iscoroutinefunction(view_func):
+            @wraps(view_func)
+            async def _async_wrapped_view(request, *args, **kwargs):
+                if request.method != 'GET':
+                    return await view_func(request, *args, **kwargs)
+
+                key, generation, cached, locked = await sync_to_async(_lookup)(view_name, request)
+                if cached is not None:
+                    return cached
+                try:
+                    response = await view_func(request, *args, **kwargs)
+                    if _cacheable(response):
+                        await sync_to_async(_save)(key, generation, response)
+                finally:
+                    if locked:
+                        await get_cache().adelete(f"{key}:lock")
+                return response
+            return _async_wrapped_view
+
+        @wraps(view_func)
+        def _wrapped_view(request, *args, **kwargs):
+            if request.method != 'GET':
+                return view_func(request, *args, **kwargs)
+
+            key, generation, cached, locked = _lookup(view_name, request)
+            if cached is not None:
+                return cached
+            try:
+                response = view_func(request, *args, **kwargs)
+                if _cacheable(response):
+                    _save(key, generation, response)
+            finally:
+                if locked:
+                    get_cache().delete(f"{key}:lock")
+            return response
+        return _wrapped_view
+    return decorator
@@ -0,0 +1,192 @@
+import re
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import FloatField, IntegerField, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.expressions import RawSQL
+
+from .models import Job, JobSearchDocument, JobSearchTerm
+
+
+TOKEN_RE = re.compile(r"[a-z0-9][a-z0-9+#.]*")
+
+STOP_WORDS = {
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'for', 'from', 'in',
+    'is', 'it', 'of', 'on', 'or', 'that', 'the', 'to', 'with', 'we', 'you',
+}
+
+# (document field, weight) - a hit in the title counts more than one in the body.
+FIELD_WEIGHTS = (
+    ('title', 4),
+    ('skills', 3),
+    ('company', 2),
+    ('body', 1),
+)
+
+MAX_TERM_LENGTH = 64
+
+
+def tokenize(text):
+    tokens = []
+    for token in TOKEN_RE.findall((text or '').lower()):
+        token = token.rstrip('.')[:MAX_TERM_LENGTH]
+        if token and token not in STOP_WORDS:
+            tokens.append(token)
+    return tokens
+
+
+def build_document(job):
+    return {
+        'title': job.title or '',
+        'skills': job.skills_required or '',
+        'company': job.company.name if job.company_id else '',
+        'body': job.description or '',
+    }
+
+
+class TermIndexBackend:
+    """
+    Inverted index kept in the jobs_jobsearchterm table. Works on every
+    database engine, so it is used for local development and tests.
+    """
+
+    def terms(self, job_id, document):
+        weights = {}
+        for field, weight in FIELD_WEIGHTS:
+            for term in tokenize(document[field]):
+                weights[term] = min(weights.get(term, 0) + weight, 32767)
+        return [
+            JobSearchTerm(job_id=job_id, term=term, weight=weight)
+            for term, weight in weights.items()
+        ]
+
+    def index(self, job, document):
+        JobSearchTerm.objects.filter(job=job).delete()
+        JobSearchTerm.objects.bulk_create(self.terms(job.id, document))
+
+    def index_new(self, documents):
+        JobSearchTerm.objects.bulk_create(
+            [term for job, document in documents for term in self.terms(job.id, document)],
+            batch_size=1000
+        )
+
+    def reindex(self, documents):
+        """Rebuild the terms of the jobs behind a JobSearchDocument queryset."""
+        rows = documents.values('job_id', *(field for field, _ in FIELD_WEIGHTS))
+        documents = [(row.pop('job_id'), row) for row in rows]
+        JobSearchTerm.objects.filter(job_id__in=[job_id for job_id, _ in documents]).delete()
+        JobSearchTerm.objects.bulk_create(
+            [term for job_id, document in documents for term in self.terms(job_id, document)],
+            batch_size=1000
+        )
+
+    def search(self, queryset, terms):
+        # Every query word is a prefix: "dev" finds "developer".
+        prefixes = Q()
+        for term in terms:
+            prefixes |= Q(term__startswith=term)
+        matches = JobSearchTerm.objects.filter(prefixes)
+        rank = (
+            matches.filter(job=OuterRef('pk'))
+            .values('job')
+            .annotate(rank=Sum('weight'))
+            .values('rank')
+        )
+        return queryset.filter(id__in=matches.values('job_id')).annotate(
+            search_rank=Subquery(rank, output_field=IntegerField())
+        )
+
+
+class PostgresBackend:
+    """
+    Full text search on a GIN expression index over jobs_jobsearchdocument.
+    VECTOR_SQL must stay identical to the expression in migration 0003,
+    otherwise the planner cannot use the index.
+    """
+
+    VECTOR_SQL = (
+        "(setweight(to_tsvector('english', title), 'A') || "
+        "setweight(to_tsvector('english', skills), 'B') || "
+        "setweight(to_tsvector('english', company), 'C') || "
+        "setweight(to_tsvector('english', body), 'D'))"
+    )
+
+    def index(self, job, document):
+        # The GIN index follows the document row, nothing else to maintain.
+        pass
+
+    def index_new(self, documents):
+        pass
+
+    def reindex(self, documents):
+        pass
+
+    def search(self, queryset, terms):
+        # Every query word is a prefix: "dev" finds "developer". Quoting
+        # keeps the word a single lexeme whatever it contains.
+        tsquery = ' || '.join(["to_tsquery('english', quote_literal(%s) || ':*')"] * len(terms))
+        table = JobSearchDocument._meta.db_table
+        matches = RawSQL(
+            f"SELECT job_id FROM {table} WHERE {self.VECTOR_SQL} @@ ({tsquery})",
+            terms
+        )
+        rank = RawSQL(
+            f"SELECT ts_rank({self.VECTOR_SQL}, ({tsquery})) FROM {table} "
+            f"WHERE job_id = {Job._meta.db_table}.id",
+            terms,
+            output_field=FloatField()
+        )
+        return queryset.filter(id__in=matches).annotate(search_rank=rank)
+
+
+def get_backend():
+    name = getattr(settings, 'JOBS_SEARCH_BACKEND', 'auto')
+    if name == 'auto':
+        name = 'postgres' if connection.vendor == 'postgresql' else 'terms'
+    if name == 'postgres':
+        return PostgresBackend()
+    return TermIndexBackend()
+
+
+def index_job(job):
+    document = build_document(job)
+    with transaction.atomic():
+        JobSearchDocument.objects.update_or_create(job=job, defaults=document)
+        get_backend().index(job, document)
+
+
+def index_new_jobs(jobs):
+    """index_job for a batch of freshly inserted jobs, in a handful of queries."""
+    documents = [(job, build_document(job)) for job in jobs]
+    with transaction.atomic():
+        JobSearchDocument.objects.bulk_create(
+            [JobSearchDocument(job=job, **document) for job, document in documents],
+            batch_size=500
+        )
+        get_backend().index_new(documents)
+
+
+def reindex_company(company_id, name):
+    """
+    Bring the search documents of a company's jobs up to its current name,
+    if they are not already: one UPDATE of the documents plus, for the term
+    index, one bulk rebuild of those jobs' terms.
+    """
+    documents = JobSearchDocument.objects.filter(job__company_id=company_id)
+    if not documents.exclude(company=name).exists():
+        return
+    with transaction.atomic():
+        documents.update(company=name)
+        get_backend().reindex(documents)
+
+
+def search_jobs(queryset, query):
+    """
+    Filter `queryset` down to jobs matching any word of `query`, taken as a
+    prefix, and annotate each one with `search_rank` (higher is more
+    relevant).
+    """
+    terms = list(dict.fromkeys(tokenize(query)))
+    if not terms:
+        return queryset.annotate(search_rank=Value(0, output_field=IntegerField()))
+    return get_backend().search(queryset, terms)
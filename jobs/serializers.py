@@ -0,0 +1,226 @@
+from django.core.files.storage import default_storage
+
+from monitoring.timing import span
+
+
+def as_date(value, request):
+    return value.strftime("%Y-%m-%d") if value else None
+
+
+def as_datetime(value, request):
+    return value.strftime("%Y-%m-%d %H:%M") if value else None
+
+
+def as_file_url(value, request):
+    name = getattr(value, 'name', value)
+    return default_storage.url(name) if name else None
+
+
+def as_absolute_url(value, request):
+    # Without a request (payloads cached across hosts) the URL stays relative;
+    # Shape.absolutize finishes it per request.
+    url = as_file_url(value, request)
+    return request.build_absolute_uri(url) if url and request is not None else url
+
+
+class Field:
+    def __init__(self, source, format=None):
+        self.source = source
+        self.format = format
+
+
+class InvalidFields(ValueError):
+    pass
+
+
+class Shape:
+    """
+    A response shape declared once: output key -> column path, Field or a
+    nested Shape. The same declaration drives the `.values()` projection and
+    the dict built from each row, so list endpoints only fetch (and never
+    instantiate) the columns they emit.
+    """
+
+    def __init__(self, fields):
+        self.fields = {
+            key: Field(spec) if isinstance(spec, str) else spec
+            for key, spec in fields.items()
+        }
+
+    def _selected(self, only):
+        if only is None:
+            return self.fields.items()
+        return [(key, spec) for key, spec in self.fields.items() if key in only]
+
+    def columns(self, only=None):
+        columns = []
+        for key, spec in self._selected(only):
+            if isinstance(spec, Shape):
+                columns.extend(spec.columns())
+            else:
+                columns.append(spec.source)
+        return columns
+
+    def project(self, queryset, only=None, extra=()):
+        columns = dict.fromkeys(['id', *self.columns(only), *extra])
+        return queryset.values(*columns)
+
+    def serialize(self, row, request, only=None):
+        with span('serialize'):
+            return self._serialize(row, request, only)
+
+    def _serialize(self, row, request, only=None):
+        data = {}
+        for key, spec in self._selected(only):
+            if isinstance(spec, Shape):
+                data[key] = spec._serialize(row, request)
+            elif spec.format:
+                data[key] = spec.format(row[spec.source], request)
+            else:
+                data[key] = row[spec.source]
+        return data
+
+    def serialize_instance(self, instance, request, only=None):
+        row = {}
+        for column in self.columns(only):
+            value = instance
+            for attr in column.split('__'):
+                value = getattr(value, attr)
+            row[column] = value
+        return self.serialize(row, request, only)
+
+    def pick(self, data, only=None):
+        """The `only` keys of an already serialized dict, in shape order."""
+        if only is None:
+            return data
+        return {key: data[key] for key in self.fields if key in only and key in data}
+
+    def absolutize(self, data, request):
+        """
+        Copy of a dict serialized without a request, with its as_absolute_url
+        fields turned into absolute URLs for `request`.
+        """
+        data = dict(data)
+        for key, spec in self.fields.items():
+            if key not in data or data[key] is None:
+                continue
+            if isinstance(spec, Shape):
+                data[key] = spec.absolutize(data[key], request)
+            elif spec.format is as_absolute_url:
+                data[key] = request.build_absolute_uri(data[key])
+        return data
+
+    def parse_fields(self, request, extra=()):
+        """
+        Sparse fieldset from `?fields=a,b`. Returns None when every field is
+        wanted; raises InvalidFields for names the shape does not have (or
+        that are not in `extra`).
+        """
+        value = request.GET.get('fields')
+        if not value:
+            return None
+        only = {name.strip() for name in value.split(',') if name.strip()}
+        unknown = only - set(self.fields) - set(extra)
+        if unknown:
+            raise InvalidFields(', '.join(sorted(unknown)))
+        return only
+
+
+APPLICATION_COUNTS = Shape({
+    'total' : 'applications_total',
+    'applied' : 'applications_applied',
+    'shortlisted' : 'applications_shortlisted',
+    'rejected' : 'applications_rejected',
+    'withdrawn' : 'applications_withdrawn',
+})
+
+JOB_LIST = Shape({
+    'id' : 'id',
+    'title': 'title',
+    'location': 'location',
+    'min_salary' : 'min_salary',
+    'max_salary' : 'max_salary',
+    'posted_on' : Field('posted_on', as_date),
+    'job_type' : 'job_type',
+    'company': Shape({
+        'id': 'company__id',
+        'name': 'company__name',
+        'location': 'company__location',
+        'logo' : Field('company__logo', as_absolute_url),
+    }),
+})
+
+JOB_DETAIL = Shape({
+    'id' : 'id',
+    'title' : 'title',
+    'description' : 'description',
+    'skills_required' : 'skills_required',
+    'job_type' : 'job_type',
+    'location' : 'location',
+    'min_salary' : 'min_salary',
+    'max_salary' : 'max_salary',
+    'deadline' : Field('application_deadline', as_date),
+    'posted_on' : Field('posted_on', as_date),
+    'company' : Shape({
+        'id' : 'company__id',
+        'name' : 'company__name',
+        'description' : 'company__description',
+        'location' : 'company__location',
+        'website' : 'company__website',
+        'logo' : Field('company__logo', as_absolute_url),
+    }),
+})
+
+RECRUITER_JOB = Shape({
+    'id' : 'id',
+    'title':'title',
+    'location': 'location',
+    'job_type': 'job_type',
+    'min_salary': 'min_salary',
+    'max_salary': 'max_salary',
+    'deadline' : Field('application_deadline', as_date),
+    'company': Shape({
+        'id' : 'company__id',
+        'name' : 'company__name',
+        'logo' : Field('company__logo', as_absolute_url),
+    }),
+    'applications' : APPLICATION_COUNTS,
+})
+
+CREATED_JOB = Shape({
+    'id': 'id',
+    'title': 'title',
+    'company': 'company__name',
+    'location': 'location',
+    'job_type': 'job_type',
+    'min_salary': 'min_salary',
+    'max_salary': 'max_salary',
+    'deadline': Field('application_deadline', as_date),
+})
+
+COMPANY_JOB = Shape({
+    'id' : 'id',
+    'title' : 'title',
+    'location' : 'location',
+    'job_type' : 'job_type',
+    'min_salary' : 'min_salary',
+    'max_salary' : 'max_salary',
+    'applications' : APPLICATION_COUNTS,
+})
+
+COMPANY = Shape({
+    'id': 'id',
+    'name': 'name',
+    'location': 'location',
+    'website': 'website',
+    'logo': Field('logo', as_absolute_url),
+})
+
+COMPANY_DETAIL = Shape({
+    'company_id' : 'id',
+    'name' : 'name',
+    'location' : 'location',
+    'website' : 'website',
+    'logo' : Field('logo', as_absolute_url),
+    'description': 'description',
+})
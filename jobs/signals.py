@@ -0,0 +1,131 @@
+from copy import copy
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import Job, Company
+from .response_cache import bump_generation
+from .autocomplete import autocomplete_index
+from .geo import resolve_location
+from .object_cache import object_cache
+from .recommend import job_skill_index
+from .search import index_job, reindex_company
+from .skills import sync_job_skills
+
+
+@receiver(pre_save, sender=Company)
+def geocode_company(sender, instance, **kwargs):
+    instance.latitude, instance.longitude = resolve_location(instance.location) or (None, None)
+
+
+@receiver(pre_save, sender=Job)
+def geocode_job(sender, instance, **kwargs):
+    # Jobs whose own location is unknown (e.g. "Remote") sit at the company's office.
+    point = resolve_location(instance.location)
+    if point is None and instance.company_id:
+        point = Company.objects.filter(id=instance.company_id, latitude__isnull=False).values_list(
+            'latitude', 'longitude'
+        ).first()
+    instance.latitude, instance.longitude = point or (None, None)
+
+
+@receiver(post_save, sender=Company)
+def move_fallback_jobs(sender, instance, created, **kwargs):
+    if created:
+        return
+    job_ids = [
+        job_id
+        for job_id, location in instance.job_set.values_list('id', 'location')
+        if resolve_location(location) is None
+    ]
+    if job_ids:
+        Job.objects.filter(id__in=job_ids).update(latitude=instance.latitude, longitude=instance.longitude)
+
+
+def _index_committed_job(job_id):
+    job = Job.objects.select_related('company').filter(id=job_id).first()
+    # Gone if it was deleted in the same transaction.
+    if job is not None:
+        index_job(job)
+
+
+@receiver(post_save, sender=Job)
+def index_job_on_save(sender, instance, using, **kwargs):
+    # Indexes what was committed; a rolled-back save leaves the index alone.
+    transaction.on_commit(partial(_index_committed_job, instance.id), using=using)
+
+
+def _sync_committed_skills(job_id):
+    job = Job.objects.filter(id=job_id).only('id', 'skills_required').first()
+    if job is not None:
+        sync_job_skills(job)
+
+
+@receiver(post_save, sender=Job)
+def sync_skills_on_save(sender, instance, using, update_fields, **kwargs):
+    if update_fields is not None and 'skills_required' not in update_fields:
+        return
+    transaction.on_commit(partial(_sync_committed_skills, instance.id), using=using)
+
+
+@receiver(post_save, sender=Company)
+def reindex_company_jobs(sender, instance, created, update_fields, using, **kwargs):
+    # Company name is part of every job's search document.
+    if created or (update_fields is not None and 'name' not in update_fields):
+        return
+    transaction.on_commit(partial(reindex_company, instance.id, instance.name), using=using)
+
+
+@receiver(post_save, sender=Job)
+@receiver(post_delete, sender=Job)
+@receiver(post_save, sender=Company)
+@receiver(post_delete, sender=Company)
+def invalidate_public_responses(sender, using, **kwargs):
+    bump_generation(using)
+
+
+@receiver(post_delete, sender=Job)
+def touch_company_on_job_delete(sender, instance, **kwargs):
+    # companyDetails lists the company's jobs; a removed job must change its Last-Modified.
+    Company.objects.filter(id=instance.company_id).update(updated_at=timezone.now())
+
+
+@receiver(post_save, sender=Job)
+@receiver(post_delete, sender=Job)
+def refresh_recommendations(sender, instance, using, **kwargs):
+    # Reloaded by the next request on any connection, so only once committed.
+    transaction.on_commit(partial(job_skill_index.mark_dirty, instance.id), using=using)
+
+
+@receiver(post_save, sender=Job)
+def update_autocomplete(sender, instance, using, **kwargs):
+    # A rolled-back save must not show up in suggestions. The copy keeps the
+    # saved values (and id) should the instance change or be deleted first.
+    transaction.on_commit(partial(autocomplete_index.update_job, copy(instance)), using=using)
+
+
+@receiver(post_delete, sender=Job)
+def remove_from_autocomplete(sender, instance, using, **kwargs):
+    transaction.on_commit(partial(autocomplete_index.remove_job, instance.id), using=using)
+
+
+# Evict once the write is committed: evicting before that lets a request on
+# another connection cache the old row again until the entry expires.
+
+@receiver(post_save, sender=Job)
+@receiver(post_delete, sender=Job)
+def invalidate_cached_job(sender, instance, using, **kwargs):
+    transaction.on_commit(partial(object_cache.invalidate, 'job', instance.id), using=using)
+    transaction.on_commit(partial(object_cache.invalidate, 'company', instance.company_id), using=using)
+
+
+@receiver(post_save, sender=Company)
+@receiver(post_delete, sender=Company)
+def invalidate_cached_company(sender, instance, using, **kwargs):
+    # Job payloads embed the company.
+    job_ids = list(instance.job_set.values_list('id', flat=True))
+    transaction.on_commit(partial(object_cache.invalidate, 'company', instance.id), using=using)
+    transaction.on_commit(partial(object_cache.invalidate, 'job', *job_ids), using=using)
@@ -0,0 +1,88 @@
+import re
+
+from django.db.models import Count
+
+from .models import Job, Skill
+
+
+SKILL_SEPARATORS = re.compile(r'[,;|/\n]+')
+MAX_SKILL_LENGTH = 100
+SKILL_MATCHES = ('any', 'all')
+
+
+class InvalidSkillMatch(ValueError):
+    pass
+
+
+def parse_skills(text):
+    """
+    Split a free-text skills string into {slug: display name}. Skills are
+    whole comma/semicolon/slash separated entries, so "Python" never
+    matches "CPython-internals".
+    """
+    skills = {}
+    for part in SKILL_SEPARATORS.split(text or ''):
+        name = ' '.join(part.split())[:MAX_SKILL_LENGTH]
+        if name:
+            skills.setdefault(name.lower(), name)
+    return skills
+
+
+def get_or_create_skills(parsed):
+    existing = {skill.slug: skill for skill in Skill.objects.filter(slug__in=parsed)}
+    missing = [Skill(slug=slug, name=name) for slug, name in parsed.items() if slug not in existing]
+    if missing:
+        Skill.objects.bulk_create(missing, ignore_conflicts=True)
+        existing.update(
+            (skill.slug, skill)
+            for skill in Skill.objects.filter(slug__in=[skill.slug for skill in missing])
+        )
+    return [existing[slug] for slug in parsed]
+
+
+def sync_job_skills(job):
+    job.skills.set(get_or_create_skills(parse_skills(job.skills_required)))
+
+
+def add_new_job_skills(jobs):
+    """sync_job_skills for a batch of freshly inserted jobs."""
+    parsed = {job.id: parse_skills(job.skills_required) for job in jobs}
+    names = {}
+    for skills in parsed.values():
+        names.update(skills)
+    skill_ids = {skill.slug: skill.id for skill in get_or_create_skills(names)}
+    Job.skills.through.objects.bulk_create(
+        [
+            Job.skills.through(job_id=job_id, skill_id=skill_ids[slug])
+            for job_id, skills in parsed.items()
+            for slug in skills
+        ],
+        batch_size=1000
+    )
+
+
+def parse_skill_match(params):
+    """`skills_match` from `params`: 'any' (the default) or 'all'."""
+    match = params.get('skills_match') or 'any'
+    if match not in SKILL_MATCHES:
+        raise InvalidSkillMatch("skills_match must be 'any' or 'all'")
+    return match
+
+
+def filter_by_skills(jobs, value, match='any'):
+    """
+    Jobs having any (or all) of the comma separated skills in `value`,
+    answered from the job/skill join table.
+    """
+    slugs = list(parse_skills(value))
+    if not slugs:
+        return jobs
+
+    postings = Job.skills.through.objects.filter(skill__slug__in=slugs)
+    if match == 'all':
+        postings = (
+            postings.values('job_id')
+            .annotate(matched=Count('skill_id'))
+            .filter(matched=len(slugs))
+        )
+    return jobs.filter(id__in=postings.values('job_id'))
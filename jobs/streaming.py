@@ -0,0 +1,118 @@
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+
+
+STREAM_CHUNK_SIZE = 500
+WRITE_BUFFER_SIZE = 16 * 1024
+
+
+class StreamedArray:
+    """
+    A JSON array whose elements are produced lazily while the response is
+    being written. `count` holds the number of elements emitted so far.
+    `items` is an async iterable (e.g. over `queryset.aiterator()`) when
+    used in an AsyncStreamingJsonResponse.
+    """
+
+    def __init__(self, items):
+        self.items = items
+        self.count = 0
+
+    def __iter__(self):
+        for item in self.items:
+            self.count += 1
+            yield item
+
+    async def __aiter__(self):
+        async for item in self.items:
+            self.count += 1
+            yield item
+
+
+def _encode(value, encoder):
+    if isinstance(value, StreamedArray):
+        yield '['
+        for index, item in enumerate(value):
+            yield (',' if index else '') + encoder.encode(item)
+        yield ']'
+    elif isinstance(value, dict):
+        yield '{'
+        for index, (key, item) in enumerate(value.items()):
+            yield (',' if index else '') + encoder.encode(str(key)) + ':'
+            yield from _encode(item, encoder)
+        yield '}'
+    elif callable(value):
+        # Resolved only when reached, e.g. a count placed after its array.
+        yield from _encode(value(), encoder)
+    else:
+        yield encoder.encode(value)
+
+
+async def _aencode(value, encoder):
+    if isinstance(value, StreamedArray):
+        yield '['
+        index = 0
+        async for item in value:
+            yield (',' if index else '') + encoder.encode(item)
+            index += 1
+        yield ']'
+    elif isinstance(value, dict):
+        yield '{'
+        for index, (key, item) in enumerate(value.items()):
+            yield (',' if index else '') + encoder.encode(str(key)) + ':'
+            async for piece in _aencode(item, encoder):
+                yield piece
+        yield '}'
+    elif callable(value):
+        async for piece in _aencode(value(), encoder):
+            yield piece
+    else:
+        yield encoder.encode(value)
+
+
+def _buffered(pieces):
+    buffer = []
+    size = 0
+    for piece in pieces:
+        buffer.append(piece)
+        size += len(piece)
+        if size >= WRITE_BUFFER_SIZE:
+            yield ''.join(buffer)
+            buffer = []
+            size = 0
+    if buffer:
+        yield ''.join(buffer)
+
+
+async def _abuffered(pieces):
+    buffer = []
+    size = 0
+    async for piece in pieces:
+        buffer.append(piece)
+        size += len(piece)
+        if size >= WRITE_BUFFER_SIZE:
+            yield ''.join(buffer)
+            buffer = []
+            size = 0
+    if buffer:
+        yield ''.join(buffer)
+
+
+class StreamingJsonResponse(StreamingHttpResponse):
+    """
+    JSON response written incrementally. `data` is a dict that may contain
+    StreamedArray values (typically over `queryset.iterator()`) and
+    callables, so memory stays flat however many rows are returned.
+    """
+
+    def __init__(self, data, **kwargs):
+        kwargs.setdefault('content_type', 'application/json')
+        super().__init__(_buffered(_encode(data, DjangoJSONEncoder())), **kwargs)
+
+
+class AsyncStreamingJsonResponse(StreamingHttpResponse):
+    """StreamingJsonResponse for async views: StreamedArray items are async iterables."""
+
+    def __init__(self, data, **kwargs):
+        kwargs.setdefault('content_type', 'application/json')
+        super().__init__(_abuffered(_aencode(data, DjangoJSONEncoder())), **kwargs)
@@ -1,3 +1,875 @@
+import json
+import re
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Q
+from django.http import JsonResponse, QueryDict
+from django.shortcuts import get_object_or_404
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.http import http_date
+
+from accounts.tokens import tokens_for_user
+from applications.models import Application
+from applications.stats import apply_transitions
+from .autocomplete import AutocompleteIndex
+from .models import Job, Company, Skill
+from .object_cache import object_cache
+from .queries import open_jobs
+from .recommend import JobSkillIndex
+from .response_cache import current_generation
+from .streaming import AsyncStreamingJsonResponse, StreamedArray, StreamingJsonResponse
+
+
+SEED_COMPANIES = 5
+SEED_JOBS = 300
+
+
+class QueryPlanAssertions:
+    """
+    EXPLAIN helpers shared by the query-plan regression tests. A plan that
+    falls back to a sequential scan on any table fails the test.
+    """
+
+    @classmethod
+    def prepare_planner(cls):
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                cursor.execute('ANALYZE')
+                # Seeded tables are small; make the planner prove an index exists.
+                cursor.execute('SET enable_seqscan = off')
+
+    def sequential_scans(self, plan):
+        if connection.vendor == 'postgresql':
+            return re.findall(r'Seq Scan on (\S+)', plan)
+        if connection.vendor == 'mysql':
+            return re.findall(r'"table_name": "(\w+)",\s*"access_type": "ALL"', plan)
+        # SQLite: "SCAN <table>" without an index is a full table scan.
+        return re.findall(r'\bSCAN (\w+)\s*$', plan, re.MULTILINE)
+
+    def explain(self, queryset):
+        if connection.vendor == 'mysql':
+            return queryset.explain(format='json')
+        return queryset.explain()
+
+    def assertNoSequentialScan(self, queryset):
+        plan = self.explain(queryset)
+        scans = self.sequential_scans(plan)
+        self.assertEqual(scans, [], f"Sequential scan in plan:\n{plan}")
+
+
+class JobQueryPlanTests(QueryPlanAssertions, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.recruiter = User.objects.create_user('plan-recruiter', 'plan@example.com', 'password')
+        other = User.objects.create_user('plan-other', 'other@example.com', 'password')
+        today = timezone.now().date()
+        job_types = [choice for choice, _ in Job.JOB_TYPES]
+
+        companies = [
+            Company.objects.create(
+                name=f'Company {i}',
+                description='Seeded company',
+                location='Pune',
+                owner=cls.recruiter if i == 0 else other
+            )
+            for i in range(SEED_COMPANIES)
+        ]
+        for i in range(SEED_JOBS):
+            Job.objects.create(
+                title=f'Engineer {i}',
+                company=companies[i % SEED_COMPANIES],
+                description='Seeded job description',
+                skills_required='python, django' if i % 3 else 'java, spring',
+                min_salary=1000 * (i % 50),
+                max_salary=1000 * (i % 50) + 5000,
+                location='Pune' if i % 2 else 'Bengaluru',
+                job_type=job_types[i % len(job_types)],
+                # Half of the catalog has expired.
+                application_deadline=today + timedelta(days=(i % 60) - 30),
+            )
+        cls.prepare_planner()
+
+    def listing(self, query=''):
+        return open_jobs(QueryDict(query)).order_by('-posted_on')[:10]
+
+    def test_view_all_jobs(self):
+        self.assertNoSequentialScan(self.listing())
+
+    def test_view_all_jobs_by_job_type(self):
+        self.assertNoSequentialScan(self.listing('job_type=remote'))
+
+    def test_view_all_jobs_by_salary(self):
+        self.assertNoSequentialScan(self.listing('min_salary=20000&max_salary=40000'))
+
+    def test_view_all_jobs_search(self):
+        jobs = open_jobs(QueryDict('search=python django')).order_by('-search_rank', '-posted_on')[:10]
+        self.assertNoSequentialScan(jobs)
+
+    def test_view_all_jobs_by_skills(self):
+        self.assertNoSequentialScan(self.listing('skills=python,django&skills_match=all'))
+
+    def test_view_all_jobs_nearby(self):
+        # 50 km around Pune.
+        self.assertNoSequentialScan(self.listing('lat=18.52&lng=73.85&radius_km=50'))
+
+    def test_view_all_jobs_keyset_page(self):
+        newest = Job.objects.order_by('-posted_on', '-id').first()
+        jobs = (
+            open_jobs(QueryDict(''))
+            .filter(Q(posted_on__lt=newest.posted_on) | Q(posted_on=newest.posted_on, id__lt=newest.id))
+            .order_by('-posted_on', '-id')[:11]
+        )
+        self.assertNoSequentialScan(jobs)
+
+    def test_job_detail(self):
+        job = Job.objects.only('id').first()
+        self.assertNoSequentialScan(Job.objects.select_related('company').filter(id=job.id))
+
+    def test_my_jobs(self):
+        jobs = Job.objects.filter(company__owner=self.recruiter).select_related('company').order_by('-posted_on')
+        self.assertNoSequentialScan(jobs)
+
+    def test_company_jobs(self):
+        company = Company.objects.filter(owner=self.recruiter).first()
+        self.assertNoSequentialScan(Job.objects.filter(company=company))
+
+
+def bearer(user):
+    return {'HTTP_AUTHORIZATION': f'Bearer {tokens_for_user(user).access_token}'}
+
+
+class UpdateJobTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.recruiter = User.objects.create_user('update-recruiter', 'recruiter@example.com', 'password')
+        cls.recruiter.profile.role = 'recruiter'
+        cls.recruiter.profile.save()
+        cls.applicant = User.objects.create_user('update-applicant', 'applicant@example.com', 'password')
+        company = Company.objects.create(name='Update Co', description='Seeded company', owner=cls.recruiter)
+        cls.job = Job.objects.create(
+            title='Engineer',
+            company=company,
+            description='Seeded job description',
+            skills_required='python',
+            min_salary=1000,
+            max_salary=2000,
+            location='Pune',
+            job_type='full-time',
+            application_deadline=timezone.now().date() + timedelta(days=30),
+        )
+
+    def test_update_keeps_concurrent_apply(self):
+        # An application lands between updateJob loading the job and saving it.
+        def load_then_apply(*args, **kwargs):
+            job = get_object_or_404(*args, **kwargs)
+            application = Application.objects.create(applicant=self.applicant, job=job)
+            apply_transitions([(application.id, job.id, None, application.status)])
+            return job
+
+        with mock.patch('jobs.views.get_object_or_404', side_effect=load_then_apply):
+            response = self.client.post(
+                f'/jobs/updateJob/{self.job.id}/',
+                json.dumps({'title': 'Senior Engineer', 'max_salary': 3000}),
+                content_type='application/json',
+                **bearer(self.recruiter)
+            )
+
+        self.assertEqual(response.status_code, 200)
+        self.job.refresh_from_db()
+        self.assertEqual(self.job.title, 'Senior Engineer')
+        self.assertEqual(self.job.max_salary, 3000)
+        self.assertEqual(self.job.applications_total, 1)
+        self.assertEqual(self.job.applications_applied, 1)
+
+
+class ListingParamsTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        owner = User.objects.create_user('listing-owner', 'owner@example.com', 'password')
+        company = Company.objects.create(name='Listing Co', description='Seeded company', owner=owner)
+        with cls.captureOnCommitCallbacks(execute=True):
+            cls.job = Job.objects.create(
+                title='Engineer',
+                company=company,
+                description='Seeded job description',
+                skills_required='python',
+                min_salary=1000,
+                max_salary=2000,
+                location='Pune',
+                job_type='full-time',
+                application_deadline=timezone.now().date() + timedelta(days=30),
+            )
+
+    def test_blank_location_params_are_not_a_radius_search(self):
+        for query in ('lat=', 'lat=&lng=', 'lat=&lng=&radius_km=&sort=distance'):
+            with self.subTest(query=query):
+                response = self.client.get(f'/jobs/job/?{query}')
+                self.assertEqual(response.status_code, 200)
+                self.assertNotIn('distance_km', response.json()['jobs'][0])
+
+    def test_radius_search(self):
+        response = self.client.get('/jobs/job/?lat=18.52&lng=73.85&radius_km=50&sort=distance')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('distance_km', response.json()['jobs'][0])
+
+    def test_page_size(self):
+        for query in ('', 'page_size=', 'page_size=100', 'pagination=cursor&page_size=1'):
+            with self.subTest(query=query):
+                self.assertEqual(self.client.get(f'/jobs/job/?{query}').status_code, 200)
+        for query in ('page_size=0', 'page_size=101', 'page_size=ten', 'pagination=cursor&page_size=500'):
+            with self.subTest(query=query):
+                response = self.client.get(f'/jobs/job/?{query}')
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('page_size', response.json()['error'])
+
+    def test_skills_match(self):
+        for match, count in (('', 1), ('any', 1), ('all', 0)):
+            with self.subTest(match=match):
+                response = self.client.get(f'/jobs/job/?skills=python,java&skills_match={match}')
+                self.assertEqual(len(response.json()['jobs']), count)
+        response = self.client.get('/jobs/job/?skills=python&skills_match=most')
+        self.assertEqual(response.status_code, 400)
+
+    def test_save_without_skills_keeps_skill_links(self):
+        with CaptureQueriesContext(connection) as queries, self.captureOnCommitCallbacks(execute=True):
+            self.job.save(update_fields=['title'])
+        self.assertEqual([q['sql'] for q in queries if re.search(r'jobs_(job_skills|skill)\b', q['sql'])], [])
+        self.assertEqual(list(self.job.skills.values_list('slug', flat=True)), ['python'])
+
+
+class FacetTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        owner = User.objects.create_user('facet-owner', 'owner@example.com', 'password')
+        company = Company.objects.create(name='Facet Co', description='Seeded company', owner=owner)
+        for location, job_type, min_salary in (
+            ('Pune', 'full-time', 100000),
+            (' pune', 'full-time', 400000),
+            ('Patna', 'full-time', 700000),
+            ('Pune', 'internship', 100000),
+        ):
+            Job.objects.create(
+                title='Engineer',
+                company=company,
+                description='Seeded job description',
+                skills_required='python',
+                min_salary=min_salary,
+                max_salary=min_salary * 2,
+                location=location,
+                job_type=job_type,
+                application_deadline=timezone.now().date() + timedelta(days=30),
+            )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_counts_follow_the_filters(self):
+        response = self.client.get('/jobs/job/?job_type=full-time&facets=location,salary,job_type')
+        self.assertEqual(response.json()['facets'], {
+            'location': {'pune': 2, 'patna': 1},
+            'salary': {'0-300000': 1, '300000-600000': 1, '600000-1200000': 1},
+            'job_type': {'full-time': 3},
+        })
+        self.assertEqual(response.json()['count'], 3)
+
+    def test_one_grouped_query(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get('/jobs/job/?facets=location,salary,job_type')
+        self.assertEqual(sum('GROUP BY' in q['sql'] for q in queries), 1)
+
+    def test_unknown_facet(self):
+        response = self.client.get('/jobs/job/?facets=location,colour')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['error'], 'Invalid facet: colour')
+
+
+class SparseFieldsTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        owner = User.objects.create_user('fields-owner', 'owner@example.com', 'password')
+        company = Company.objects.create(name='Fields Co', description='Seeded company', owner=owner)
+        cls.job = Job.objects.create(
+            title='Engineer',
+            company=company,
+            description='Seeded job description',
+            skills_required='python',
+            min_salary=1000,
+            max_salary=2000,
+            location='Pune',
+            job_type='full-time',
+            application_deadline=timezone.now().date() + timedelta(days=30),
+        )
+
+    def setUp(self):
+        cache.clear()
+        object_cache.invalidate('job', self.job.id)
+
+    def test_listing_projects_the_requested_fields(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/jobs/job/?fields=title,company')
+        job = response.json()['jobs'][0]
+        self.assertEqual(job, {
+            'title': 'Engineer',
+            'company': {'id': self.job.company_id, 'name': 'Fields Co', 'location': '', 'logo': None},
+        })
+        page_query = next(q['sql'] for q in queries if 'LIMIT' in q['sql'])
+        self.assertIn('"jobs_job"."title"', page_query)
+        self.assertNotIn('"jobs_job"."min_salary"', page_query)
+        self.assertNotIn('"jobs_job"."description"', page_query)
+
+    def test_detail_picks_the_requested_fields(self):
+        response = self.client.get(f'/jobs/job/{self.job.id}/?fields=title, deadline')
+        self.assertEqual(response.json(), {
+            'title': 'Engineer',
+            'deadline': self.job.application_deadline.isoformat(),
+        })
+
+    def test_unknown_fields(self):
+        for url in ('/jobs/job/?fields=title,salary', f'/jobs/job/{self.job.id}/?fields=title,salary'):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.json()['error'], 'Invalid fields: salary')
+
+
+class StreamingJsonTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.recruiter = User.objects.create_user('stream-recruiter', 'recruiter@example.com', 'password')
+        cls.recruiter.profile.role = 'recruiter'
+        cls.recruiter.profile.save()
+        company = Company.objects.create(name='Stream Co', description='Seeded company', owner=cls.recruiter)
+        for i in range(3):
+            Job.objects.create(
+                title=f'Engineer "{i}" ✓',
+                company=company,
+                description='Seeded job description',
+                skills_required='python',
+                min_salary=1000,
+                max_salary=2000,
+                location='Pune',
+                job_type='full-time',
+                application_deadline=timezone.now().date() + timedelta(days=30),
+            )
+
+    def rows(self):
+        # Enough rows to be written in several buffered chunks.
+        return [
+            {'id': i, 'title': f'Job "{i}" ✓', 'salary': Decimal('10.50'), 'on': date(2026, 1, 1)}
+            for i in range(2000)
+        ]
+
+    def expected(self, rows):
+        return json.loads(JsonResponse({'meta': {'empty': []}, 'jobs': rows, 'count': len(rows)}).content)
+
+    def test_same_json_as_a_plain_response(self):
+        rows = self.rows()
+        items = StreamedArray(iter(rows))
+        response = StreamingJsonResponse({'meta': {'empty': StreamedArray([])}, 'jobs': items, 'count': lambda: items.count})
+        chunks = list(response.streaming_content)
+        self.assertGreater(len(chunks), 1)
+        self.assertEqual(json.loads(b''.join(chunks)), self.expected(rows))
+
+    async def test_async_same_json_as_a_plain_response(self):
+        rows = self.rows()
+
+        async def produce():
+            for row in rows:
+                yield row
+
+        async def nothing():
+            return
+            yield
+
+        items = StreamedArray(produce())
+        response = AsyncStreamingJsonResponse(
+            {'meta': {'empty': StreamedArray(nothing())}, 'jobs': items, 'count': lambda: items.count}
+        )
+        body = b''.join([chunk async for chunk in response.streaming_content])
+        self.assertEqual(json.loads(body), self.expected(rows))
+
+    def test_streamed_list_matches_the_paged_one(self):
+        response = self.client.get('/jobs/myJobs/', **bearer(self.recruiter))
+        self.assertTrue(response.streaming)
+        streamed = json.loads(b''.join(response.streaming_content))
+        paged = self.client.get('/jobs/myJobs/?pagination=cursor&page_size=100', **bearer(self.recruiter)).json()
+        self.assertEqual(streamed['jobs'], paged['jobs'])
+        self.assertEqual(streamed['count'], 3)
+
+
+class ConditionalGetTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        owner = User.objects.create_user('conditional-owner', 'owner@example.com', 'password')
+        company = Company.objects.create(name='Conditional Co', description='Seeded company', owner=owner)
+        cls.job = Job.objects.create(
+            title='Engineer',
+            company=company,
+            description='Seeded job description',
+            skills_required='python',
+            min_salary=1000,
+            max_salary=2000,
+            location='Pune',
+            job_type='full-time',
+            application_deadline=timezone.now().date() + timedelta(days=30),
+        )
+
+    def setUp(self):
+        cache.clear()
+        object_cache.invalidate('job', self.job.id)
+
+    def edit_job(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.job.title = 'Senior Engineer'
+            self.job.save()
+
+    def test_job_detail_if_none_match(self):
+        url = f'/jobs/job/{self.job.id}/'
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        # Another representation of the same job.
+        self.assertEqual(self.client.get(url + '?fields=title', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+        self.edit_job()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['title'], 'Senior Engineer')
+
+    def test_job_detail_if_modified_since(self):
+        url = f'/jobs/job/{self.job.id}/'
+        last_modified = self.client.get(url)['Last-Modified']
+        self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 304)
+
+        earlier = http_date((self.job.updated_at - timedelta(seconds=5)).timestamp())
+        self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=earlier).status_code, 200)
+
+    def test_listing_if_none_match(self):
+        etag = self.client.get('/jobs/job/')['ETag']
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get('/jobs/job/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        # Answered from the cache generation alone.
+        self.assertEqual([q['sql'] for q in queries if 'jobs_job' in q['sql']], [])
+        self.edit_job()
+        self.assertEqual(self.client.get('/jobs/job/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+class CursorPaginationTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        owner = User.objects.create_user('cursor-owner', 'owner@example.com', 'password')
+        company = Company.objects.create(name='Cursor Co', description='Seeded company', owner=owner)
+        for i in range(7):
+            Job.objects.create(
+                title=f'Engineer {i}',
+                company=company,
+                description='Seeded job description',
+                skills_required='python',
+                min_salary=1000,
+                max_salary=2000,
+                location='Pune',
+                job_type='full-time',
+                application_deadline=timezone.now().date() + timedelta(days=30),
+            )
+        # Four jobs share a posted_on across the first page boundary; id breaks the tie.
+        tied = ['Engineer 1', 'Engineer 2', 'Engineer 3', 'Engineer 4']
+        posted_on = timezone.now()
+        Job.objects.filter(title__in=tied).update(posted_on=posted_on)
+        Job.objects.exclude(title__in=tied).update(posted_on=posted_on - timedelta(days=1))
+        cls.expected = list(Job.objects.order_by('-posted_on', '-id').values_list('id', flat=True))
+
+    def setUp(self):
+        cache.clear()
+
+    def page(self, cursor=None):
+        query = '/jobs/job/?pagination=cursor&page_size=3' + (f'&cursor={cursor}' if cursor else '')
+        data = self.client.get(query).json()
+        return [job['id'] for job in data['jobs']], data
+
+    def test_round_trip(self):
+        forward, pages, cursor = [], [], None
+        while True:
+            ids, data = self.page(cursor)
+            pages.append(ids)
+            forward += ids
+            cursor = data['next']
+            if cursor is None:
+                break
+        self.assertEqual(forward, self.expected)
+        self.assertEqual([len(ids) for ids in pages], [3, 3, 1])
+
+        # Back from the last page through its prev cursors.
+        backward = [pages[-1]]
+        cursor = data['prev']
+        while cursor is not None:
+            ids, data = self.page(cursor)
+            backward.insert(0, ids)
+            cursor = data['prev']
+        self.assertEqual(backward, pages)
+
+    def test_first_page_has_no_prev(self):
+        ids, data = self.page()
+        self.assertIsNone(data['prev'])
+        self.assertIsNotNone(self.page(data['next'])[1]['prev'])
+
+    def test_tampered_cursor(self):
+        response = self.client.get('/jobs/job/?cursor=not-a-cursor')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['error'], 'Invalid cursor')
+
+
+class ObjectCacheInvalidationTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        owner = User.objects.create_user('cache-owner', 'owner@example.com', 'password')
+        company = Company.objects.create(name='Cache Co', description='Seeded company', owner=owner)
+        cls.job = Job.objects.create(
+            title='Engineer',
+            company=company,
+            description='Seeded job description',
+            skills_required='python',
+            min_salary=1000,
+            max_salary=2000,
+            location='Pune',
+            job_type='full-time',
+            application_deadline=timezone.now().date() + timedelta(days=30),
+        )
+
+    def setUp(self):
+        cache.clear()
+        object_cache.invalidate('job', self.job.id)
+
+    def test_write_in_transaction_then_read_serves_new_payload(self):
+        url = f'/jobs/job/{self.job.id}/'
+        self.assertEqual(self.client.get(url).json()['title'], 'Engineer')
+        key = object_cache.key('job', self.job.id)
+        stale = object_cache.shared.get(key)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                job = Job.objects.get(id=self.job.id)
+                job.title = 'Senior Engineer'
+                job.save()
+                # A request on another connection does not see the write yet
+                # and caches the row it read.
+                object_cache.shared.set(key, stale)
+                object_cache.local.set(key, stale)
+
+        self.assertEqual(self.client.get(url).json()['title'], 'Senior Engineer')
+
+    def test_listing_generation_moves_on_commit(self):
+        generation = current_generation()
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                Job.objects.filter(id=self.job.id).first().save()
+                self.assertEqual(current_generation(), generation)
+        self.assertNotEqual(current_generation(), generation)
+
+
+class SearchTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        owner = User.objects.create_user('search-owner', 'owner@example.com', 'password')
+        cls.company = Company.objects.create(name='Search Co', description='Seeded company', owner=owner)
+
+    @classmethod
+    def create_job(cls, title, **fields):
+        # Indexed once committed, as after a request.
+        with cls.captureOnCommitCallbacks(execute=True):
+            return Job.objects.create(
+                title=title,
+                company=cls.company,
+                description=fields.pop('description', 'Seeded job description'),
+                skills_required=fields.pop('skills_required', 'python'),
+                min_salary=1000,
+                max_salary=2000,
+                location='Pune',
+                job_type='full-time',
+                application_deadline=timezone.now().date() + timedelta(days=30),
+                **fields,
+            )
+
+    def setUp(self):
+        cache.clear()
+
+    def search(self, query):
+        return list(open_jobs({'search': query}).order_by('-search_rank', 'id').values_list('title', flat=True))
+
+    def test_job_is_indexed_once_committed(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                Job.objects.create(
+                    title='Rolled Back Engineer', company=self.company, description='d', skills_required='python',
+                    min_salary=1, max_salary=2, location='Pune', job_type='full-time',
+                    application_deadline=timezone.now().date() + timedelta(days=30),
+                )
+                transaction.set_rollback(True)
+        self.assertEqual(self.search('rolled'), [])
+
+        job = self.create_job('Data Engineer')
+        self.assertEqual(self.search('data'), ['Data Engineer'])
+        job.title = 'Data Scientist'
+        with self.captureOnCommitCallbacks(execute=True):
+            job.save()
+            job.delete()
+        self.assertEqual(self.search('data'), [])
+
+    def test_title_hits_rank_first(self):
+        self.create_job('Engineer', description='We write Python all day', skills_required='java')
+        self.create_job('Python Developer', skills_required='django')
+        self.create_job('Recruiter', description='No code here', skills_required='hiring')
+        response = self.client.get('/jobs/job/?search=python')
+        self.assertEqual([job['title'] for job in response.json()['jobs']], ['Python Developer', 'Engineer'])
+
+    def test_matches_any_word(self):
+        self.create_job('Go Developer', skills_required='golang')
+        self.create_job('Rust Developer', skills_required='rust')
+        self.create_job('Tester', skills_required='selenium')
+        self.assertCountEqual(self.search('golang rust'), ['Go Developer', 'Rust Developer'])
+        # Stop words alone do not filter.
+        self.assertEqual(len(self.search('the and')), 3)
+
+    def test_words_match_as_prefixes(self):
+        self.create_job('Backend Developer')
+        self.create_job('DevOps Engineer')
+        self.assertEqual(self.search('dev'), ['Backend Developer', 'DevOps Engineer'])
+        self.assertEqual(self.search('develop'), ['Backend Developer'])
+        self.assertEqual(self.search('veloper'), [])
+
+    def test_company_rename_reindexes_its_jobs(self):
+        self.create_job('Engineer')
+        self.company.name = 'Acme'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.company.save()
+        self.assertEqual(self.search('acme'), ['Engineer'])
+        self.assertEqual(self.search('search'), [])
+
+    def test_company_save_without_rename_skips_reindexing(self):
+        self.create_job('Engineer')
+
+        def search_queries(**save_kwargs):
+            with CaptureQueriesContext(connection) as queries, self.captureOnCommitCallbacks(execute=True):
+                self.company.save(**save_kwargs)
+            return [q['sql'] for q in queries if 'jobs_jobsearch' in q['sql']]
+
+        self.assertEqual(search_queries(update_fields=['description']), [])
+        # Only the check that every document already has the name.
+        queries = search_queries()
+        self.assertEqual(len(queries), 1)
+        self.assertTrue(queries[0].startswith('SELECT'))
+
+
+class AutocompleteTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        owner = User.objects.create_user('autocomplete-owner', 'owner@example.com', 'password')
+        cls.company = Company.objects.create(name='Suggest Co', description='Seeded company', owner=owner)
+        for location in ('Pune', 'Pune', 'Pune', 'Patna'):
+            cls.create_job('Backend Developer', location)
+
+    @classmethod
+    def create_job(cls, title, location='Pune', **fields):
+        return Job.objects.create(
+            title=title,
+            company=cls.company,
+            description='Seeded job description',
+            skills_required='python',
+            min_salary=1000,
+            max_salary=2000,
+            location=location,
+            job_type='full-time',
+            application_deadline=fields.pop('application_deadline', timezone.now().date() + timedelta(days=30)),
+            **fields,
+        )
+
+    def setUp(self):
+        self.index = AutocompleteIndex()
+        self.index.warm()
+        patcher = mock.patch('jobs.signals.autocomplete_index', self.index)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def texts(self, query, categories=('title', 'skill', 'location')):
+        return [(item['text'], item['count']) for item in self.index.suggest(query, categories)]
+
+    def test_ordered_by_number_of_open_jobs(self):
+        self.assertEqual(self.texts('p', ['location']), [('Pune', 3), ('Patna', 1)])
+
+    def test_matches_any_word_start(self):
+        self.assertEqual(self.texts('dev', ['title']), [('Backend Developer', 4)])
+
+    def test_saved_and_deleted_jobs_update_the_index(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            job = self.create_job('Data Engineer', 'Patna')
+        self.assertEqual(self.texts('data'), [('Data Engineer', 1)])
+        self.assertEqual(self.texts('pa', ['location']), [('Patna', 2)])
+
+        job.title = 'Data Scientist'
+        with self.captureOnCommitCallbacks(execute=True):
+            job.save()
+        self.assertEqual(self.texts('data'), [('Data Scientist', 1)])
+
+        job.application_deadline = timezone.now().date() - timedelta(days=1)
+        with self.captureOnCommitCallbacks(execute=True):
+            job.save()
+        self.assertEqual(self.texts('data'), [])
+
+        job.application_deadline = timezone.now().date() + timedelta(days=1)
+        with self.captureOnCommitCallbacks(execute=True):
+            job.save()
+            job.delete()
+        self.assertEqual(self.texts('data'), [])
+        self.assertEqual(self.texts('pa', ['location']), [('Patna', 1)])
+
+    def test_rolled_back_save_is_not_suggested(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                self.create_job('Data Engineer')
+                transaction.set_rollback(True)
+        self.assertEqual(self.texts('data'), [])
+
+    def test_stale_index_is_served_while_rebuilding(self):
+        self.index.invalidate()
+        with mock.patch('jobs.autocomplete.threading.Thread') as thread:
+            self.assertEqual(self.texts('pu', ['location']), [('Pune', 3)])
+        thread.return_value.start.assert_called_once_with()
+        # Only one rebuild at a time.
+        self.assertFalse(self.index._claim_rebuild())
+
+    def test_changes_during_rebuild_are_kept(self):
+        with self.index._lock:
+            self.assertTrue(self.index._claim_rebuild(force=True))
+        built = self.index._build(timezone.now().date())
+        with self.captureOnCommitCallbacks(execute=True):
+            self.create_job('Data Engineer')
+        with mock.patch.object(self.index, '_build', return_value=built):
+            self.index._rebuild()
+        self.assertEqual(self.texts('data'), [('Data Engineer', 1)])
+
+
+class JobSkillIndexTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        owner = User.objects.create_user('recommend-owner', 'owner@example.com', 'password')
+        cls.company = Company.objects.create(name='Recommend Co', description='Seeded company', owner=owner)
+        cls.python_job = cls.create_job('python, django')
+        cls.java_job = cls.create_job('java')
+
+    @classmethod
+    def create_job(cls, skills_required):
+        # Skills are linked once the job commits.
+        with cls.captureOnCommitCallbacks(execute=True):
+            return Job.objects.create(
+                title='Engineer',
+                company=cls.company,
+                description='Seeded job description',
+                skills_required=skills_required,
+                min_salary=1000,
+                max_salary=2000,
+                location='Pune',
+                job_type='full-time',
+                application_deadline=timezone.now().date() + timedelta(days=30),
+            )
+
+    def setUp(self):
+        self.index = JobSkillIndex()
+        self.python = {Skill.objects.get(slug='python').id: 1.0}
+
+    def test_ranks_matching_jobs(self):
+        self.assertEqual([job_id for job_id, _ in self.index.top_jobs(self.python)], [self.python_job.id])
+
+    def test_stale_index_is_served_while_rebuilding(self):
+        self.index.top_jobs(self.python)
+        self.index.invalidate()
+        with mock.patch('jobs.recommend.threading.Thread') as thread:
+            ranked = self.index.top_jobs(self.python)
+        thread.return_value.start.assert_called_once_with()
+        self.assertEqual([job_id for job_id, _ in ranked], [self.python_job.id])
+
+    def test_saved_job_is_reread_once_committed(self):
+        with mock.patch('jobs.signals.job_skill_index', self.index):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.java_job.save()
+                self.assertNotIn(self.java_job.id, self.index._dirty)
+        self.assertIn(self.java_job.id, self.index._dirty)
+
+    def test_jobs_changed_during_rebuild_are_reread(self):
+        self.index.top_jobs(self.python)
+        self.index.invalidate()
+        with self.index._lock:
+            self.assertTrue(self.index._claim_rebuild())
+        # A query against the old index consumes the dirty job while the build runs.
+        job = self.create_job('python')
+        self.index.mark_dirty(job.id)
+        self.index.top_jobs(self.python)
+
+        # The build read the jobs before that change.
+        load = JobSkillIndex._load
+        with mock.patch.object(JobSkillIndex, '_load', autospec=True, side_effect=lambda index, jobs: load(index, jobs.exclude(id=job.id))):
+            self.index._rebuild()
+        ranked = self.index.top_jobs(self.python)
+        self.assertCountEqual([job_id for job_id, _ in ranked], [self.python_job.id, job.id])
+
+
+class ImportJobsTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.recruiter = User.objects.create_user('import-recruiter', 'recruiter@example.com', 'password')
+        cls.recruiter.profile.role = 'recruiter'
+        cls.recruiter.profile.save()
+        cls.company = Company.objects.create(name='Import Co', description='Seeded company', owner=cls.recruiter)
+
+    def row(self, **fields):
+        return {
+            'title': 'Engineer',
+            'company_id': self.company.id,
+            'description': 'Imported job description',
+            'skills_required': 'python',
+            'min_salary': 1000,
+            'max_salary': 2000,
+            'location': 'Pune',
+            'job_type': 'full-time',
+            'application_deadline': (timezone.now().date() + timedelta(days=30)).isoformat(),
+            **fields,
+        }
 
-# Create your tests here.
+    def test_bad_rows_fail_alone(self):
+        rows = [
+            self.row(title='Good 1'),
+            self.row(skills_required='x' * 301),
+            self.row(job_type='contract'),
+            self.row(min_salary=2 ** 40),
+            self.row(title='Good 2', job_type='remote'),
+        ]
+        response = self.client.post(
+            '/jobs/importJobs/',
+            '\n'.join(json.dumps(row) for row in rows),
+            content_type='application/x-ndjson',
+            **bearer(self.recruiter),
+        )
+        self.assertEqual(response.status_code, 201)
+        report = response.json()
+        self.assertEqual(report['created'], 2)
+        self.assertEqual(report['failed'], 3)
+        self.assertEqual([error['row'] for error in report['errors']], [2, 3, 4])
+        self.assertEqual(report['errors'][0]['error'], 'skills_required must be at most 300 characters')
+        self.assertCountEqual(Job.objects.filter(company=self.company).values_list('title', flat=True), ['Good 1', 'Good 2'])
@@ -1,17 +1,23 @@
 
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import async_views, views
+
+read_views = async_views if settings.ASYNC_READ_VIEWS else views
 
 urlpatterns = [
-    path('job/', views.viewAllJobs, name="view_all_jobs"),
-    path('job/<int:job_id>/', views.jobDetail, name='job_detail'),
+    path('job/', read_views.viewAllJobs, name="view_all_jobs"),
+    path('job/<int:job_id>/', read_views.jobDetail, name='job_detail'),
     path('createCompany/', views.create_company, name='create_company'),
     path('createJob/', views.createJob, name='create_job'),
+    path('importJobs/', views.importJobs, name='import_jobs'),
     path('updateJob/<int:job_id>/', views.updateJob, name='update_job'),
     path('deleteJob/<int:job_id>/', views.deleteJob, name='delete_job'),
     path('myJobs/', views.myJobs, name="my_jobs"),
     path('myCompanies/', views.myCompanies, name='my_companies'),
     path('company/<int:company_id>/', views.companyDetails, name='company_details'),
     path('myCompanyJobs/<int:company_id>/', views.myCompanyJobs, name="my_company_jobs"),
+    path('recommended/', views.recommendedJobs, name='recommended_jobs'),
+    path('autocomplete/', views.autocomplete, name='autocomplete'),
     
 ]
\ No newline at end of file
@@ -0,0 +1,58 @@
+from django.db import models
+from django.db.backends.base.operations import BaseDatabaseOperations
+from django.utils import timezone
+
+from .models import Job
+
+
+JOB_FIELDS = (
+    'title', 'company_id', 'description', 'skills_required', 'min_salary',
+    'max_salary', 'location', 'job_type', 'application_deadline',
+)
+
+# IntegerField is 32-bit on PostgreSQL and MySQL; hold SQLite to the same.
+SALARY_RANGE = BaseDatabaseOperations.integer_field_ranges['IntegerField']
+
+
+class InvalidJob(ValueError):
+    pass
+
+
+def clean_job(data, today=None):
+    """
+    Validate a createJob payload (also one row of a bulk import) and return
+    the Job field values. Company ownership is checked by the caller.
+    """
+    values = {field: data.get(field) for field in JOB_FIELDS}
+    if not all(values.values()):
+        raise InvalidJob("All fields are required")
+
+    # Anything the database would reject has to fail here, or one bad row
+    # fails the whole bulk_create chunk of an import.
+    for field in JOB_FIELDS:
+        model_field = Job._meta.get_field(field)
+        if isinstance(model_field, models.CharField):
+            values[field] = str(values[field])
+            if len(values[field]) > model_field.max_length:
+                raise InvalidJob(f"{field} must be at most {model_field.max_length} characters")
+
+    if values['job_type'] not in dict(Job.JOB_TYPES):
+        raise InvalidJob(f"job_type must be one of {', '.join(dict(Job.JOB_TYPES))}")
+
+    for field in ('min_salary', 'max_salary'):
+        try:
+            values[field] = int(values[field])
+        except (TypeError, ValueError):
+            raise InvalidJob(f"{field} must be a whole number")
+        if not SALARY_RANGE[0] <= values[field] <= SALARY_RANGE[1]:
+            raise InvalidJob(f"{field} is out of range")
+
+    try:
+        deadline = timezone.datetime.strptime(str(values['application_deadline']), '%Y-%m-%d').date()
+    except ValueError:
+        raise InvalidJob('Invalid date format. Use YYYY-MM-DD')
+    if deadline < (today or timezone.now().date()):
+        raise InvalidJob('Deadline cannot be in the past')
+    values['application_deadline'] = deadline
+
+    return values
@@ -1,7 +1,21 @@
 from .models import Job, Company
-from django.db.models import Q
-from django.http import JsonResponse
-from django.views.decorators.http import require_GET
+from .autocomplete import CATEGORIES, TOP_K, autocomplete_index
+from .bulk_import import FORMATS, guess_format, import_jobs, read_rows
+from .conditional import company_etag, company_version, job_etag, job_last_modified, listing_etag
+from .facets import facet_counts
+from .listing import InvalidListing, Listing
+from .object_cache import cached_company, cached_job
+from .recommend import applicant_skill_weights, job_skill_index
+from .pagination import InvalidPage, cursor_paginate, wants_cursor
+from .response_cache import cache_public_response
+from .streaming import STREAM_CHUNK_SIZE, StreamedArray, StreamingJsonResponse
+from .serializers import (
+    COMPANY, COMPANY_DETAIL, COMPANY_JOB, CREATED_JOB, JOB_DETAIL, JOB_LIST, RECRUITER_JOB,
+    InvalidFields,
+)
+from .validation import InvalidJob, clean_job
+from django.http import Http404, JsonResponse
+from django.views.decorators.http import condition, require_GET
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
 from django.views.decorators.csrf import csrf_exempt
@@ -9,103 +23,43 @@ from django.views.decorators.csrf import csrf_exempt
 from accounts.decorators import recruiter_required, jwt_required
 from django.views.decorators.http import require_POST
 import json
-from django.core.paginator import Paginator
 
 # Create your views here.
+@condition(etag_func=listing_etag)
+@cache_public_response('view_all_jobs')
 def viewAllJobs(request):
 
     if request.method == 'GET':
-        today = timezone.now().date()
-        jobs = Job.objects.filter(application_deadline__gte = today).select_related('company')
-
-        job_type = request.GET.get("job_type")
-        location = request.GET.get("location")
-        min_salary = request.GET.get('min_salary')
-        max_salary = request.GET.get('max_salary')
-        search = request.GET.get('search')
-
-        if job_type:
-            jobs = jobs.filter(job_type = job_type)
-
-        if location:
-            jobs = jobs.filter(location__icontains = location)
-
-        if min_salary:
-            jobs = jobs.filter(min_salary__gte = min_salary)
-        
-        if max_salary:
-            jobs = jobs.filter(max_salary__lte = max_salary)
-        
-        if search:
-            search_words = search.split()
-
-            query = Q()
-            for word in search_words:
-                query |= Q(title__icontains=word)
-                query |= Q(skills_required__icontains=word)
-                query |= Q(description__icontains=word)
-
-            jobs = jobs.filter(query)
-    
-        job_list = []
-        jobs = jobs.order_by('-posted_on')
-        page = request.GET.get('page')
-        page_size = int(request.GET.get('page_size', 10))
-        paginator = Paginator(jobs, page_size)
-        page_jobs = paginator.get_page(page)
-
-        for job in page_jobs:
-            job_list.append({
-                'id' : job.id,
-                'title': job.title,
-                
-                'location': job.location,
-                'min_salary' : job.min_salary,
-                'max_salary' : job.max_salary,
-                'posted_on' : job.posted_on.strftime("%Y-%m-%d"),
-                'job_type' : job.job_type, 
-                'company': {
-                    'id': job.company.id,
-                    'name': job.company.name,
-                    'location': job.company.location,
-                    'logo' : request.build_absolute_uri(job.company.logo.url) if job.company.logo else None,
-                },
-            })
-
-        return JsonResponse({
-            "count" : jobs.count(),
-            "total_pages": paginator.num_pages,
-            'current':page,
-            'jobs' : job_list
-            }, safe=False)
+        try:
+            listing = Listing(request)
+        except InvalidListing as e:
+            return JsonResponse({'error' : str(e)}, status=400)
+
+        facets = facet_counts(listing.filtered, listing.facets) if listing.facets else None
+        page_info = None
+        if listing.cursor:
+            try:
+                page_jobs, page_info = cursor_paginate(request, listing.jobs, 'posted_on')
+            except InvalidPage as e:
+                return JsonResponse({'error' : str(e)}, status=400)
+        else:
+            page_jobs = listing.paginator.get_page(listing.page)
+
+        return JsonResponse(listing.payload(request, page_jobs, page_info, facets), safe=False)
 
 @require_GET
+@condition(etag_func=job_etag, last_modified_func=job_last_modified)
+@cache_public_response('job_detail')
 def jobDetail(request, job_id):
-    job = get_object_or_404(
-        Job.objects.select_related('company'),
-        id = job_id
-    )
+    try:
+        fields = JOB_DETAIL.parse_fields(request)
+    except InvalidFields as e:
+        return JsonResponse({'error' : f'Invalid fields: {e}'}, status=400)
 
-    job_data = {
-        'id' : job.id,
-        'title' : job.title,
-        'description' : job.description,
-        'skills_required' : job.skills_required,
-        'job_type' : job.job_type,
-        'location' : job.location,
-        'min_salary' : job.min_salary,
-        'max_salary' : job.max_salary,
-        'deadline' : job.application_deadline.strftime("%Y-%m-%d"),
-        'posted_on' : job.posted_on.strftime("%Y-%m-%d"),
-        'company' : {
-            'id' : job.company.id,
-            'name' : job.company.name,
-            'description' : job.company.description,
-            'location' : job.company.location,
-            'website' : job.company.website,
-            'logo' : request.build_absolute_uri(job.company.logo.url) if job.company.logo else None,
-        }
-    }
+    entry = cached_job(request, job_id)
+    if entry is None:
+        raise Http404
+    job_data = JOB_DETAIL.pick(JOB_DETAIL.absolutize(entry['data'], request), fields)
 
     return JsonResponse(job_data)
 
@@ -137,13 +91,7 @@ def create_company(request):
 
     return JsonResponse({
         'message' : 'Company created successfully',
-        'company' : {
-            'id' : company.id,
-            'name' : company.name,
-            'logo' : request.build_absolute_uri(company.logo.url) if company.logo else None,
-            'location': company.location,
-            'website' : company.website
-        }
+        'company' : COMPANY.serialize_instance(company, request)
     })
 
 @jwt_required
@@ -156,60 +104,41 @@ def createJob(request):
     except json.JSONDecodeError:
         return JsonResponse({'error':'Invalid Json'},  status=400)
     
-    title = data.get('title')
-    company_id = data.get('company_id')
-    description = data.get('description')
-    skills_required = data.get('skills_required')
-    min_salary = data.get('min_salary')
-    max_salary = data.get('max_salary')
-    location = data.get('location')
-    job_type = data.get('job_type')
-    deadline = data.get('application_deadline')
+    try:
+        values = clean_job(data)
+    except InvalidJob as e:
+        return JsonResponse({'error' : str(e)}, status = 400)
 
-    if not all([title, company_id, description, skills_required, min_salary, max_salary, location, job_type, deadline]):
-        return JsonResponse(
-            {'error' : "All fields are required"},
-            status = 400
-        )
-    
     try:
-        company = Company.objects.get(id = company_id, owner=request.user)
-    except Company.DoesNotExist:
+        company = Company.objects.get(id = values.pop('company_id'), owner=request.user)
+    except (Company.DoesNotExist, ValueError):
         return JsonResponse({'error' : "Company not found"}, status = 404)
-    
-    try:
-        deadline_date = timezone.datetime.strptime(deadline, '%Y-%m-%d').date()
-        if deadline_date < timezone.now().date():
-            return JsonResponse({'error' : 'Deadline cannot be in the past'}, status=400)
-    except ValueError:
-        return JsonResponse({'error' : 'Invalid date format. Use YYYY-MM-DD'}, status = 400)
-    
-    job = Job.objects.create(
-        title = title,
-        company=company,
-        description=description,
-        skills_required=skills_required,
-        min_salary=min_salary,
-        max_salary=max_salary,
-        location=location,
-        job_type=job_type,
-        application_deadline = deadline_date
-    )
+
+    job = Job.objects.create(company=company, **values)
 
     return JsonResponse({
         'message': 'Job created successfully',
-        'job': {
-            'id': job.id,
-            'title': job.title,
-            'company': job.company.name,
-            'location': job.location,
-            'job_type': job.job_type,
-            'min_salary': job.min_salary,
-            'max_salary': job.max_salary,
-            'deadline': job.application_deadline.strftime("%Y-%m-%d"),
-        }
+        'job': CREATED_JOB.serialize_instance(job, request)
     })
 
+@jwt_required
+@recruiter_required
+@require_POST
+@csrf_exempt
+def importJobs(request):
+    # Either a multipart upload in `file` or the raw CSV / JSON Lines body.
+    upload = request.FILES.get('file')
+    if upload is not None:
+        stream, format = upload, guess_format(upload.name, upload.content_type or '')
+    else:
+        stream, format = request, guess_format('', request.content_type or '')
+    format = request.GET.get('format', format)
+    if format not in FORMATS:
+        return JsonResponse({'error' : f"Invalid format. Use one of {', '.join(FORMATS)}"}, status=400)
+
+    report = import_jobs(read_rows(stream, format), owner=request.user)
+    return JsonResponse(report, status=201 if report['created'] else 400)
+
 @jwt_required
 @recruiter_required
 @require_POST
@@ -232,16 +161,25 @@ def updateJob(request, job_id):
     job_type = data.get('job_type')
     deadline = data.get('deadline')
 
+    # Only the edited columns are written: a full save would put back the
+    # application counters as loaded above, undoing concurrent applies.
+    changed = []
     if title:
         job.title = title
+        changed.append('title')
     if description:
         job.description = description
+        changed.append('description')
     if skills_required:
         job.skills_required = skills_required
+        changed.append('skills_required')
     if location:
         job.location = location
+        # Geocoded again by the pre_save signal.
+        changed += ['location', 'latitude', 'longitude']
     if job_type:
         job.job_type = job_type
+        changed.append('job_type')
 
     if min_salary or max_salary:
         try:
@@ -256,6 +194,7 @@ def updateJob(request, job_id):
 
             job.min_salary = min_sal
             job.max_salary = max_sal
+            changed += ['min_salary', 'max_salary']
 
         except ValueError:
             return JsonResponse(
@@ -272,13 +211,14 @@ def updateJob(request, job_id):
                     status=400
                 )
             job.application_deadline = deadline_date
+            changed.append('application_deadline')
         except ValueError:
             return JsonResponse(
                 {'error' : "Invalid date format. Use YYYY-MM-DD"},
                 status=400
             )
-    
-    job.save()
+
+    job.save(update_fields=[*changed, 'updated_at'])
     return JsonResponse({
         'message' : 'Job updated successfully',
         'job_id' : job.id
@@ -303,70 +243,63 @@ def deleteJob(request, job_id):
 @recruiter_required
 @require_GET
 def myCompanyJobs(request, company_id):
-    jobs = Job.objects.filter(company__owner = request.user).select_related('company').order_by('-posted_on')
-    company = get_object_or_404(Company, id=company_id)
+    try:
+        fields = RECRUITER_JOB.parse_fields(request)
+    except InvalidFields as e:
+        return JsonResponse({'error' : f'Invalid fields: {e}'}, status=400)
+
+    jobs = Job.objects.filter(company__owner = request.user).order_by('-posted_on')
+    company = get_object_or_404(Company.objects.only('id'), id=company_id)
 
     if company_id:
         jobs = jobs.filter(company = company)
-    job_list = []
-    for job in jobs:
-        job_list.append({
-            'id' : job.id,
-            'title':job.title,
-            'location': job.location,
-            'job_type': job.job_type,
-            'min_salary': job.min_salary,
-            'max_salary': job.max_salary,
-            'deadline' : job.application_deadline.strftime("%Y-%m-%d"),
-            'company': {
-                'id' : job.company.id,
-                'name' : job.company.name,
-                'logo' : request.build_absolute_uri(job.company.logo.url) if job.company.logo else None,
-
-            }
-        })
-    return JsonResponse({'count' : jobs.count(), 'jobs':job_list})
+    jobs = RECRUITER_JOB.project(jobs, fields, extra=['posted_on'])
+    if wants_cursor(request):
+        try:
+            jobs, page_info = cursor_paginate(request, jobs, 'posted_on')
+        except InvalidPage as e:
+            return JsonResponse({'error' : str(e)}, status=400)
+        job_list = [RECRUITER_JOB.serialize(job, request, fields) for job in jobs]
+        return JsonResponse({**page_info, 'jobs' : job_list})
+
+    job_list = StreamedArray(
+        RECRUITER_JOB.serialize(job, request, fields)
+        for job in jobs.iterator(chunk_size=STREAM_CHUNK_SIZE)
+    )
+    return StreamingJsonResponse({'jobs':job_list, 'count' : lambda: job_list.count})
 
 @jwt_required
 @recruiter_required
 @require_GET
 def myJobs(request):
-    jobs = Job.objects.filter(company__owner = request.user).select_related('company').order_by('-posted_on')
-    
-    job_list = []
-    for job in jobs:
-        job_list.append({
-            'id' : job.id,
-            'title':job.title,
-            'location': job.location,
-            'job_type': job.job_type,
-            'min_salary': job.min_salary,
-            'max_salary': job.max_salary,
-            'deadline' : job.application_deadline.strftime("%Y-%m-%d"),
-            'company': {
-                'id' : job.company.id,
-                'name' : job.company.name,
-                'logo' : request.build_absolute_uri(job.company.logo.url) if job.company.logo else None,
-
-            }
-        })
-    return JsonResponse({'count' : jobs.count(), 'jobs':job_list})
+    try:
+        fields = RECRUITER_JOB.parse_fields(request)
+    except InvalidFields as e:
+        return JsonResponse({'error' : f'Invalid fields: {e}'}, status=400)
+
+    jobs = Job.objects.filter(company__owner = request.user).order_by('-posted_on')
+    jobs = RECRUITER_JOB.project(jobs, fields, extra=['posted_on'])
+
+    if wants_cursor(request):
+        try:
+            jobs, page_info = cursor_paginate(request, jobs, 'posted_on')
+        except InvalidPage as e:
+            return JsonResponse({'error' : str(e)}, status=400)
+        job_list = [RECRUITER_JOB.serialize(job, request, fields) for job in jobs]
+        return JsonResponse({**page_info, 'jobs' : job_list})
+
+    job_list = StreamedArray(
+        RECRUITER_JOB.serialize(job, request, fields)
+        for job in jobs.iterator(chunk_size=STREAM_CHUNK_SIZE)
+    )
+    return StreamingJsonResponse({'jobs':job_list, 'count' : lambda: job_list.count})
 
 @jwt_required
 @recruiter_required
 @require_GET
 def myCompanies(request):
-    companies = Company.objects.filter(owner=request.user)
-
-    company_list = []
-    for company in companies:
-        company_list.append({
-            'id': company.id,
-            'name': company.name,
-            'location': company.location,
-            'website': company.website,
-            'logo': request.build_absolute_uri(company.logo.url) if company.logo else None,
-        })
+    companies = COMPANY.project(Company.objects.filter(owner=request.user))
+    company_list = [COMPANY.serialize(company, request) for company in companies]
 
     return JsonResponse({
         'count': len(company_list),
@@ -376,30 +309,72 @@ def myCompanies(request):
 @jwt_required
 @recruiter_required
 @require_GET
+@condition(etag_func=company_etag)
 def companyDetails(request, company_id):
-    company = get_object_or_404(Company, owner=request.user, id=company_id)
-    companyJobs = Job.objects.filter(company = company)
-    jobs = []
-    for job in companyJobs:
-        jobs.append({
-            'id' : job.id,
-            'title' : job.title,
-            'location' : job.location,
-            'job_type' : job.job_type,
-            'min_salary' : job.min_salary,
-            'max_salary' : job.max_salary,
-        })
-
-    companyData = {
-        'company_id' : company.id,
-        'name' : company.name,
-        'location' : company.location,
-        'website' : company.website,
-        'logo' : request.build_absolute_uri(company.logo.url) if company.logo else None,
-        'jobs' : jobs,
-        'description': company.description,
-    }
+    # Also checks ownership; computed once per request for the conditional GET.
+    version = company_version(request, company_id)
+    if version is None:
+        raise Http404
+    entry = cached_company(company_id, version)
+    if entry is None:
+        raise Http404
+    if entry['data'] is not None:
+        return JsonResponse({'company' : COMPANY_DETAIL.absolutize(entry['data'], request)})
+
+    company = get_object_or_404(COMPANY_DETAIL.project(Company.objects), id=company_id)
+    companyJobs = COMPANY_JOB.project(Job.objects.filter(company_id = company['id']))
+    jobs = StreamedArray(
+        COMPANY_JOB.serialize(job, request)
+        for job in companyJobs.iterator(chunk_size=STREAM_CHUNK_SIZE)
+    )
 
-    return JsonResponse({
+    companyData = COMPANY_DETAIL.serialize(company, request)
+    companyData['jobs'] = jobs
+
+    return StreamingJsonResponse({
         'company' : companyData,
     })
+
+
+@jwt_required
+@require_GET
+def recommendedJobs(request):
+    try:
+        limit = max(1, min(int(request.GET.get('limit', 10)), 50))
+    except ValueError:
+        return JsonResponse({'error' : 'limit must be numeric'}, status=400)
+
+    weights, applied_job_ids = applicant_skill_weights(request.user, request.GET.get('skills'))
+    ranked = job_skill_index.top_jobs(weights, exclude_job_ids=applied_job_ids, limit=limit)
+
+    rows = JOB_LIST.project(Job.objects.filter(id__in=[job_id for job_id, _ in ranked]))
+    rows = {row['id']: row for row in rows}
+
+    job_list = []
+    for job_id, score in ranked:
+        if job_id in rows:
+            job = JOB_LIST.serialize(rows[job_id], request)
+            job['score'] = round(score, 4)
+            job_list.append(job)
+
+    return JsonResponse({'count' : len(job_list), 'jobs' : job_list})
+
+
+@require_GET
+def autocomplete(request):
+    query = request.GET.get('q', '')
+    try:
+        limit = max(1, min(int(request.GET.get('limit', TOP_K)), TOP_K))
+    except ValueError:
+        return JsonResponse({'error' : 'limit must be numeric'}, status=400)
+
+    categories = CATEGORIES
+    if request.GET.get('types'):
+        categories = [name.strip() for name in request.GET['types'].split(',') if name.strip()]
+        if any(name not in CATEGORIES for name in categories):
+            return JsonResponse({'error' : f"types must be among {', '.join(CATEGORIES)}"}, status=400)
+
+    return JsonResponse({
+        'query' : query,
+        'suggestions' : autocomplete_index.suggest(query, categories, limit)
+    })
@@ -0,0 +1,51 @@
+import pstats
+from collections import defaultdict
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from monitoring.profiling import parse_dump_name, profile_dir
+
+
+SORT_KEYS = {'tottime': 2, 'cumtime': 3}
+
+
+class Command(BaseCommand):
+    help = "Summarize profiler dumps into the top-N hot functions per endpoint"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dir', help="Directory with .prof dumps (default: PROFILER_DIR)")
+        parser.add_argument('--view', help="Only this URL name, e.g. view_all_jobs")
+        parser.add_argument('--top', type=int, default=15)
+        parser.add_argument('--sort', choices=sorted(SORT_KEYS), default='tottime')
+
+    def handle(self, *args, **options):
+        directory = Path(options['dir']) if options['dir'] else profile_dir()
+        if not directory.is_dir():
+            raise CommandError(f"{directory} does not exist")
+
+        dumps = defaultdict(list)
+        for path in sorted(directory.iterdir()):
+            parsed = parse_dump_name(path.name)
+            if parsed is None or (options['view'] and parsed[0] != options['view']):
+                continue
+            dumps[parsed[0]].append((path, parsed[1]))
+        if not dumps:
+            self.stdout.write("No profile dumps found")
+            return
+
+        column = SORT_KEYS[options['sort']]
+        for view_name, files in sorted(dumps.items()):
+            stats = pstats.Stats(*(str(path) for path, _ in files))
+            latencies = sorted(latency for _, latency in files)
+            total = sum(entry[2] for entry in stats.stats.values()) or 1
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f"{view_name}: {len(files)} requests, "
+                f"median {latencies[len(latencies) // 2]}ms, max {latencies[-1]}ms"
+            ))
+            self.stdout.write(f"{'own %':>7} {'own s':>9} {'cum s':>9} {'calls':>9}  function")
+            hottest = sorted(stats.stats.items(), key=lambda item: -item[1][column])[:options['top']]
+            for (filename, line, function), (_, calls, own, cumulative, _) in hottest:
+                where = '' if filename == '~' else f" ({Path(filename).name}:{line})"
+                self.stdout.write(f"{100 * own / total:6.1f}% {own:9.4f} {cumulative:9.4f} {calls:9d}  {function}{where}")
+            self.stdout.write("")
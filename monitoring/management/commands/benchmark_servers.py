@@ -0,0 +1,168 @@
+import http.client
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+SERVERS = {
+    # Sync workers, sync views: one request at a time per worker.
+    'gunicorn': lambda port, workers: [
+        sys.executable, '-m', 'gunicorn', 'backend.wsgi',
+        '--workers', str(workers), '--bind', f'127.0.0.1:{port}', '--log-level', 'warning',
+    ],
+    # backend.asgi turns on ASYNC_READ_VIEWS.
+    'uvicorn': lambda port, workers: [
+        sys.executable, '-m', 'uvicorn', 'backend.asgi:application',
+        '--workers', str(workers), '--port', str(port), '--log-level', 'warning', '--no-access-log',
+    ],
+}
+DEFAULT_PATHS = ['/jobs/job/', '/jobs/job/?search=python&page=2', '/jobs/job/1/']
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def _variant(value):
+    """'label:NAME=VALUE,NAME=VALUE' -> (label, {NAME: VALUE})."""
+    label, _, assignments = value.partition(':')
+    env = {}
+    for assignment in filter(None, assignments.split(',')):
+        name, sep, setting = assignment.partition('=')
+        if not sep:
+            raise CommandError(f"Malformed variant: {value}")
+        env[name.strip()] = setting.strip()
+    return label, env
+
+
+def _percentile(ordered, fraction):
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+class Command(BaseCommand):
+    help = (
+        "Load the read endpoints through gunicorn sync workers and through uvicorn "
+        "(async views) with the same number of processes, and compare throughput and "
+        "latency. The gap grows with database latency, so run it against the real database. "
+        "--variant runs each server once per set of environment overrides, e.g. "
+        "--variant persistent:DATABASE_POOL=0 --variant pooled:DATABASE_POOL=1."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--server', action='append', choices=sorted(SERVERS), help="Default: both")
+        parser.add_argument('--url', help="Benchmark an already running server instead, e.g. http://127.0.0.1:8000")
+        parser.add_argument('--path', action='append', help="Request path, repeatable (cycled)")
+        parser.add_argument('--header', action='append', default=[], help="Extra header, e.g. 'Authorization: Bearer ...'")
+        parser.add_argument('--workers', type=int, default=2)
+        parser.add_argument('--concurrency', type=int, default=50)
+        parser.add_argument('--requests', type=int, default=2000)
+        parser.add_argument('--warmup', type=int, default=100)
+        parser.add_argument('--variant', action='append', type=_variant, help="label:NAME=VALUE[,NAME=VALUE], repeatable")
+
+    def handle(self, *args, **options):
+        paths = options['path'] or DEFAULT_PATHS
+        headers = {}
+        for header in options['header']:
+            name, _, value = header.partition(':')
+            if not value:
+                raise CommandError(f"Malformed header: {header}")
+            headers[name.strip()] = value.strip()
+
+        if options['url']:
+            target = urlsplit(options['url'])
+            results = {options['url']: self.run_load(target.hostname, target.port or 80, paths, headers, options)}
+        else:
+            results = {}
+            variants = options['variant'] or [(None, {})]
+            for server in options['server'] or sorted(SERVERS):
+                for label, env in variants:
+                    name = f'{server}/{label}' if label else server
+                    results[name] = self.with_server(
+                        server, env, options, lambda port: self.run_load('127.0.0.1', port, paths, headers, options)
+                    )
+
+        self.stdout.write(f"{options['requests']} requests, concurrency {options['concurrency']}, paths {', '.join(paths)}")
+        self.stdout.write(f"{'server':<24} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7}")
+        for name, result in results.items():
+            self.stdout.write(
+                f"{name:<24} {result['rps']:9.1f} {result['p50']:9.1f} {result['p95']:9.1f} "
+                f"{result['p99']:9.1f} {result['errors']:7d}"
+            )
+
+    def with_server(self, server, env, options, run):
+        port = _free_port()
+        process = subprocess.Popen(SERVERS[server](port, options['workers']), env={**os.environ, **env})
+        try:
+            deadline = time.monotonic() + 30
+            while True:
+                try:
+                    socket.create_connection(('127.0.0.1', port), timeout=1).close()
+                    break
+                except OSError:
+                    if process.poll() is not None or time.monotonic() > deadline:
+                        raise CommandError(f"{server} did not start")
+                    time.sleep(0.2)
+            return run(port)
+        finally:
+            process.terminate()
+            process.wait(timeout=30)
+
+    def run_load(self, host, port, paths, headers, options):
+        local = threading.local()
+
+        def request(path):
+            connection = getattr(local, 'connection', None)
+            if connection is None:
+                connection = local.connection = http.client.HTTPConnection(host, port, timeout=60)
+            started = time.perf_counter()
+            try:
+                connection.request('GET', path, headers=headers)
+                response = connection.getresponse()
+                response.read()
+                ok = response.status < 500
+            except (OSError, http.client.HTTPException):
+                connection.close()
+                local.connection = None
+                ok = False
+            return time.perf_counter() - started, ok
+
+        def phase(count):
+            # Workers pull request numbers until `count` have been sent.
+            numbers = iter(range(count))
+            lock = threading.Lock()
+            samples = []
+
+            def worker():
+                while True:
+                    with lock:
+                        index = next(numbers, None)
+                    if index is None:
+                        return
+                    samples.append(request(paths[index % len(paths)]))
+
+            started = time.perf_counter()
+            with ThreadPoolExecutor(options['concurrency']) as pool:
+                for _ in range(options['concurrency']):
+                    pool.submit(worker)
+            return samples, time.perf_counter() - started
+
+        phase(options['warmup'])
+        samples, wall = phase(options['requests'])
+
+        latencies = sorted(elapsed * 1000 for elapsed, _ in samples)
+        return {
+            'rps': len(samples) / wall,
+            'p50': _percentile(latencies, 0.50),
+            'p95': _percentile(latencies, 0.95),
+            'p99': _percentile(latencies, 0.99),
+            'errors': sum(1 for _, ok in samples if not ok),
+        }
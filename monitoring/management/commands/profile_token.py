@@ -0,0 +1,12 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from monitoring.profiling import PROFILE_HEADER, make_token
+
+
+class Command(BaseCommand):
+    help = "Print a signed X-Profile header value that makes requests run under the profiler"
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"{PROFILE_HEADER}: {make_token()}")
+        self.stderr.write(f"Valid for {settings.PROFILER_TOKEN_MAX_AGE} seconds")
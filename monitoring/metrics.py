@@ -0,0 +1,435 @@
+import bisect
+import fcntl
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+
+from . import timing
+
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 250)
+
+# name: (type, help, label names, histogram buckets)
+METRICS = {
+    'jobsup_http_requests_total': (
+        'counter', "Requests by URL name, method and status code.", ('view', 'method', 'status'), None
+    ),
+    'jobsup_http_request_duration_seconds': (
+        'histogram', "Request latency by URL name.", ('view',), LATENCY_BUCKETS
+    ),
+    'jobsup_http_request_db_queries': (
+        'histogram', "Database queries per request by URL name.", ('view',), QUERY_BUCKETS
+    ),
+    'jobsup_http_request_db_seconds': (
+        'histogram', "Time spent in database queries per request by URL name.", ('view',), LATENCY_BUCKETS
+    ),
+    'jobsup_db_pool_checkouts_total': (
+        'counter', "Connections requested from the pool by database alias.", ('alias',), None
+    ),
+    'jobsup_db_pool_waits_total': (
+        'counter', "Pool checkouts that had to wait for a free connection.", ('alias',), None
+    ),
+    'jobsup_db_pool_wait_seconds_total': (
+        'counter', "Time spent waiting for a pooled connection.", ('alias',), None
+    ),
+    'jobsup_db_pool_checkout_errors_total': (
+        'counter', "Pool checkouts that timed out or failed.", ('alias',), None
+    ),
+    'jobsup_db_pool_usage_seconds_total': (
+        'counter', "Time pooled connections spent checked out.", ('alias',), None
+    ),
+    'jobsup_db_pool_connects_total': (
+        'counter', "Connections the pool opened to the database.", ('alias',), None
+    ),
+    'jobsup_db_pool_connections_lost_total': (
+        'counter', "Pooled connections found broken and discarded.", ('alias',), None
+    ),
+    'jobsup_db_pool_connections': (
+        'gauge', "Open pooled connections, summed over live workers.", ('alias',), None
+    ),
+    'jobsup_db_pool_idle_connections': (
+        'gauge', "Pooled connections waiting in the pool, summed over live workers.", ('alias',), None
+    ),
+    'jobsup_db_pool_waiting_checkouts': (
+        'gauge', "Checkouts currently waiting for a connection, summed over live workers.", ('alias',), None
+    ),
+}
+
+# psycopg_pool statistic: (metric, scale). Counters come from pop_stats(),
+# which resets them, so each value is added to the store exactly once.
+POOL_COUNTERS = {
+    'requests_num': ('jobsup_db_pool_checkouts_total', 1),
+    'requests_queued': ('jobsup_db_pool_waits_total', 1),
+    'requests_wait_ms': ('jobsup_db_pool_wait_seconds_total', 0.001),
+    'requests_errors': ('jobsup_db_pool_checkout_errors_total', 1),
+    'usage_ms': ('jobsup_db_pool_usage_seconds_total', 0.001),
+    'connections_num': ('jobsup_db_pool_connects_total', 1),
+    'connections_lost': ('jobsup_db_pool_connections_lost_total', 1),
+}
+POOL_GAUGES = {
+    'pool_size': 'jobsup_db_pool_connections',
+    'pool_available': 'jobsup_db_pool_idle_connections',
+    'requests_waiting': 'jobsup_db_pool_waiting_checkouts',
+}
+
+METHODS = {'GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'}
+
+
+def _bucket_labels(buckets):
+    return tuple(repr(bound) for bound in buckets) + ('+Inf',)
+
+
+_BUCKET_LABELS = {name: _bucket_labels(spec[3]) for name, spec in METRICS.items() if spec[0] == 'histogram'}
+_GAUGES = {name for name, spec in METRICS.items() if spec[0] == 'gauge'}
+
+_HEADER = struct.Struct('Q')
+_KEY_LENGTH = struct.Struct('I')
+_VALUE = struct.Struct('d')
+_INITIAL_SIZE = 64 * 1024
+# Counters and histograms of exited workers, folded in by mark_process_dead.
+ARCHIVE_NAME = 'metrics-archive.db'
+
+
+def _read_entries(data, used):
+    """Yield (key, value position, value) for each entry in a store file's bytes."""
+    position = _HEADER.size
+    while position < used:
+        length = _KEY_LENGTH.unpack_from(data, position)[0]
+        key_start = position + _KEY_LENGTH.size
+        value_at = key_start + length + (-(key_start + length) % 8)
+        key = tuple(json.loads(bytes(data[key_start:key_start + length])))
+        yield key, value_at, _VALUE.unpack_from(data, value_at)[0]
+        position = value_at + _VALUE.size
+
+
+class FileStore:
+    """
+    Sample values of one process in an mmap'ed file that the /metrics view
+    of any worker can read. The layout is a used-bytes header followed by
+    append-only (key length, JSON key, float64) entries; only the owning
+    process writes, and it bumps the header after an entry is complete, so
+    readers never see a half-written key.
+    """
+
+    def __init__(self, path):
+        self.pid = os.getpid()
+        self.lock = threading.Lock()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(path, 'a+b')
+        size = os.fstat(self._file.fileno()).st_size
+        if size < _INITIAL_SIZE:
+            self._file.truncate(_INITIAL_SIZE)
+            size = _INITIAL_SIZE
+        self._map = mmap.mmap(self._file.fileno(), size)
+        self._used = _HEADER.unpack_from(self._map, 0)[0] or _HEADER.size
+        # A recycled pid picks up where the dead process's counters stopped.
+        self._positions = {key: at for key, at, _ in _read_entries(self._map, self._used)}
+
+    def _append(self, key):
+        encoded = json.dumps(key).encode()
+        key_start = self._used + _KEY_LENGTH.size
+        value_at = key_start + len(encoded) + (-(key_start + len(encoded)) % 8)
+        end = value_at + _VALUE.size
+        if end > len(self._map):
+            size = len(self._map)
+            while size < end:
+                size *= 2
+            self._file.truncate(size)
+            self._map.resize(size)
+        _KEY_LENGTH.pack_into(self._map, self._used, len(encoded))
+        self._map[key_start:key_start + len(encoded)] = encoded
+        _VALUE.pack_into(self._map, value_at, 0.0)
+        self._used = end
+        _HEADER.pack_into(self._map, 0, end)
+        self._positions[key] = value_at
+        return value_at
+
+    def add(self, increments):
+        with self.lock:
+            for key, amount in increments:
+                at = self._positions.get(key)
+                if at is None:
+                    at = self._append(key)
+                _VALUE.pack_into(self._map, at, _VALUE.unpack_from(self._map, at)[0] + amount)
+
+    def set(self, values):
+        with self.lock:
+            for key, value in values:
+                at = self._positions.get(key)
+                if at is None:
+                    at = self._append(key)
+                _VALUE.pack_into(self._map, at, value)
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+
+class MemoryStore:
+    """Store for a single-process server (METRICS_DIR unset)."""
+
+    def __init__(self):
+        self.pid = os.getpid()
+        self.lock = threading.Lock()
+        self.values = defaultdict(float)
+
+    def add(self, increments):
+        with self.lock:
+            for key, amount in increments:
+                self.values[key] += amount
+
+    def set(self, values):
+        with self.lock:
+            self.values.update(values)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def store():
+    """This process's store, reopened after a fork so each worker writes its own file."""
+    global _store
+    if _store is None or _store.pid != os.getpid():
+        with _store_lock:
+            if _store is None or _store.pid != os.getpid():
+                directory = settings.METRICS_DIR
+                if directory:
+                    _store = FileStore(Path(directory) / f'metrics-{os.getpid()}.db')
+                else:
+                    _store = MemoryStore()
+    return _store
+
+
+def _observe(increments, name, view, value):
+    labels = _BUCKET_LABELS[name]
+    bucket = labels[bisect.bisect_left(METRICS[name][3], value)]
+    increments.append(((name, 'bucket', view, bucket), 1))
+    increments.append(((name, 'sum', view), value))
+    increments.append(((name, 'count', view), 1))
+
+
+def record_request(view, method, status, seconds, queries, db_seconds):
+    increments = [(('jobsup_http_requests_total', '', view, method, str(status)), 1)]
+    _observe(increments, 'jobsup_http_request_duration_seconds', view, seconds)
+    _observe(increments, 'jobsup_http_request_db_queries', view, queries)
+    _observe(increments, 'jobsup_http_request_db_seconds', view, db_seconds)
+    store().add(increments)
+
+
+def record_pools():
+    """
+    Fold the statistics of this process's psycopg connection pools into the
+    store. The /metrics view runs it, so a worker's pool figures are as of
+    the last scrape it served.
+    """
+    increments, values = [], []
+    for alias, database in settings.DATABASES.items():
+        if not database.get('OPTIONS', {}).get('pool'):
+            continue
+        stats = connections[alias].pool.pop_stats()
+        for stat, (name, scale) in POOL_COUNTERS.items():
+            if stats.get(stat):
+                increments.append(((name, '', alias), stats[stat] * scale))
+        for stat, name in POOL_GAUGES.items():
+            values.append(((name, '', alias), stats.get(stat, 0)))
+    if values:
+        local = store()
+        local.add(increments)
+        local.set(values)
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _pid_of(path):
+    pid = path.stem.rpartition('-')[2]
+    return int(pid) if pid.isdigit() else None
+
+
+def mark_process_dead(pid, directory=None):
+    """
+    Fold the counters and histograms of exited process `pid` into the
+    archive file and delete its store, so totals stay monotonic while the
+    directory does not grow with every worker restart. Its gauges are
+    dropped. Run by gunicorn's child_exit hook (gunicorn.conf.py) and by
+    collect() for dead workers it finds, e.g. under other servers.
+    """
+    directory = directory or settings.METRICS_DIR
+    if not directory:
+        return
+    directory = Path(directory)
+    path = directory / f'metrics-{pid}.db'
+    directory.mkdir(parents=True, exist_ok=True)
+    # The archive has several writers, so only one may open and append at a time.
+    with open(directory / 'metrics-archive.lock', 'a') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            data = path.read_bytes()
+        except FileNotFoundError:
+            # Already folded in by another worker.
+            return
+        if len(data) >= _HEADER.size:
+            archive = FileStore(directory / ARCHIVE_NAME)
+            try:
+                archive.add([
+                    (key, value)
+                    for key, _, value in _read_entries(data, _HEADER.unpack_from(data, 0)[0])
+                    if key[0] not in _GAUGES
+                ])
+            finally:
+                archive.close()
+        path.unlink()
+
+
+def collect():
+    """
+    {key: value} summed over every process's store and the archive:
+    counters and histograms of live and exited workers, gauges of live
+    ones only.
+    """
+    directory = settings.METRICS_DIR
+    if not directory:
+        local = store()
+        with local.lock:
+            return dict(local.values)
+
+    directory = Path(directory)
+    for path in list(directory.glob('metrics-*.db')):
+        pid = _pid_of(path)
+        if pid is not None and not _alive(pid):
+            mark_process_dead(pid, directory)
+
+    totals = defaultdict(float)
+    for path in directory.glob('metrics-*.db'):
+        try:
+            data = path.read_bytes()
+        except FileNotFoundError:
+            # Exited and folded into the archive by another worker meanwhile.
+            continue
+        if len(data) < _HEADER.size:
+            continue
+        for key, _, value in _read_entries(data, _HEADER.unpack_from(data, 0)[0]):
+            totals[key] += value
+    return totals
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(pairs):
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _number(value):
+    value = float(value)
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+def render(samples):
+    """Prometheus text exposition (version 0.0.4) of collected samples."""
+    by_metric = defaultdict(list)
+    for key, value in samples.items():
+        by_metric[key[0]].append((key[1:], value))
+
+    lines = []
+    for name, (kind, help_text, label_names, _) in METRICS.items():
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+        entries = by_metric.get(name, [])
+        if kind in ('counter', 'gauge'):
+            for (_, *values), value in sorted(entries):
+                lines.append(f'{name}{_labels(zip(label_names, values))} {_number(value)}')
+            continue
+
+        series = defaultdict(dict)
+        for (suffix, *values), value in entries:
+            if suffix == 'bucket':
+                series[tuple(values[:-1])][values[-1]] = value
+            else:
+                series[tuple(values)][suffix] = value
+        for values in sorted(series):
+            observed = series[values]
+            pairs = list(zip(label_names, values))
+            cumulative = 0.0
+            for bucket in _BUCKET_LABELS[name]:
+                cumulative += observed.get(bucket, 0.0)
+                lines.append(f'{name}_bucket{_labels(pairs + [("le", bucket)])} {_number(cumulative)}')
+            lines.append(f'{name}_sum{_labels(pairs)} {_number(observed.get("sum", 0.0))}')
+            lines.append(f'{name}_count{_labels(pairs)} {_number(observed.get("count", 0.0))}')
+    return '\n'.join(lines) + '\n'
+
+
+class MetricsMiddleware:
+    """
+    Count every request into the Prometheus metrics, labeled by URL name
+    ('unresolved' for 404s that matched no pattern). Recording is a few
+    dict lookups and mmap writes; streaming responses are recorded when
+    their body is finished. Keep it first in MIDDLEWARE.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        started = time.perf_counter()
+        timings = timing.RequestTimings(capture_sql=False)
+        with timing.recording(timings):
+            response = self.get_response(request)
+        return self.finish(request, response, timings, started)
+
+    async def __acall__(self, request):
+        started = time.perf_counter()
+        timings = timing.RequestTimings(capture_sql=False)
+        with timing.recording(timings):
+            response = await self.get_response(request)
+        return self.finish(request, response, timings, started)
+
+    def finish(self, request, response, timings, started):
+        if response.streaming:
+            timing.wrap_stream(
+                response,
+                lambda: timing.recording(timings),
+                lambda: self.record(request, response, timings, started)
+            )
+        else:
+            self.record(request, response, timings, started)
+        return response
+
+    @staticmethod
+    def record(request, response, timings, started):
+        match = getattr(request, 'resolver_match', None)
+        record_request(
+            (match.url_name if match else None) or 'unresolved',
+            request.method if request.method in METHODS else 'other',
+            response.status_code,
+            time.perf_counter() - started,
+            timings.query_count,
+            timings.db_time
+        )
@@ -0,0 +1,155 @@
+import cProfile
+import os
+import random
+import time
+import uuid
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core import signing
+from django.http import JsonResponse
+from django.utils import timezone
+
+from . import timing
+
+
+PROFILE_HEADER = 'X-Profile'
+TOKEN_SALT = 'monitoring.profile'
+FILE_SUFFIX = '.prof'
+
+
+def make_token():
+    """Value for the X-Profile request header; valid for PROFILER_TOKEN_MAX_AGE seconds."""
+    return signing.TimestampSigner(salt=TOKEN_SALT).sign('profile')
+
+
+def valid_token(value):
+    try:
+        signing.TimestampSigner(salt=TOKEN_SALT).unsign(value, max_age=settings.PROFILER_TOKEN_MAX_AGE)
+    except signing.BadSignature:
+        return False
+    return True
+
+
+def profile_dir():
+    return Path(settings.PROFILER_DIR)
+
+
+def dump_name(view_name, elapsed):
+    # <url name>__<latency>ms__<timestamp>__<unique>.prof, parsed back by parse_dump_name.
+    stamp = timezone.now().strftime('%Y%m%dT%H%M%S')
+    unique = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+    return f"{view_name}__{round(elapsed * 1000)}ms__{stamp}__{unique}{FILE_SUFFIX}"
+
+
+def parse_dump_name(name):
+    """(url name, latency ms) from a dump file name, or None for other files."""
+    if not name.endswith(FILE_SUFFIX):
+        return None
+    parts = name[:-len(FILE_SUFFIX)].split('__')
+    if len(parts) != 4 or not parts[1].endswith('ms') or not parts[1][:-2].isdigit():
+        return None
+    return parts[0], int(parts[1][:-2])
+
+
+class ProfilerMiddleware:
+    """
+    Run a request under cProfile when it carries a valid signed X-Profile
+    header (see `manage.py profile_token`) or is picked by
+    PROFILER_SAMPLE_RATE, and write the stats to PROFILER_DIR tagged with
+    the URL name and latency, keeping the newest PROFILER_MAX_FILES.
+    `manage.py aggregate_profiles` summarizes the dumps; a signed request
+    also gets the file name back in X-Profile-File. Requests that are not
+    profiled pay one header lookup and one random() call.
+
+    When it runs async (under ASGI, with only async-capable middleware
+    below it) nothing is sampled and a request with an X-Profile header
+    gets a 501: cProfile follows one thread, and there that thread runs
+    every request's coroutines while the ORM works in others, so the dump
+    would be neither complete nor this request's alone. Profile against a
+    WSGI worker instead.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    @staticmethod
+    def signed(request):
+        token = request.headers.get(PROFILE_HEADER)
+        return bool(token) and valid_token(token)
+
+    @staticmethod
+    def sampled(request):
+        # A bad X-Profile header is not retried as a sample.
+        if PROFILE_HEADER in request.headers:
+            return False
+        rate = settings.PROFILER_SAMPLE_RATE
+        return rate > 0 and random.random() < rate
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        signed = self.signed(request)
+        if not signed and not self.sampled(request):
+            return self.get_response(request)
+
+        profiler = cProfile.Profile()
+        started = time.perf_counter()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Another profiler is already active in this thread.
+            return self.get_response(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            profiler.disable()
+
+        if response.streaming:
+            timing.wrap_stream(
+                response,
+                lambda: profiler,
+                lambda: self.dump(profiler, request, time.perf_counter() - started)
+            )
+        else:
+            name = self.dump(profiler, request, time.perf_counter() - started)
+            # Only whoever asked for the profile learns where it is.
+            if signed:
+                response['X-Profile-File'] = name
+        return response
+
+    async def __acall__(self, request):
+        if PROFILE_HEADER in request.headers:
+            return JsonResponse({'error': 'Profiling is only available on WSGI workers'}, status=501)
+        return await self.get_response(request)
+
+    def dump(self, profiler, request, elapsed):
+        match = getattr(request, 'resolver_match', None)
+        view_name = (match.url_name if match else None) or 'unresolved'
+        directory = profile_dir()
+        directory.mkdir(parents=True, exist_ok=True)
+        name = dump_name(view_name, elapsed)
+        profiler.dump_stats(directory / name)
+        prune(directory, settings.PROFILER_MAX_FILES)
+        return name
+
+
+def prune(directory, keep):
+    """Delete all but the newest `keep` dumps in `directory`."""
+    dumps = []
+    for path in directory.glob(f'*{FILE_SUFFIX}'):
+        try:
+            dumps.append((path.stat().st_mtime, path))
+        except FileNotFoundError:
+            # Pruned by another worker.
+            pass
+    dumps.sort(reverse=True)
+    for _, path in dumps[keep:]:
+        path.unlink(missing_ok=True)
@@ -0,0 +1,321 @@
+import json
+import os
+import re
+import tempfile
+from datetime import timedelta
+from pathlib import Path
+from unittest import mock, skipUnless
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection, connections
+from django.http import JsonResponse, StreamingHttpResponse
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import include, path
+from django.utils import timezone
+
+from jobs import async_views
+from jobs.models import Company, Job
+from . import metrics
+from .profiling import PROFILE_HEADER, make_token, prune
+
+
+def count_users(request):
+    return JsonResponse({'users': User.objects.count()})
+
+
+def stream_users(request):
+    def body():
+        # Queried while the body is sent, after the middleware returned.
+        for _ in range(2):
+            yield f'{User.objects.count()}\n'.encode()
+    return StreamingHttpResponse(body())
+
+
+urlpatterns = [
+    path('jobs/', async_views.viewAllJobs),
+    path('users/', count_users, name='count_users'),
+    path('users/stream/', stream_users, name='stream_users'),
+    path('', include('monitoring.urls')),
+]
+
+
+def query_count(response):
+    return int(re.search(r'db;dur=[\d.]+;desc="(\d+) queries"', response['Server-Timing']).group(1))
+
+
+@override_settings(ROOT_URLCONF='monitoring.tests', MONITORING_SAMPLE_RATE=1.0)
+class RequestTimingTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        recruiter = User.objects.create_user('timing-recruiter', 'timing@example.com', 'password')
+        company = Company.objects.create(name='Timing Co', description='Seeded company', owner=recruiter)
+        for i in range(3):
+            Job.objects.create(
+                title=f'Engineer {i}',
+                company=company,
+                description='Seeded job description',
+                skills_required='python',
+                min_salary=1000,
+                max_salary=2000,
+                location='Pune',
+                job_type='full-time',
+                application_deadline=timezone.now().date() + timedelta(days=30),
+            )
+
+    def setUp(self):
+        cache.clear()
+
+    async def test_async_view_queries_are_counted(self):
+        # The async ORM runs its queries on a sync_to_async thread, not on
+        # the event loop's thread the middleware runs on.
+        response = await self.async_client.get('/jobs/')
+        self.assertEqual(response.status_code, 200)
+        self.assertGreater(query_count(response), 0)
+
+
+@override_settings(ROOT_URLCONF='monitoring.tests', MONITORING_SAMPLE_RATE=1.0, MONITORING_SLOW_REQUEST_MS=60000)
+class RequestTimingMiddlewareTests(TestCase):
+
+    def test_sampled_request_gets_server_timing(self):
+        response = self.client.get('/users/')
+        self.assertEqual(query_count(response), 1)
+        metrics = [metric.split(';')[0] for metric in response['Server-Timing'].split(', ')]
+        self.assertEqual(metrics, ['db', 'view', 'total'])
+
+    @override_settings(MONITORING_SAMPLE_RATE=0.0)
+    def test_unsampled_request_is_not_instrumented(self):
+        self.assertNotIn('Server-Timing', self.client.get('/users/'))
+
+    @override_settings(MONITORING_SLOW_REQUEST_MS=0)
+    def test_slow_request_is_logged_with_its_sql(self):
+        with self.assertLogs('monitoring.slow_requests', 'WARNING') as logs:
+            self.client.get('/users/')
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record['view'], 'count_users')
+        self.assertTrue(record['sampled'])
+        self.assertEqual(record['query_count'], 1)
+        self.assertIn('auth_user', record['slowest_queries'][0]['sql'])
+
+    @override_settings(MONITORING_SAMPLE_RATE=0.0, MONITORING_SLOW_REQUEST_MS=0)
+    def test_slow_unsampled_request_is_logged_without_sql(self):
+        with self.assertLogs('monitoring.slow_requests', 'WARNING') as logs:
+            self.client.get('/users/')
+        record = json.loads(logs.records[0].getMessage())
+        self.assertFalse(record['sampled'])
+        self.assertNotIn('slowest_queries', record)
+
+    @override_settings(MONITORING_SLOW_REQUEST_MS=0)
+    def test_streamed_body_is_timed_when_finished(self):
+        with self.assertLogs('monitoring.slow_requests', 'WARNING') as logs:
+            response = self.client.get('/users/stream/')
+            # Server-Timing goes out before the body runs its queries.
+            self.assertEqual(query_count(response), 0)
+            b''.join(response.streaming_content)
+        self.assertEqual(len(logs.records), 1)
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record['query_count'], 2)
+        self.assertIn('stream', record['spans_ms'])
+
+
+@override_settings(ROOT_URLCONF='monitoring.tests')
+class MetricsMiddlewareTests(TestCase):
+
+    def test_requests_are_counted_by_url_name(self):
+        key = ('jobsup_http_requests_total', '', 'count_users', 'GET', '200')
+        count = ('jobsup_http_request_db_queries', 'count', 'count_users')
+        queries = ('jobsup_http_request_db_queries', 'sum', 'count_users')
+        before = metrics.collect()
+        self.client.get('/users/')
+        after = metrics.collect()
+        self.assertEqual(after[key] - before.get(key, 0), 1)
+        self.assertEqual(after[count] - before.get(count, 0), 1)
+        self.assertEqual(after[queries] - before.get(queries, 0), 1)
+
+    def test_unmatched_paths_share_one_label(self):
+        key = ('jobsup_http_requests_total', '', 'unresolved', 'GET', '404')
+        before = metrics.collect().get(key, 0)
+        self.client.get('/no-such-page/')
+        self.assertEqual(metrics.collect()[key] - before, 1)
+
+    def test_pools_are_read_on_scrape_only(self):
+        with mock.patch('monitoring.metrics.record_pools') as record_pools:
+            self.client.get('/users/')
+        record_pools.assert_not_called()
+
+
+class FileStoreTests(SimpleTestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = Path(directory.name)
+
+    def open(self, pid=None):
+        return metrics.FileStore(self.directory / f'metrics-{pid or os.getpid()}.db')
+
+    def entries(self, path):
+        data = path.read_bytes()
+        return list(metrics._read_entries(data, metrics._HEADER.unpack_from(data, 0)[0]))
+
+    def test_layout(self):
+        store = self.open()
+        store.add([(('jobsup_http_requests_total', '', 'job_detail', 'GET', '200'), 1)])
+        store.add([(('jobsup_http_requests_total', '', 'job_detail', 'GET', '200'), 2)])
+        store.set([(('jobsup_db_pool_connections', '', 'default'), 4)])
+
+        entries = self.entries(self.directory / f'metrics-{os.getpid()}.db')
+        self.assertEqual(
+            [(key, value) for key, _, value in entries],
+            [
+                (('jobsup_http_requests_total', '', 'job_detail', 'GET', '200'), 3.0),
+                (('jobsup_db_pool_connections', '', 'default'), 4.0),
+            ]
+        )
+        # Values are 8-byte aligned float64s.
+        self.assertTrue(all(at % 8 == 0 for _, at, _ in entries))
+
+    def test_grows_past_initial_size(self):
+        store = self.open()
+        keys = [('jobsup_http_requests_total', '', f'view_{i}', 'GET', '200') for i in range(3000)]
+        store.add([(key, 1) for key in keys])
+        path = self.directory / f'metrics-{os.getpid()}.db'
+        self.assertGreater(path.stat().st_size, metrics._INITIAL_SIZE)
+        self.assertEqual(len(self.entries(path)), len(keys))
+
+    def test_recycled_pid_continues_counters(self):
+        key = ('jobsup_http_requests_total', '', 'job_detail', 'GET', '200')
+        self.open(pid=4242).add([(key, 5)])
+        reopened = self.open(pid=4242)
+        reopened.add([(key, 1)])
+        self.assertEqual(
+            [(k, value) for k, _, value in self.entries(self.directory / 'metrics-4242.db')],
+            [(key, 6.0)]
+        )
+
+    def collect(self, live):
+        with override_settings(METRICS_DIR=str(self.directory)), \
+                mock.patch('monitoring.metrics._alive', side_effect=lambda pid: pid in live):
+            return metrics.collect()
+
+    def test_exited_workers_are_archived(self):
+        counter = ('jobsup_http_requests_total', '', 'job_detail', 'GET', '200')
+        gauge = ('jobsup_db_pool_connections', '', 'default')
+        for pid in (os.getpid(), 4242):
+            store = self.open(pid)
+            store.add([(counter, 1)])
+            store.set([(gauge, 2)])
+
+        samples = self.collect(live={os.getpid()})
+        self.assertEqual(samples[counter], 2)
+        self.assertEqual(samples[gauge], 2)
+        self.assertEqual(
+            {path.name for path in self.directory.glob('*.db')},
+            {metrics.ARCHIVE_NAME, f'metrics-{os.getpid()}.db'}
+        )
+        self.assertEqual(self.collect(live={os.getpid()}), samples)
+
+        # Later exits add to the archive.
+        self.open(4343).add([(counter, 3)])
+        with override_settings(METRICS_DIR=str(self.directory)):
+            metrics.mark_process_dead(4343)
+            metrics.mark_process_dead(4343)
+        self.assertEqual(self.collect(live={os.getpid()})[counter], 5)
+
+
+@override_settings(ROOT_URLCONF='monitoring.tests')
+class MetricsViewTests(TestCase):
+
+    @override_settings(METRICS_TOKEN=None, DEBUG=False)
+    def test_disabled_without_token(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 404)
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_requires_token(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 401)
+        self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer wrong').status_code, 401)
+        response = self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('# TYPE jobsup_http_requests_total counter', response.content.decode())
+
+
+@override_settings(ROOT_URLCONF='monitoring.tests', METRICS_TOKEN='secret')
+class PoolMetricsTests(TestCase):
+
+    def scrape(self):
+        return self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer secret').content.decode()
+
+    def test_pool_statistics_are_exposed(self):
+        pool = mock.Mock()
+        pool.pop_stats.return_value = {'requests_num': 7, 'requests_wait_ms': 1500, 'pool_size': 5, 'pool_available': 1}
+        databases = {alias: connections[alias] for alias in connections}
+        databases['pooled'] = mock.Mock(pool=pool)
+        with mock.patch.dict(settings.DATABASES, {'pooled': {**connection.settings_dict, 'OPTIONS': {'pool': True}}}), \
+                mock.patch('monitoring.metrics.connections', databases):
+            before = metrics.collect().get(('jobsup_db_pool_checkouts_total', '', 'pooled'), 0)
+            body = self.scrape()
+
+        checkouts = re.search(r'^jobsup_db_pool_checkouts_total\{alias="pooled"\} (\d+)$', body, re.M)
+        self.assertGreaterEqual(int(checkouts[1]), before + 7)
+        self.assertIn('jobsup_db_pool_connections{alias="pooled"} 5\n', body)
+        self.assertIn('jobsup_db_pool_idle_connections{alias="pooled"} 1\n', body)
+        self.assertRegex(body, r'\njobsup_db_pool_wait_seconds_total\{alias="pooled"\} \d')
+
+    @skipUnless(connection.settings_dict.get('OPTIONS', {}).get('pool'), "needs a pooled PostgreSQL connection")
+    def test_real_pool(self):
+        self.assertRegex(self.scrape(), r'\njobsup_db_pool_connections\{alias="default"\} [1-9]')
+
+
+class ProfilerTests(SimpleTestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = Path(directory.name)
+        settings = override_settings(
+            ROOT_URLCONF='monitoring.tests', PROFILER_DIR=self.directory, PROFILER_SAMPLE_RATE=0.0,
+            PROFILER_MAX_FILES=1000, METRICS_TOKEN=None, DEBUG=True,
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def dumps(self):
+        return sorted(path.name for path in self.directory.glob('*.prof'))
+
+    def test_signed_request_gets_its_file(self):
+        response = self.client.get('/metrics', headers={PROFILE_HEADER: make_token()})
+        self.assertEqual(self.dumps(), [response['X-Profile-File']])
+        self.assertTrue(response['X-Profile-File'].startswith('metrics__'))
+
+    def test_sampled_request_is_not_told_the_file(self):
+        with override_settings(PROFILER_SAMPLE_RATE=1.0):
+            response = self.client.get('/metrics')
+        self.assertNotIn('X-Profile-File', response)
+        self.assertEqual(len(self.dumps()), 1)
+
+    def test_bad_token_is_not_profiled(self):
+        with override_settings(PROFILER_SAMPLE_RATE=1.0):
+            response = self.client.get('/metrics', headers={PROFILE_HEADER: 'forged'})
+        self.assertNotIn('X-Profile-File', response)
+        self.assertEqual(self.dumps(), [])
+
+    async def test_asgi_request_is_refused(self):
+        # Below sync-only middleware Django runs it in a thread, where cProfile works.
+        with override_settings(PROFILER_SAMPLE_RATE=1.0, MIDDLEWARE=['monitoring.profiling.ProfilerMiddleware']):
+            response = await self.async_client.get('/metrics', headers={PROFILE_HEADER: make_token()})
+            self.assertEqual(response.status_code, 501)
+            self.assertNotIn('X-Profile-File', response)
+            self.assertEqual((await self.async_client.get('/metrics')).status_code, 200)
+        self.assertEqual(self.dumps(), [])
+
+    def test_keeps_newest_dumps(self):
+        for i in range(5):
+            path = self.directory / f'view__{i}ms__20260101T000000__{i}.prof'
+            path.touch()
+            os.utime(path, (i, i))
+        (self.directory / 'notes.txt').touch()
+        prune(self.directory, 2)
+        self.assertEqual(self.dumps(), ['view__3ms__20260101T000000__3.prof', 'view__4ms__20260101T000000__4.prof'])
+        self.assertTrue((self.directory / 'notes.txt').exists())
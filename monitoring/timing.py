@@ -0,0 +1,139 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+
+_current = ContextVar('monitoring_request_timings', default=None)
+# Every RequestTimings recording queries in the current context.
+_recorders = ContextVar('monitoring_query_recorders', default=())
+
+# Statements kept per request for the slow log; counting goes on past it.
+MAX_CAPTURED_QUERIES = 1000
+
+
+class RequestTimings:
+    """
+    Per-request counters filled in while a sampled request runs: query
+    count and time (with the statements themselves when `capture_sql`),
+    plus named spans such as 'serialize'.
+    """
+
+    def __init__(self, capture_sql=True):
+        self.capture_sql = capture_sql
+        self.query_count = 0
+        self.db_time = 0.0
+        self.queries = []
+        self.spans = {}
+
+    def add_span(self, name, seconds):
+        self.spans[name] = self.spans.get(name, 0.0) + seconds
+
+    def add_query(self, sql, seconds, alias):
+        self.query_count += 1
+        self.db_time += seconds
+        if self.capture_sql and len(self.queries) < MAX_CAPTURED_QUERIES:
+            self.queries.append((sql, seconds, alias))
+
+
+def _record_query(execute, sql, params, many, context):
+    recorders = _recorders.get()
+    if not recorders:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        elapsed = time.perf_counter() - started
+        for timings in recorders:
+            timings.add_query(sql, elapsed, context['connection'].alias)
+
+
+def install(connection, **kwargs):
+    """
+    connection_created receiver: give every connection the query recorder.
+    It is installed where queries run, so it also sees the async ORM's
+    queries made on sync_to_async threads, and it finds the request's
+    RequestTimings through a ContextVar, which those threads inherit.
+    """
+    if _record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_record_query)
+
+
+@contextmanager
+def recording(timings):
+    """Feed every query made in this context (and threads it hands off to) into `timings`."""
+    token = _recorders.set((*_recorders.get(), timings))
+    try:
+        yield
+    finally:
+        _recorders.reset(token)
+
+
+@contextmanager
+def instrumented(timings):
+    """Make `timings` current and record every query into it."""
+    token = activate(timings)
+    try:
+        with recording(timings):
+            yield
+    finally:
+        deactivate(token)
+
+
+def wrap_stream(response, context, finished):
+    """
+    Make a streaming response's body (sync or async) be consumed inside
+    `context()` and call `finished()` once it is done or abandoned.
+    """
+    content = response.streaming_content
+    if response.is_async:
+        async def wrapped():
+            try:
+                with context():
+                    async for chunk in content:
+                        yield chunk
+            finally:
+                finished()
+    else:
+        def wrapped():
+            try:
+                with context():
+                    yield from content
+            finally:
+                finished()
+    response.streaming_content = wrapped()
+
+
+def activate(timings):
+    return _current.set(timings)
+
+
+def deactivate(token):
+    _current.reset(token)
+
+
+def current():
+    return _current.get()
+
+
+class span:
+    """
+    Time a block into the current request's named span. A no-op (one
+    ContextVar lookup) when the request is not being sampled.
+    """
+
+    __slots__ = ('name', 'timings', 'started')
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.timings = _current.get()
+        if self.timings is not None:
+            self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        if self.timings is not None:
+            self.timings.add_span(self.name, time.perf_counter() - self.started)
+        return False
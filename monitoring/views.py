@@ -0,0 +1,24 @@
+import hmac
+
+from django.conf import settings
+from django.http import HttpResponse, JsonResponse
+from django.views.decorators.http import require_GET
+
+from . import metrics as metrics_store
+
+
+@require_GET
+def metrics(request):
+    token = settings.METRICS_TOKEN
+    if token:
+        supplied = request.headers.get('Authorization', '').removeprefix('Bearer ')
+        if not hmac.compare_digest(supplied.encode(), token.encode()):
+            return JsonResponse({'error': 'Not authorized'}, status=401)
+    elif not settings.DEBUG:
+        # Request counts per view and pool sizes are not for the public.
+        return JsonResponse({'error': 'Metrics are disabled; set METRICS_TOKEN'}, status=404)
+    metrics_store.record_pools()
+    return HttpResponse(
+        metrics_store.render(metrics_store.collect()),
+        content_type='text/plain; version=0.0.4; charset=utf-8'
+    )